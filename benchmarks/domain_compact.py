@@ -0,0 +1,106 @@
+"""
+Compact representation and trusted-load path for the domain model.
+
+Benchmark helper of domain_model_bench.py, not used by the server: the
+measured gain is in memory only (pydantic v2 validates in compiled code,
+and packed pickling is slower once unpacking is counted), while the server
+builds full models from every cache entry anyway.
+
+Steps are CompactStep tuples (no per-instance __dict__), jobs and workflows
+are plain tuples of field values in declaration order. Each packed model
+also carries its fields-set, so exclude_unset dumps stay identical.
+
+unpack_workflow() is the trusted load: it builds the pydantic models
+directly from those values, without validation, so it must only ever be
+fed the output of pack_workflow(). The rebuilt models compare equal to the
+originals and serialize to the same JSON.
+"""
+
+from collections import namedtuple
+from typing import AbstractSet, Any, Dict, FrozenSet, Iterable, Tuple, Type, TypeVar
+
+from pydantic import BaseModel
+
+from domain_model import Job, Step, Workflow
+
+# Field order of the packed values (pydantic keeps declaration order)
+STEP_FIELDS = tuple(Step.model_fields)
+JOB_FIELDS = tuple(Job.model_fields)
+WORKFLOW_FIELDS = tuple(Workflow.model_fields)
+_JOB_STEPS = JOB_FIELDS.index("steps")
+_WORKFLOW_JOBS = WORKFLOW_FIELDS.index("jobs")
+
+# ((workflow field values, jobs excluded), workflow fields-set,
+#  ((job_id, (job field values, steps excluded), job fields-set, (CompactStep, ...)), ...))
+PackedWorkflow = Tuple[
+    Tuple[Any, ...],
+    FrozenSet[str],
+    Tuple[Tuple[str, Tuple[Any, ...], FrozenSet[str], Tuple["CompactStep", ...]], ...],
+]
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+class CompactStep(namedtuple("CompactStep", STEP_FIELDS + ("fields_set",))):
+    """
+    Step as a named tuple of its field values, followed by the names of
+    the fields that were explicitly set. Tuples carry no per-instance
+    __dict__, and pickle without calling back into Python.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_step(cls, step: Step) -> "CompactStep":
+        return cls(*(getattr(step, name) for name in STEP_FIELDS), frozenset(step.model_fields_set))
+
+    def to_step(self) -> Step:
+        """Rebuilds the pydantic Step without validating it again."""
+        return _construct(Step, zip(STEP_FIELDS, self), self.fields_set)
+
+
+def _construct(model: Type[ModelT], items: Iterable[Tuple[str, Any]], fields_set: AbstractSet[str]) -> ModelT:
+    """
+    Creates a model instance from trusted field values, the same way
+    pydantic restores a pickled model (model_construct() re-applies
+    defaults and aliases in Python, which costs as much as validating).
+
+    Args:
+        model: Model class to instantiate
+        items: (field name, value) pairs of every field
+        fields_set: model_fields_set of the original instance
+    """
+    values: Dict[str, Any] = dict(items)
+    instance = model.__new__(model)
+    object.__setattr__(instance, "__dict__", values)
+    object.__setattr__(instance, "__pydantic_fields_set__", set(fields_set))
+    object.__setattr__(instance, "__pydantic_extra__", None)
+    object.__setattr__(instance, "__pydantic_private__", None)
+    return instance
+
+
+def pack_workflow(workflow: Workflow) -> PackedWorkflow:
+    """Converts a validated Workflow into its compact form."""
+    jobs = tuple(
+        (
+            job_id,
+            tuple(getattr(job, name) for name in JOB_FIELDS if name != "steps"),
+            frozenset(job.model_fields_set),
+            tuple(CompactStep.from_step(step) for step in job.steps),
+        )
+        for job_id, job in workflow.jobs.items()
+    )
+    values = tuple(getattr(workflow, name) for name in WORKFLOW_FIELDS if name != "jobs")
+    return values, frozenset(workflow.model_fields_set), jobs
+
+
+def unpack_workflow(packed: PackedWorkflow) -> Workflow:
+    """Trusted load: rebuilds a Workflow from pack_workflow() output without validation."""
+    workflow_values, workflow_fields_set, packed_jobs = packed
+    jobs = {}
+    for job_id, job_values, job_fields_set, steps in packed_jobs:
+        values = list(job_values)
+        values.insert(_JOB_STEPS, [step.to_step() for step in steps])
+        jobs[job_id] = _construct(Job, zip(JOB_FIELDS, values), job_fields_set)
+    values = list(workflow_values)
+    values.insert(_WORKFLOW_JOBS, jobs)
+    return _construct(Workflow, zip(WORKFLOW_FIELDS, values), workflow_fields_set)
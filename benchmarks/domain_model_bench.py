@@ -0,0 +1,114 @@
+"""
+Domain Model Microbenchmark
+
+Compares the validated pydantic models of mcp_server/domain_model.py with
+the compact representation and trusted-load path of domain_compact.py on a
+synthetic corpus: build time, pickling (process pool / snapshot transport),
+serialization time and memory footprint. Fails if the JSON produced by
+trusted-loaded models differs from the validated ones.
+
+Usage:
+    python benchmarks/domain_model_bench.py --workflows 10000 --json results.json
+"""
+
+import argparse
+import gc
+import json
+import pickle
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, Tuple
+
+SERVER_DIR = Path(__file__).resolve().parent.parent / "src" / "mcp_server"
+sys.path.insert(0, str(SERVER_DIR))
+
+from domain_compact import pack_workflow, unpack_workflow  # noqa: E402
+from domain_model import Workflow  # noqa: E402
+from synthetic_repo import synthetic_workflow  # noqa: E402
+from utils.ingestion import parse_workflow  # noqa: E402
+
+
+def timed(run: Callable[[], Any]) -> Tuple[Any, float]:
+    start = time.perf_counter()
+    result = run()
+    return result, time.perf_counter() - start
+
+
+def traced_bytes(build: Callable[[], Any]) -> Tuple[Any, int]:
+    """Memory retained by the object graph returned by build()."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def run(workflow_count: int, seed: int) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    sources = [synthetic_workflow(i, rng) for i in range(workflow_count)]
+
+    results: Dict[str, Any] = {"workflows": workflow_count}
+    validated, results["parse_yaml_and_validate_s"] = timed(lambda: [parse_workflow(s) for s in sources])
+    dumped = [w.model_dump(by_alias=True) for w in validated]
+
+    rebuilt, results["build_validated_s"] = timed(lambda: [Workflow.model_validate(d) for d in dumped])
+    packed, results["pack_s"] = timed(lambda: [pack_workflow(w) for w in rebuilt])
+    trusted, results["build_trusted_s"] = timed(lambda: [unpack_workflow(p) for p in packed])
+
+    _, results["pickle_roundtrip_models_s"] = timed(lambda: pickle.loads(pickle.dumps(rebuilt)))
+    _, results["pickle_roundtrip_packed_s"] = timed(
+        lambda: [unpack_workflow(p) for p in pickle.loads(pickle.dumps(packed))]
+    )
+
+    validated_json, results["serialize_validated_s"] = timed(
+        lambda: [w.model_dump_json(indent=2) for w in rebuilt]
+    )
+    trusted_json, results["serialize_trusted_s"] = timed(
+        lambda: [w.model_dump_json(indent=2) for w in trusted]
+    )
+    results["json_identical"] = validated_json == trusted_json and all(
+        a == b and a.model_dump_json(exclude_unset=True) == b.model_dump_json(exclude_unset=True)
+        for a, b in zip(rebuilt, trusted)
+    )
+
+    del validated, rebuilt, trusted, packed, validated_json, trusted_json
+    _, results["memory_models_bytes"] = traced_bytes(lambda: [Workflow.model_validate(d) for d in dumped])
+    _, results["memory_packed_bytes"] = traced_bytes(
+        lambda: [pack_workflow(Workflow.model_validate(d)) for d in dumped]
+    )
+    return results
+
+
+def report(results: Dict[str, Any]) -> None:
+    print(f"📊 Domain model benchmark ({results['workflows']:,} workflows)")
+    for key, value in results.items():
+        if key.endswith("_s"):
+            print(f"   {key[:-2]:<28} {value * 1000:10.1f} ms")
+        elif key.endswith("_bytes"):
+            print(f"   {key[:-6]:<28} {value / 1024 / 1024:10.1f} MiB")
+    speedup = results["build_validated_s"] / max(results["build_trusted_s"], 1e-9)
+    saving = 1 - results["memory_packed_bytes"] / max(results["memory_models_bytes"], 1)
+    print(f"   trusted build speedup        {speedup:10.2f}x")
+    print(f"   packed memory saving         {saving:10.0%}")
+    print(f"   JSON identical               {results['json_identical']!s:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Domain model microbenchmark")
+    parser.add_argument("--workflows", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", type=Path, help="Also write the results to this file")
+    args = parser.parse_args()
+
+    results = run(args.workflows, args.seed)
+    report(results)
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    if not results["json_identical"]:
+        sys.exit("❌ Trusted-loaded models don't serialize to the same JSON")
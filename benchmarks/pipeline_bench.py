@@ -0,0 +1,318 @@
+"""
+Pipeline Benchmark
+
+Times each hot path of the project separately on a synthetic repository
+(see synthetic_repo.py):
+
+- get_repo_model: cold (fresh cache, no snapshot), from a snapshot, and cached
+- model_dump_json of the Repository model
+- derive_structural_boundaries and ContextDebtPolicy.assemble_prompt
+- a full stdio MCP round trip (server start, cicd://index and AGENTS.md
+  reads, analysis, shutdown) against the fake Messages endpoint
+- the same host run against a server daemon started once (connect over its
+  Unix socket, reads, analysis)
+
+Results are written as JSON so runs on different commits can be compared:
+
+    python benchmarks/pipeline_bench.py --workflows 500 --json before.json
+    git checkout other-branch
+    python benchmarks/pipeline_bench.py --workflows 500 --json after.json --compare before.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+SERVER_DIR = ROOT / "src" / "mcp_server"
+HOST_DIR = ROOT / "src" / "mcp_host"
+
+# The server modules read their configuration at import time
+WORK_DIR = Path(tempfile.mkdtemp(prefix="pipeline-bench-"))
+os.environ["MCP_SNAPSHOT_DIR"] = str(WORK_DIR / "snapshots")
+sys.path[:0] = [str(SERVER_DIR), str(HOST_DIR)]
+
+from anthropic import AsyncAnthropic  # noqa: E402
+from mcp import ClientSession, StdioServerParameters  # noqa: E402
+from mcp.client.stdio import stdio_client  # noqa: E402
+from sessions import SessionPool  # noqa: E402
+
+from analysis import fetch_inputs, run_analysis  # noqa: E402
+from capabilities.cicd_model import build_model_index  # noqa: E402
+from fake_llm import start_fake_server  # noqa: E402
+from inference import DEFAULT_TOKEN_BUDGET, LLMSettings  # noqa: E402
+from steering.context_debt import ContextDebtPolicy  # noqa: E402
+from steering.constraints import derive_structural_boundaries  # noqa: E402
+from synthetic_repo import RepoShape, generate_repository  # noqa: E402
+from utils.model_cache import WorkflowModelCache  # noqa: E402
+
+# Default share a stage's median may grow by before it counts as a regression
+REGRESSION_THRESHOLD = 0.10
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    return {
+        "runs": len(samples),
+        "min_ms": round(min(samples) * 1000, 3),
+        "median_ms": round(statistics.median(samples) * 1000, 3),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3),
+    }
+
+
+def measure(run: Callable[[], Any], repeat: int, setup: Optional[Callable[[], None]] = None) -> Dict[str, float]:
+    """Times run() 'repeat' times; setup() runs before each sample, outside the timing."""
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        run()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+async def measure_async(run: Callable[[], Awaitable[Dict[str, float]]], repeat: int) -> Dict[str, Dict[str, float]]:
+    """Like measure(), for a coroutine that returns several named durations per sample."""
+    samples: Dict[str, List[float]] = {}
+    for _ in range(repeat):
+        for name, seconds in (await run()).items():
+            samples.setdefault(name, []).append(seconds)
+    return {name: summarize(values) for name, values in samples.items()}
+
+
+async def stdio_round_trip(repo: Path, repos_config: Path, base_url: str, token_budget: int) -> Dict[str, float]:
+    """One full host run: spawn the server over stdio, read the inputs, analyze them."""
+    params = StdioServerParameters(
+        command=sys.executable,
+        args=[str(SERVER_DIR / "server.py")],
+        env={
+            **os.environ,
+            "MCP_REPOS_CONFIG": str(repos_config),
+            "MCP_SNAPSHOTS": "0",
+        },
+        cwd=str(WORK_DIR),
+    )
+    client = AsyncAnthropic(api_key="fake", base_url=base_url, max_retries=0)
+    settings = LLMSettings()
+    durations: Dict[str, float] = {}
+    start = time.perf_counter()
+    async with stdio_client(params) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            durations["mcp_initialize"] = time.perf_counter() - start
+
+            mark = time.perf_counter()
+            domain_model, intent_text = await fetch_inputs(session, repo.name)
+            durations["mcp_fetch_inputs"] = time.perf_counter() - mark
+
+            mark = time.perf_counter()
+            await run_analysis(
+                client, domain_model, intent_text, settings, max_retries=0, token_budget=token_budget,
+            )
+            durations["analysis"] = time.perf_counter() - mark
+    durations["mcp_round_trip"] = time.perf_counter() - start
+    return durations
+
+
+async def daemon_round_trip(repo: Path, repos_config: Path, socket_path: Path, base_url: str, token_budget: int) -> Dict[str, float]:
+    """One host run against a running daemon: connect, read the inputs, analyze them."""
+    client = AsyncAnthropic(api_key="fake", base_url=base_url, max_retries=0)
+    durations: Dict[str, float] = {}
+    start = time.perf_counter()
+    async with SessionPool(StdioServerParameters(command=sys.executable), repos_config, socket_path) as pool:
+        session = await pool.acquire()
+        if pool.transport != "daemon":
+            raise RuntimeError(f"The daemon at {socket_path} wasn't used")
+        durations["daemon_connect"] = time.perf_counter() - start
+
+        mark = time.perf_counter()
+        domain_model, intent_text = await fetch_inputs(session, repo.name)
+        durations["daemon_fetch_inputs"] = time.perf_counter() - mark
+
+        await run_analysis(
+            client, domain_model, intent_text, LLMSettings(), max_retries=0, token_budget=token_budget,
+        )
+    durations["daemon_round_trip"] = time.perf_counter() - start
+    return durations
+
+
+def start_daemon(repos_config: Path, socket_path: Path, timeout: float = 60.0) -> subprocess.Popen:
+    """Starts server.py --daemon and waits for its socket."""
+    daemon = subprocess.Popen(
+        [sys.executable, str(SERVER_DIR / "server.py"), "--daemon", "--socket", str(socket_path)],
+        env={**os.environ, "MCP_REPOS_CONFIG": str(repos_config), "MCP_SNAPSHOTS": "0"},
+        cwd=str(WORK_DIR), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + timeout
+    while not socket_path.exists():
+        if daemon.poll() is not None or time.monotonic() > deadline:
+            daemon.kill()
+            raise RuntimeError("The server daemon didn't start")
+        time.sleep(0.05)
+    return daemon
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(shape: RepoShape, seed: int, repeat: int, token_budget: int, round_trip: bool) -> Dict[str, Any]:
+    repo = generate_repository(WORK_DIR / "bench-repo", shape, seed)
+    snapshots = Path(os.environ["MCP_SNAPSHOT_DIR"])
+    stages: Dict[str, Dict[str, float]] = {}
+
+    # Ingestion (server side). Snapshots are written in the background, so
+    # each cold cache writes its own outside the timing
+    cold: List[WorkflowModelCache] = []
+
+    def cold_start() -> None:
+        cold.append(WorkflowModelCache(repo))
+        cold[-1].get_model()
+
+    def discard_snapshots() -> None:
+        while cold:
+            cold.pop().flush_snapshot()
+        shutil.rmtree(snapshots, ignore_errors=True)
+
+    stages["get_repo_model_cold"] = measure(cold_start, repeat, setup=discard_snapshots)
+    cold.pop().flush_snapshot()
+    stages["get_repo_model_snapshot"] = measure(lambda: WorkflowModelCache(repo).get_model(), repeat)
+    cache = WorkflowModelCache(repo)
+    model = cache.get_model()
+    stages["get_repo_model_cached"] = measure(cache.get_model, repeat)
+    stages["model_dump_json"] = measure(lambda: model.model_dump_json(indent=2), repeat)
+
+    # Steering (host side), fed the cicd://index payload like the host is
+    domain_model = json.loads(json.dumps(build_model_index(model)))
+    intent_text = (repo / "AGENTS.md").read_text(encoding="utf-8")
+    policy = ContextDebtPolicy()
+    stages["derive_structural_boundaries"] = measure(lambda: derive_structural_boundaries(domain_model), repeat)
+    stages["assemble_prompt"] = measure(lambda: policy.assemble_prompt(domain_model, intent_text), repeat)
+
+    sizes = {
+        "workflow_files": shape.workflows,
+        "model_json_bytes": len(model.model_dump_json(indent=2)),
+        "index_json_bytes": len(json.dumps(domain_model)),
+        "agents_md_bytes": len(intent_text.encode("utf-8")),
+        "prompt_chars": len(policy.assemble_prompt(domain_model, intent_text)),
+    }
+
+    if round_trip:
+        repos_config = WORK_DIR / "repos.json"
+        repos_config.write_text(json.dumps({
+            "clone_root": str(WORK_DIR / "clones"),
+            "repositories": [{"name": repo.name, "path": str(repo)}],
+        }), encoding="utf-8")
+        fake = start_fake_server()
+        try:
+            stages.update(asyncio.run(measure_async(
+                lambda: stdio_round_trip(repo, repos_config, fake.base_url, token_budget), repeat
+            )))
+            socket_path = WORK_DIR / "daemon.sock"
+            daemon = start_daemon(repos_config, socket_path)
+            try:
+                stages.update(asyncio.run(measure_async(
+                    lambda: daemon_round_trip(repo, repos_config, socket_path, fake.base_url, token_budget), repeat
+                )))
+            finally:
+                daemon.terminate()
+                daemon.wait()
+        finally:
+            fake.shutdown()
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "repeat": repeat,
+            "seed": seed,
+            "token_budget": token_budget,
+            "shape": vars(shape),
+        },
+        "sizes": sizes,
+        "stages": stages,
+    }
+
+
+def report(
+    results: Dict[str, Any],
+    baseline: Optional[Dict[str, Any]] = None,
+    threshold: float = REGRESSION_THRESHOLD,
+) -> List[str]:
+    """
+    Prints the stage timings, with the change against a baseline run.
+
+    Returns:
+        Stages whose median grew by more than the threshold
+    """
+    shape = results["meta"]["shape"]
+    print(f"📊 Pipeline benchmark ({shape['workflows']:,} workflows, {shape['agents_kb']} KB AGENTS.md, "
+          f"median of {results['meta']['repeat']})")
+    regressions = []
+    for name, stage in results["stages"].items():
+        line = f"   {name:<30} {stage['median_ms']:10.1f} ms"
+        previous = (baseline or {}).get("stages", {}).get(name)
+        if previous and previous["median_ms"] > 0:
+            change = stage["median_ms"] / previous["median_ms"] - 1
+            line += f"   {change:+7.1%}"
+            if change > threshold:
+                regressions.append(name)
+                line += "  ⚠️"
+        print(line)
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-stage pipeline benchmark")
+    parser.add_argument("--workflows", type=int, default=RepoShape.workflows)
+    parser.add_argument("--max-jobs", type=int, default=RepoShape.max_jobs)
+    parser.add_argument("--max-steps", type=int, default=RepoShape.max_steps)
+    parser.add_argument("--matrix-ratio", type=float, default=RepoShape.matrix_ratio)
+    parser.add_argument("--matrix-size", type=int, default=RepoShape.matrix_size)
+    parser.add_argument("--agents-kb", type=int, default=RepoShape.agents_kb)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=5, help="Samples per stage")
+    parser.add_argument("--token-budget", type=int, default=DEFAULT_TOKEN_BUDGET)
+    parser.add_argument("--no-round-trip", action="store_true", help="Skip the stdio and daemon MCP round trips")
+    parser.add_argument("--json", type=Path, help="Write the results to this file")
+    parser.add_argument("--compare", type=Path, help="Results of a previous run to compare against")
+    parser.add_argument("--fail-on-regression", action="store_true",
+                        help="Exit with an error when a stage is slower than the --compare baseline")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="Median growth that counts as a regression (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    shape = RepoShape(
+        workflows=args.workflows, max_jobs=args.max_jobs, max_steps=args.max_steps,
+        matrix_ratio=args.matrix_ratio, matrix_size=args.matrix_size, agents_kb=args.agents_kb,
+    )
+    try:
+        results = run(shape, args.seed, max(args.repeat, 1), args.token_budget, not args.no_round_trip)
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+    baseline = json.loads(args.compare.read_text(encoding="utf-8")) if args.compare else None
+    regressions = report(results, baseline, args.threshold)
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"💾 Results written to {args.json}")
+    if regressions and args.fail_on_regression:
+        sys.exit(f"❌ Slower than the baseline: {', '.join(regressions)}")
@@ -0,0 +1,131 @@
+"""
+Synthetic Repository Generator
+
+Writes a repository with a configurable number of workflows (jobs, steps
+and matrices per workflow) and an AGENTS.md of a configurable size, for
+the benchmarks. The same seed always produces the same files.
+
+Usage:
+    python benchmarks/synthetic_repo.py /tmp/bench-repo --workflows 500 --agents-kb 64
+"""
+
+import argparse
+import random
+import shutil
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List
+
+ACTIONS = ["actions/checkout", "actions/setup-python", "actions/cache", "docker/build-push-action"]
+
+
+@dataclass
+class RepoShape:
+    """Size of the generated repository."""
+    workflows: int = 200
+    max_jobs: int = 5
+    max_steps: int = 8
+    # Share of jobs that get a strategy.matrix, and values per matrix axis
+    matrix_ratio: float = 0.3
+    matrix_size: int = 3
+    agents_kb: int = 16
+
+
+def synthetic_workflow(index: int, rng: random.Random, shape: RepoShape = RepoShape()) -> str:
+    """YAML of a workflow with a few jobs, matrices, needs and mixed steps."""
+    lines = [f"name: Workflow {index}", "on: [push, pull_request]", "env:", "  CI: true", "jobs:"]
+    job_ids = [f"job{j}" for j in range(rng.randint(1, shape.max_jobs))]
+    for position, job_id in enumerate(job_ids):
+        lines += [f"  {job_id}:", "    runs-on: ubuntu-latest"]
+        if position:
+            lines.append(f"    needs: [{job_ids[rng.randrange(position)]}]")
+        if rng.random() < shape.matrix_ratio:
+            versions = ", ".join(f"'3.{minor}'" for minor in range(10, 10 + shape.matrix_size))
+            lines.append(f"    strategy: {{matrix: {{python: [{versions}]}}}}")
+        lines.append("    steps:")
+        for step in range(rng.randint(2, shape.max_steps)):
+            if rng.random() < 0.5:
+                lines += [
+                    f"      - name: Use {step}",
+                    f"        uses: {rng.choice(ACTIONS)}@v{rng.randint(1, 5)}",
+                    "        with: {fetch-depth: 0}",
+                ]
+            else:
+                lines += [f"      - run: make step-{step}", "        if: always()", "        timeout-minutes: 5"]
+    return "\n".join(lines) + "\n"
+
+
+def synthetic_agents_md(workflow_count: int, size_kb: int, rng: random.Random) -> str:
+    """
+    Markdown intent file of roughly size_kb kilobytes. Sections describe
+    existing and missing workflows, action versions and plain prose, so
+    every path of the claim checker is exercised.
+    """
+    parts: List[str] = ["# Agent Guide\n", "How the CI/CD system of this project is supposed to work.\n"]
+    size = sum(len(part) for part in parts)
+    section = 0
+    while size < size_kb * 1024:
+        workflow = f"w{rng.randrange(max(workflow_count * 2, 1))}.yml"
+        action = rng.choice(ACTIONS)
+        paragraph = (
+            f"\n## Section {section}\n\n"
+            f"The workflow `.github/workflows/{workflow}` runs the test job on every push.\n"
+            f"- Builds use `{action}@v{rng.randint(1, 5)}` before the deploy job.\n"
+            f"- The release pipeline needs job{rng.randint(0, 4)} to finish first.\n"
+            "Contributors should keep pull requests small and describe their intent.\n"
+        )
+        parts.append(paragraph)
+        size += len(paragraph)
+        section += 1
+    return "".join(parts)
+
+
+def generate_repository(root: Path, shape: RepoShape, seed: int = 42, git: bool = True) -> Path:
+    """
+    Writes the synthetic repository (replacing root if it exists).
+
+    Args:
+        root: Folder of the repository
+        shape: Number and size of the workflows and AGENTS.md
+        seed: Random seed
+        git: Also commit the files, so the checkout has a HEAD (snapshots need it)
+
+    Returns:
+        The repository folder
+    """
+    if root.exists():
+        shutil.rmtree(root)
+    workflows_dir = root / ".github" / "workflows"
+    workflows_dir.mkdir(parents=True)
+    rng = random.Random(seed)
+    for index in range(shape.workflows):
+        (workflows_dir / f"w{index}.yml").write_text(synthetic_workflow(index, rng, shape), encoding="utf-8")
+    (root / "AGENTS.md").write_text(synthetic_agents_md(shape.workflows, shape.agents_kb, rng), encoding="utf-8")
+
+    if git and shutil.which("git"):
+        identity = ["-c", "user.name=bench", "-c", "user.email=bench@example.com"]
+        for command in (["init", "-q"], ["add", "-A"], [*identity, "commit", "-q", "-m", "Synthetic repository"]):
+            subprocess.run(["git", *command], cwd=root, check=True, capture_output=True)
+    return root
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic repository")
+    parser.add_argument("root", type=Path)
+    parser.add_argument("--workflows", type=int, default=RepoShape.workflows)
+    parser.add_argument("--max-jobs", type=int, default=RepoShape.max_jobs)
+    parser.add_argument("--max-steps", type=int, default=RepoShape.max_steps)
+    parser.add_argument("--matrix-ratio", type=float, default=RepoShape.matrix_ratio)
+    parser.add_argument("--matrix-size", type=int, default=RepoShape.matrix_size)
+    parser.add_argument("--agents-kb", type=int, default=RepoShape.agents_kb)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-git", action="store_true", help="Don't commit the generated files")
+    args = parser.parse_args()
+
+    shape = RepoShape(
+        workflows=args.workflows, max_jobs=args.max_jobs, max_steps=args.max_steps,
+        matrix_ratio=args.matrix_ratio, matrix_size=args.matrix_size, agents_kb=args.agents_kb,
+    )
+    root = generate_repository(args.root, shape, args.seed, git=not args.no_git)
+    print(f"🧪 Synthetic repository with {shape.workflows} workflows written to {root}")
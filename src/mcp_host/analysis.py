@@ -0,0 +1,423 @@
+"""
+Analysis Module
+
+The building blocks of one Context Debt analysis, shared by the
+single-repository flow (app.py) and fleet mode (fleet.py):
+ingestion through MCP, steering, inference and report rendering.
+
+Mechanical claims (workflow files, owner/action@ref) are first checked
+locally against the domain model; only the ambiguous part of the intent
+goes to the LLM. When the assembled prompt doesn't fit the token budget,
+the policy splits it into chunks (by workflow and by intent section) that
+are analyzed concurrently; their findings are then merged into a single
+report.
+
+With streaming, the report text and each finding are handed to callbacks
+as soon as they arrive, before the analysis completes.
+
+In incremental mode (see incremental.py), only the intent sections whose
+inputs changed since the previous run go to the LLM.
+"""
+
+import asyncio
+import json
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from anthropic import AsyncAnthropic
+from mcp import ClientSession
+from inference import DEFAULT_TOKEN_BUDGET, InferenceResult, LLMSettings, RateLimiter, run_inference
+from inference_cache import InferenceCache
+from incremental import AnalysisStateStore, attribute_findings
+from steering.claims import ClaimCheck, ClaimChecker
+from steering.base import Prompt, render_prompt
+from steering.context_debt import ContextDebtPolicy
+from steering.findings import Finding, FindingStream, free_form, merge_findings, merge_free_text, parse_findings, render_findings
+from tracing import span
+
+NO_DOCUMENTATION = "No documentation found."
+
+FindingCallback = Callable[[Finding], None]
+ChunkCallback = Callable[[int, InferenceResult], None]
+
+
+def resource_uri(scheme: str, path: str, repo: Optional[str] = None) -> str:
+    """Builds a resource URI, namespaced by repository when one is given."""
+    return f"{scheme}://{repo}/{path}" if repo else f"{scheme}://{path}"
+
+
+async def fetch_inputs(session: ClientSession, repo: Optional[str] = None) -> Tuple[Dict[str, Any], str]:
+    """
+    Reads the Domain Model index and the Intent of a repository.
+
+    Args:
+        session: Initialized MCP client session
+        repo: Repository name (None for the server's default repository)
+
+    Returns:
+        (domain model dict, intent text)
+
+    Raises:
+        ValueError: If the server couldn't serve the domain model
+    """
+    # Get the Domain Model (The Structured Reality)
+    # The index carries exactly what the structural boundaries need
+    # (workflows, jobs and 'uses' references) at a fraction of the size
+    uri = resource_uri("cicd", "index", repo)
+    with span("mcp.read_resource", uri=uri) as attrs:
+        model_res = await session.read_resource(uri)
+        model_text = model_res.contents[0].text
+        attrs["bytes"] = len(model_text.encode("utf-8"))
+    if model_text.startswith("Error:"):
+        raise ValueError(model_text)
+    # Parse the JSON to Python Dictionary so constraints.py can work with it
+    with span("json.parse", bytes=attrs["bytes"]):
+        domain_model_dict = json.loads(model_text)
+
+    # Get the Intent (The Text)
+    uri = resource_uri("intent", "agents-md", repo)
+    with span("mcp.read_resource", uri=uri) as attrs:
+        try:
+            intent_res = await session.read_resource(uri)
+            intent_text = intent_res.contents[0].text
+        except Exception:
+            intent_text = NO_DOCUMENTATION
+        attrs["bytes"] = len(intent_text.encode("utf-8"))
+
+    return domain_model_dict, intent_text
+
+
+def build_prompts(domain_model: Dict[str, Any], intent_text: str, token_budget: int) -> List[Prompt]:
+    """Applies the steering policy, splitting the task into prompts that fit the token budget."""
+    policy = ContextDebtPolicy()
+    with span("steering.assemble_prompts", token_budget=token_budget) as attrs:
+        prompts = policy.assemble_prompts(domain_model=domain_model, intent_context=intent_text, token_budget=token_budget)
+        attrs["prompts"] = len(prompts)
+        attrs["chars"] = sum(len(render_prompt(prompt)) for prompt in prompts)
+    return prompts
+
+
+def _deduplicated(on_finding: Optional[FindingCallback]) -> Optional[FindingCallback]:
+    """Wraps a finding callback so that it sees each (type, claim) only once."""
+    if on_finding is None:
+        return None
+    seen: Set[tuple] = set()
+
+    def emit(finding: Finding) -> None:
+        if finding.key() not in seen:
+            seen.add(finding.key())
+            on_finding(finding)
+    return emit
+
+
+async def analyze_prompts(
+    client: AsyncAnthropic,
+    prompts: List[Prompt],
+    settings: LLMSettings,
+    limiter: Optional[RateLimiter] = None,
+    max_retries: int = 5,
+    cache: Optional[InferenceCache] = None,
+    bypass_cache: bool = False,
+    concurrency: int = 4,
+    stream: bool = False,
+    on_text: Optional[Callable[[str], None]] = None,
+    on_finding: Optional[FindingCallback] = None,
+    on_chunk: Optional[ChunkCallback] = None,
+) -> InferenceResult:
+    """
+    Runs the inference of every prompt (map) and merges their findings (reduce).
+    A single prompt gets the LLM's report back untouched.
+
+    Args:
+        client: Async Anthropic client
+        prompts: Prompts built by build_prompts()
+        settings: Model parameters
+        limiter: Shared rate limiter
+        max_retries: Retries per LLM request on 429/5xx errors
+        cache: Persistent result cache, checked per chunk (None = no caching)
+        bypass_cache: Skip cache lookups (fresh results are still stored)
+        concurrency: Chunks analyzed at the same time
+        stream: Stream the responses (records the time to first token)
+        on_text: Called with the report text as it arrives; only used when
+            there is a single prompt, since chunks would interleave
+        on_finding: Called once per distinct finding, as soon as it is complete
+        on_chunk: Called with the index of each prompt and its own result
+
+    Returns:
+        The combined result: merged report, total attempts and token usage
+
+    Raises:
+        anthropic.APIError: When the request of any chunk fails for good
+    """
+    start = time.perf_counter()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    emit = _deduplicated(on_finding)
+    echo = on_text if len(prompts) == 1 else None
+
+    async def run_chunk(index: int, prompt: Prompt) -> InferenceResult:
+        parser = FindingStream()
+
+        def receive(text: str) -> None:
+            if echo is not None:
+                echo(text)
+            if emit is not None:
+                for finding in parser.feed(text):
+                    emit(finding)
+
+        async with semaphore:
+            with span("inference.chunk", chunk=index, chunks=len(prompts)) as attrs:
+                result = await run_inference(
+                    client, prompt, settings, limiter, max_retries=max_retries,
+                    cache=cache, bypass_cache=bypass_cache, stream=stream,
+                    on_text=receive if echo or emit else None,
+                )
+                if emit is not None:
+                    for finding in parser.close():
+                        emit(finding)
+                attrs.update(
+                    cached=result.cached, attempts=result.attempts,
+                    input_tokens=result.input_tokens, output_tokens=result.output_tokens,
+                    total_input_tokens=result.total_input_tokens,
+                    cache_read_input_tokens=result.cache_read_input_tokens,
+                )
+                if on_chunk is not None:
+                    on_chunk(index, result)
+                return result
+
+    results = await asyncio.gather(*(run_chunk(i, prompt) for i, prompt in enumerate(prompts)))
+    if len(results) == 1:
+        results[0].free_text = [text for text in [free_form(results[0].text)] if text is not None]
+        return results[0]
+
+    with span("steering.merge_findings", chunks=len(results)) as attrs:
+        findings = merge_findings(parse_findings(result.text) for result in results)
+        # A chunk that answered in free form can't be merged: keep its text as-is, once
+        free_text = merge_free_text(text for text in (free_form(result.text) for result in results) if text is not None)
+        attrs["free_form_chunks"] = len(free_text)
+
+    def total(values: List[Optional[int]]) -> Optional[int]:
+        return None if any(v is None for v in values) else sum(values)
+
+    return InferenceResult(
+        text=render_findings(findings, free_text),
+        free_text=free_text,
+        attempts=sum(result.attempts for result in results),
+        seconds=time.perf_counter() - start,
+        input_tokens=total([result.input_tokens for result in results]),
+        output_tokens=total([result.output_tokens for result in results]),
+        cache_read_input_tokens=total([result.cache_read_input_tokens for result in results]),
+        cache_creation_input_tokens=total([result.cache_creation_input_tokens for result in results]),
+        cached=all(result.cached for result in results),
+        chunks=len(results),
+        ttft_seconds=min((r.ttft_seconds for r in results if r.ttft_seconds is not None), default=None),
+    )
+
+
+def check_claims(domain_model: Dict[str, Any], intent_text: str) -> ClaimCheck:
+    """Runs the deterministic claim checker over the intent."""
+    with span("steering.claim_check") as attrs:
+        check = ClaimChecker(domain_model).check(intent_text)
+        attrs.update(findings=len(check.findings), lines_ambiguous=check.lines_ambiguous)
+    return check
+
+
+async def analyze_incremental(
+    client: AsyncAnthropic,
+    domain_model: Dict[str, Any],
+    intent_text: str,
+    settings: LLMSettings,
+    state: AnalysisStateStore,
+    repo: Optional[str] = None,
+    limiter: Optional[RateLimiter] = None,
+    max_retries: int = 5,
+    cache: Optional[InferenceCache] = None,
+    bypass_cache: bool = False,
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+    concurrency: int = 4,
+    stream: bool = False,
+    on_text: Optional[Callable[[str], None]] = None,
+    on_finding: Optional[FindingCallback] = None,
+) -> InferenceResult:
+    """
+    Sends to the LLM only the intent sections whose inputs changed since the
+    saved state, each with the entity roster and the details of the
+    workflows it mentions, and merges the saved findings of the others in.
+
+    Args:
+        state: Store of the previous runs' findings (updated once the LLM answered)
+        repo: Repository name (None for the server's default repository)
+        (the others as in analyze_prompts)
+
+    Returns:
+        The merged report, with incremental set to the plan's stats
+    """
+    start = time.perf_counter()
+    with span("incremental.plan") as attrs:
+        plan = state.plan(repo, settings, domain_model, intent_text)
+        attrs.update(plan.stats())
+    if on_finding is not None:
+        for findings in plan.reused.values():
+            for finding in findings:
+                on_finding(finding)
+
+    policy = ContextDebtPolicy()
+    prompts: List[Prompt] = []
+    owners = []
+    with span("steering.assemble_prompts", token_budget=token_budget, incremental=True) as attrs:
+        # Half the budget for the variable part leaves room for the policy and the roster
+        for batch in plan.batches(token_budget // 2):
+            mentioned = list(dict.fromkeys(f for section in batch for f in plan.mentions[section.key]))
+            batch_prompts = policy.assemble_slice_prompts(
+                domain_model, mentioned, "".join(section.text for section in batch), token_budget
+            )
+            prompts += batch_prompts
+            owners += [batch] * len(batch_prompts)
+        attrs["prompts"] = len(prompts)
+        attrs["chars"] = sum(len(render_prompt(prompt)) for prompt in prompts)
+
+    fresh: Dict[str, List[Finding]] = {section.key: [] for section in plan.stale}
+    # Sections of a prompt answered in free form: the text goes in the report,
+    # but they are not saved as settled, so the next run sends them again
+    unsettled: Set[str] = set()
+    free_text: List[str] = []
+
+    def collect(index: int, result: InferenceResult) -> None:
+        text = free_form(result.text)
+        if text is not None:
+            free_text.append(text)
+            unsettled.update(section.key for section in owners[index])
+        for key, findings in attribute_findings(parse_findings(result.text), owners[index]).items():
+            fresh[key].extend(findings)
+
+    if prompts:
+        result = await analyze_prompts(
+            client, prompts, settings, limiter, max_retries, cache, bypass_cache, concurrency,
+            stream, on_text, on_finding, on_chunk=collect,
+        )
+    else:
+        result = InferenceResult(
+            text="", attempts=0, seconds=0.0, input_tokens=0, output_tokens=0,
+            cache_read_input_tokens=0, cache_creation_input_tokens=0, chunks=0,
+        )
+    state.save(repo, settings, plan, fresh, unsettled)
+
+    free_text = merge_free_text(free_text)
+    result.text = render_findings(merge_findings([*plan.reused.values(), *fresh.values()]), free_text)
+    result.free_text = free_text
+    result.seconds = time.perf_counter() - start
+    result.incremental = plan.stats()
+    return result
+
+
+async def run_analysis(
+    client: AsyncAnthropic,
+    domain_model: Dict[str, Any],
+    intent_text: str,
+    settings: LLMSettings,
+    limiter: Optional[RateLimiter] = None,
+    max_retries: int = 5,
+    cache: Optional[InferenceCache] = None,
+    bypass_cache: bool = False,
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+    concurrency: int = 4,
+    claim_check: Optional[ClaimCheck] = None,
+    stream: bool = False,
+    on_text: Optional[Callable[[str], None]] = None,
+    on_finding: Optional[FindingCallback] = None,
+    state: Optional[AnalysisStateStore] = None,
+    repo: Optional[str] = None,
+) -> InferenceResult:
+    """
+    Full analysis of one repository: local claim check, then the LLM on
+    whatever the check couldn't settle.
+
+    Args:
+        client: Async Anthropic client
+        domain_model: Domain model dict (see fetch_inputs)
+        intent_text: Intent document
+        settings: Model parameters
+        limiter: Shared rate limiter
+        max_retries: Retries per LLM request on 429/5xx errors
+        cache: Persistent result cache (None = no caching)
+        bypass_cache: Skip cache lookups (fresh results are still stored)
+        token_budget: Estimated prompt tokens above which the analysis is split into chunks
+        concurrency: Chunks analyzed at the same time
+        claim_check: Result of check_claims() on the intent (None = send the whole intent)
+        stream: Stream the LLM responses (see analyze_prompts)
+        on_text: Called with the LLM's report text as it arrives (single prompt only)
+        on_finding: Called once per distinct finding, local ones first
+        state: Findings of the previous runs, for an incremental analysis
+            (None = analyze everything)
+        repo: Repository the state belongs to (None for the default one)
+
+    Returns:
+        The merged report, with local_findings set to the number of local findings
+    """
+    start = time.perf_counter()
+    check = claim_check
+    emit = _deduplicated(on_finding)
+    streaming = {"stream": stream, "on_text": on_text, "on_finding": emit}
+
+    async def analyze(text: str) -> InferenceResult:
+        if state is not None:
+            return await analyze_incremental(
+                client, domain_model, text, settings, state, repo, limiter, max_retries,
+                cache, bypass_cache, token_budget, concurrency, **streaming
+            )
+        prompts = build_prompts(domain_model, text, token_budget)
+        return await analyze_prompts(
+            client, prompts, settings, limiter, max_retries, cache, bypass_cache, concurrency, **streaming
+        )
+
+    if check is None:
+        return await analyze(intent_text)
+
+    if emit is not None:
+        for finding in check.findings:
+            emit(finding)
+
+    if not check.residual_intent.strip():
+        # Everything was settled locally: no LLM call at all
+        return InferenceResult(
+            text=render_findings(check.findings),
+            attempts=0,
+            seconds=time.perf_counter() - start,
+            input_tokens=0,
+            output_tokens=0,
+            cache_read_input_tokens=0,
+            cache_creation_input_tokens=0,
+            chunks=0,
+            local_findings=len(check.findings),
+        )
+
+    result = await analyze(check.residual_intent)
+    result.seconds = time.perf_counter() - start
+    result.local_findings = len(check.findings)
+    if not check.findings:
+        return result
+
+    # Free-form LLM output can't be merged, keep it after the findings
+    llm_findings = parse_findings(result.text)
+    result.text = render_findings(merge_findings([check.findings, llm_findings]), result.free_text)
+    return result
+
+
+def describe_prompt_cache(results: List[Any]) -> str:
+    """
+    Sums up how much of the input the provider read from its prompt cache.
+
+    Args:
+        results: InferenceResults, or anything with the same token counts (FleetOutcome)
+    """
+    read = sum(r.cache_read_input_tokens or 0 for r in results)
+    written = sum(r.cache_creation_input_tokens or 0 for r in results)
+    total = sum(r.total_input_tokens or 0 for r in results)
+    return (
+        f"Prompt cache: {read:,}/{total:,} input tokens read from the provider's cache "
+        f"({read / total if total else 0:.0%}), {written:,} written"
+    )
+
+
+def render_report(report_text: str, title: str = "CONTEXT DEBT SMELLS REPORT") -> str:
+    """Formats the LLM output the way the host prints it."""
+    return "\n".join(["=" * 50, f"📊 {title}", "=" * 50, report_text])
@@ -1,13 +1,22 @@
+import argparse
 import asyncio
 import sys
 import os
-import json
+import time
 from pathlib import Path
+from typing import Optional
 
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
-from anthropic import Anthropic
-from steering.context_debt import ContextDebtPolicy
+from mcp import StdioServerParameters
+from analysis import check_claims, describe_prompt_cache, fetch_inputs, render_report, run_analysis
+from inference import (
+    DEFAULT_MAX_TOKENS, DEFAULT_MODEL, DEFAULT_TOKEN_BUDGET, LLMSettings, create_client
+)
+from fleet import run_fleet
+from inference_cache import InferenceCache
+from incremental import AnalysisStateStore
+from sessions import DEFAULT_DAEMON_SOCKET, SessionPool
+from steering.findings import Finding
+from tracing import Tracer, span
 
 # SETUP
 
@@ -15,64 +24,244 @@ API_KEY = os.environ.get("ANTHROPIC_API_KEY")
 CURRENT_DIR = Path(__file__).parent
 SERVER_SCRIPT = CURRENT_DIR.parent / "mcp_server" / "server.py"
 
-server_params = StdioServerParameters(
-    command=sys.executable,
-    args=[str(SERVER_SCRIPT)],
-    env=None
-)
+def single_server_params(repos_config: Optional[Path]) -> StdioServerParameters:
+    """
+    Parameters of the stdio server. It inherits this process's environment
+    (the stdio client only passes a minimal one by default), so the
+    registry config and the other MCP_* settings reach it.
+    """
+    env = dict(os.environ)
+    if repos_config is not None:
+        env["MCP_REPOS_CONFIG"] = str(repos_config.resolve())
+    return StdioServerParameters(command=sys.executable, args=[str(SERVER_SCRIPT)], env=env)
+
+def report_cache_stats(cache: InferenceCache) -> None:
+    stats = cache.stats()
+    print(
+        f"💾 HOST: Inference cache: {stats['hits']} hits / {stats['misses']} misses "
+        f"({stats['hit_rate']:.0%} hit rate), {stats['entries']} entries, {stats['bytes']:,} bytes"
+    )
+
+class StreamPrinter:
+    """Echoes the LLM's report as it streams in, or each finding once complete."""
+
+    def __init__(self):
+        self.echoed = False
+        self.findings = 0
+
+    def on_text(self, text: str) -> None:
+        if not self.echoed:
+            self.echoed = True
+            print()
+        print(text, end="", flush=True)
+
+    def on_finding(self, finding: Finding) -> None:
+        self.findings += 1
+        # Findings are already visible in the echoed text
+        if not self.echoed:
+            print(f"🔔 HOST: [{finding.severity or '?'}] {finding.type}: {finding.claim}", flush=True)
 
-async def main():
+async def main(
+    pool: SessionPool,
+    settings: LLMSettings,
+    max_retries: int,
+    cache: InferenceCache = None,
+    bypass_cache: bool = False,
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+    chunk_concurrency: int = 4,
+    local_check: bool = True,
+    stream: bool = False,
+    state: AnalysisStateStore = None,
+):
     print("🚀 HOST: Initializing Context Debt Analysis...")
-    
-    async with stdio_client(server_params) as (read, write):
-        async with ClientSession(read, write) as session:
-            await session.initialize()
-            
-            # 1. INGESTION
-            print("📥 HOST: Fetching Domain Model & Intent...")
-            
-            # Get the Domain Model (The Structured Reality)
-            model_res = await session.read_resource("cicd://model")
-            # Parse the JSON to Python Dictionary so constraints.py can work with it
-            domain_model_dict = json.loads(model_res.contents[0].text)
-            
-            # Get the Intent (The Text)
-            try:
-                intent_res = await session.read_resource("intent://agents-md")
-                intent_text = intent_res.contents[0].text
-            except Exception:
-                intent_text = "No documentation found."
-
-            # 2. STEERING (Apply the Policy)
-            print("🧠 HOST: Applying Steering Policy (Defining Structural Boundaries)...")
-            
-            # Instantiate the specific policy
-            policy = ContextDebtPolicy()
-            
-            # Generate the final Prompt based on constraints
-            final_prompt = policy.assemble_prompt(
-                domain_model=domain_model_dict, 
-                intent_context=intent_text
-            )
-            
-            # (Optional) Debug: View generated constraints
-            # print(policy.compute_constraints(domain_model_dict))
-
-            # 3. INFERENCE (LLM Execution)
-            print("🤖 HOST: Sending constrained task to LLM...")
-            client = Anthropic(api_key=API_KEY)
-            
-            message = client.messages.create(
-                model="claude-sonnet-4-5",
-                max_tokens=1500,
-                temperature=0, # Temperature 0 is vital for strict compliance tasks
-                messages=[{"role": "user", "content": final_prompt}]
-            )
 
-            print("\n" + "="*50)
-            print("📊 CONTEXT DEBT SMELLS REPORT")
-            print("="*50)
-            print(message.content[0].text)
+    session = await pool.acquire()
+
+    # 1. INGESTION
+    print("📥 HOST: Fetching Domain Model & Intent...")
+    domain_model_dict, intent_text = await fetch_inputs(session)
+
+    # 2. STEERING (Apply the Policy)
+    print("🧠 HOST: Applying Steering Policy (Defining Structural Boundaries)...")
+
+    # Settle the mechanical claims locally, only the ambiguous ones need the LLM
+    claim_check = check_claims(domain_model_dict, intent_text) if local_check else None
+    if claim_check is not None:
+        print(
+            f"🔎 HOST: Local claim check: {len(claim_check.findings)} findings, "
+            f"{claim_check.lines_ambiguous}/{claim_check.lines_total} intent lines left for the LLM "
+            f"(~{claim_check.tokens_before:,} -> ~{claim_check.tokens_after:,} tokens)"
+        )
+
+    # (Optional) Debug: View generated constraints
+    # print(ContextDebtPolicy().compute_constraints(domain_model_dict))
+
+    # 3. INFERENCE (LLM Execution)
+    print("🤖 HOST: Sending constrained task to LLM...")
+    client = create_client(API_KEY)
+    printer = StreamPrinter() if stream else None
+    start = time.perf_counter()
+    result = await run_analysis(
+        client, domain_model_dict, intent_text, settings, max_retries=max_retries,
+        cache=cache, bypass_cache=bypass_cache, token_budget=token_budget,
+        concurrency=chunk_concurrency, claim_check=claim_check, stream=stream,
+        on_text=printer.on_text if printer else None,
+        on_finding=printer.on_finding if printer else None,
+        state=state,
+    )
+    if printer is not None and result.chunks:
+        if printer.echoed:
+            print()
+        first = f"first token after {result.ttft_seconds:.2f}s, " if result.ttft_seconds is not None else ""
+        print(f"⏱️ HOST: {printer.findings} findings streamed, {first}"
+              f"report complete after {time.perf_counter() - start:.2f}s")
+    if result.incremental is not None:
+        stats = result.incremental
+        print(
+            f"♻️ HOST: Incremental: {stats['workflows_changed']}/{stats['workflows']} workflows and "
+            f"{stats['sections_changed']}/{stats['sections']} intent sections changed, "
+            f"{stats['sections_sent']} sections re-sent, {stats['reused_findings']} findings reused."
+        )
+    elif result.chunks == 0:
+        print("✅ HOST: Every claim was settled locally, no LLM call needed.")
+    elif result.chunks > 1:
+        print(f"✂️ HOST: Inputs exceeded the {token_budget:,} token budget, analyzed as {result.chunks} chunks.")
+    if result.cached:
+        print("💾 HOST: Prompt unchanged since a previous run, report served from cache.")
+    elif result.chunks and result.cache_read_input_tokens is not None:
+        print(f"🧊 HOST: {describe_prompt_cache([result])}")
+
+    with span("report.render"):
+        report = render_report(result.text)
+    # A single streamed chunk without local or reused findings was already printed as-is
+    if (printer is not None and printer.echoed and result.chunks == 1 and not result.local_findings
+            and result.incremental is None):
+        return
+    print("\n" + report)
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Context Debt Analysis host")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--max-tokens", type=int, default=DEFAULT_MAX_TOKENS)
+    parser.add_argument("--max-retries", type=int, default=5,
+                        help="Retries per LLM request on 429/5xx errors")
+    parser.add_argument("--token-budget", type=int, default=DEFAULT_TOKEN_BUDGET,
+                        help="Estimated prompt tokens above which the analysis is split into chunks")
+    parser.add_argument("--chunk-concurrency", type=int, default=4,
+                        help="Chunks of one repository analyzed at the same time")
+    parser.add_argument("--no-local-check", action="store_true",
+                        help="Send the whole intent to the LLM instead of settling mechanical claims locally")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream the LLM's answer: print the report and findings as they arrive")
+
+    cache = parser.add_argument_group("inference cache")
+    cache.add_argument("--no-cache", action="store_true",
+                       help="Bypass cached reports (fresh results are still stored)")
+    cache.add_argument("--cache-dir", type=Path, default=Path("./.inference-cache"))
+    cache.add_argument("--cache-max-mb", type=float, default=256,
+                       help="Size budget; least recently used reports are evicted past it")
+    cache.add_argument("--cache-ttl-hours", type=float, default=None,
+                       help="Expire cached reports after this many hours (default: never)")
+
+    incremental = parser.add_argument_group("incremental analysis")
+    incremental.add_argument("--incremental", action="store_true",
+                             help="Only send the intent sections whose text or mentioned workflows changed "
+                                  "since the previous run; reuse the saved findings of the others")
+    incremental.add_argument("--state-dir", type=Path, default=Path("./.analysis-state"),
+                             help="Folder that keeps the findings of the previous runs")
+
+    fleet = parser.add_argument_group("fleet mode")
+    fleet.add_argument("--fleet", type=Path, metavar="REPOS_CONFIG",
+                       help="Audit every repository of a registry config file (YAML/JSON)")
+    fleet.add_argument("--concurrency", type=int, default=4,
+                       help="Repositories analyzed at the same time")
+    fleet.add_argument("--rpm", type=float, default=0,
+                       help="LLM requests per minute (0 = unlimited)")
+    fleet.add_argument("--output-dir", type=Path, default=Path("./reports"),
+                       help="Folder that receives one report per repository")
+
+    server = parser.add_argument_group("server")
+    server.add_argument("--daemon-socket", type=Path, default=DEFAULT_DAEMON_SOCKET,
+                        help="Unix socket of a running server daemon (python server.py --daemon)")
+    server.add_argument("--no-daemon", action="store_true",
+                        help="Always start a fresh stdio server, even when a daemon is running")
+    server.add_argument("--repeat", type=int, default=1,
+                        help="Run the analysis this many times over the same server session")
+
+    trace = parser.add_argument_group("tracing")
+    trace.add_argument("--trace-dir", type=Path, default=Path("./.traces"),
+                       help="Folder that receives the JSON timing trace of each run")
+    trace.add_argument("--no-trace", action="store_true", help="Don't write a timing trace")
+    return parser.parse_args()
+
+def run_host(args: argparse.Namespace, llm_settings: LLMSettings, inference_cache: InferenceCache) -> None:
+    """Runs fleet mode or the single-repository analysis, as selected on the command line."""
+    state = AnalysisStateStore(args.state_dir) if args.incremental else None
+    if args.fleet:
+        asyncio.run(run_fleet(
+            SERVER_SCRIPT,
+            args.fleet,
+            create_client(API_KEY),
+            args.output_dir,
+            llm_settings,
+            concurrency=args.concurrency,
+            requests_per_minute=args.rpm,
+            max_retries=args.max_retries,
+            cache=inference_cache,
+            bypass_cache=args.no_cache,
+            token_budget=args.token_budget,
+            chunk_concurrency=args.chunk_concurrency,
+            local_check=not args.no_local_check,
+            stream=args.stream,
+            use_daemon=not args.no_daemon,
+            daemon_socket=args.daemon_socket,
+            state=state,
+        ))
+    else:
+        asyncio.run(run_single(args, llm_settings, inference_cache, state))
+
+async def run_single(
+    args: argparse.Namespace,
+    llm_settings: LLMSettings,
+    inference_cache: InferenceCache,
+    state: AnalysisStateStore = None,
+) -> None:
+    """Runs the analysis --repeat times, sharing one server session (a daemon's when available)."""
+    repos_config = Path(os.environ["MCP_REPOS_CONFIG"]) if os.environ.get("MCP_REPOS_CONFIG") else None
+    pool = SessionPool(
+        single_server_params(repos_config), repos_config,
+        socket_path=args.daemon_socket, use_daemon=not args.no_daemon,
+    )
+    async with pool:
+        for run in range(max(args.repeat, 1)):
+            start = time.perf_counter()
+            await main(
+                pool, llm_settings, args.max_retries, inference_cache, args.no_cache,
+                args.token_budget, args.chunk_concurrency, not args.no_local_check, args.stream, state,
+            )
+            if args.repeat > 1:
+                print(f"🔁 HOST: Run {run + 1}/{args.repeat} over the {pool.transport} session "
+                      f"took {time.perf_counter() - start:.2f}s")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    args = parse_args()
+    llm_settings = LLMSettings(model=args.model, max_tokens=args.max_tokens)
+    inference_cache = InferenceCache(
+        args.cache_dir,
+        max_bytes=int(args.cache_max_mb * 1024 * 1024),
+        ttl_seconds=args.cache_ttl_hours * 3600 if args.cache_ttl_hours else None,
+    )
+
+    # Every run leaves a JSON timing trace (server start, reads, steering, inference...)
+    tracer = Tracer(
+        "fleet" if args.fleet else "analysis",
+        model=args.model, token_budget=args.token_budget, local_check=not args.no_local_check,
+        stream=args.stream, incremental=args.incremental,
+    )
+    try:
+        with tracer.activate():
+            run_host(args, llm_settings, inference_cache)
+    finally:
+        if not args.no_trace:
+            print(f"🧭 HOST: Timing trace written to {tracer.dump(args.trace_dir)}")
+    report_cache_stats(inference_cache)
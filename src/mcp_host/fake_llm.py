@@ -0,0 +1,266 @@
+"""
+Fake Messages Endpoint
+
+A local stand-in for the Anthropic Messages API, used to exercise the host
+(fleet mode, retries, caching...) without network access or API spend.
+
+Usage:
+    python fake_llm.py --port 8765 --fail-every 3 --latency 0.2
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8765 ANTHROPIC_API_KEY=fake python app.py
+
+Every Nth request (--fail-every) is answered with a 429 so that the host's
+retry/backoff path is exercised. GET /stats returns request counters.
+
+Streaming requests ("stream": true) are answered with server-sent events,
+the report split into --chunk-chars deltas sent --token-delay seconds apart:
+
+    python fake_llm.py --port 8765 --latency 0.5 --token-delay 0.05
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8765 ANTHROPIC_API_KEY=fake python app.py --stream
+
+Prompt caching is simulated: every prefix of the request (system blocks,
+then message blocks) that ends with a cache_control marker and holds at
+least --cache-min-tokens is remembered, and a later request starting with
+it gets those tokens reported as cache_read_input_tokens instead of
+input_tokens. Newly stored prefixes are reported as
+cache_creation_input_tokens, as the real API does.
+"""
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_REPORT = """- [TYPE: Entity Mismatch]
+  - Claim: "Fake claim extracted by the fake endpoint"
+  - Reality: "Fake structural boundary"
+  - Severity: Medium
+"""
+
+# Shortest prefix the API caches for Sonnet models
+DEFAULT_CACHE_MIN_TOKENS = 1024
+# Cached prefixes remembered at most
+PROMPT_CACHE_ENTRIES = 1024
+
+
+def prompt_blocks(request: Dict[str, Any]) -> List[Tuple[str, bool]]:
+    """(text, has cache_control) of every block of a request, in prefix order: system, then messages."""
+    parts = [request.get("system")] + [message.get("content") for message in request.get("messages", [])]
+    blocks: List[Tuple[str, bool]] = []
+    for part in parts:
+        if isinstance(part, str):
+            blocks.append((part, False))
+        elif isinstance(part, list):
+            blocks.extend((block.get("text", ""), "cache_control" in block) for block in part)
+    return blocks
+
+
+class FakeMessagesServer(ThreadingHTTPServer):
+    """HTTP server that answers POST /v1/messages with a canned report."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple,
+        report: str = DEFAULT_REPORT,
+        fail_every: int = 0,
+        latency: float = 0.0,
+        chunk_chars: int = 16,
+        token_delay: float = 0.0,
+        cache_min_tokens: int = DEFAULT_CACHE_MIN_TOKENS,
+    ):
+        super().__init__(address, FakeMessagesHandler)
+        self.report = report
+        self.fail_every = fail_every
+        self.latency = latency
+        self.chunk_chars = max(1, chunk_chars)
+        self.token_delay = token_delay
+        self.cache_min_tokens = cache_min_tokens
+        # Prefix hash -> its token count, least recently used first
+        self.prompt_cache: "OrderedDict[str, int]" = OrderedDict()
+        self.stats: Dict[str, int] = {
+            "requests": 0, "served": 0, "rate_limited": 0, "streamed": 0,
+            "cache_read_input_tokens": 0, "cache_creation_input_tokens": 0,
+        }
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def next_request(self) -> bool:
+        """Counts a request and returns False when it must be rate limited."""
+        with self.lock:
+            self.stats["requests"] += 1
+            if self.fail_every and self.stats["requests"] % self.fail_every == 0:
+                self.stats["rate_limited"] += 1
+                return False
+            self.stats["served"] += 1
+            return True
+
+    def input_usage(self, request: Dict[str, Any]) -> Dict[str, int]:
+        """Splits the input tokens of a request between fresh, cache-read and cache-written ones."""
+        digest = hashlib.sha256()
+        tokens = 0
+        breakpoints: List[Tuple[str, int]] = []
+        for text, cache_control in prompt_blocks(request):
+            digest.update(text.encode("utf-8") + b"\0")
+            tokens += len(text) // 4
+            if cache_control and tokens >= self.cache_min_tokens:
+                breakpoints.append((digest.hexdigest(), tokens))
+
+        with self.lock:
+            read = max((size for key, size in breakpoints if key in self.prompt_cache), default=0)
+            written = max((size for _, size in breakpoints), default=0) - read
+            for key, size in breakpoints:
+                self.prompt_cache[key] = size
+                self.prompt_cache.move_to_end(key)
+            while len(self.prompt_cache) > PROMPT_CACHE_ENTRIES:
+                self.prompt_cache.popitem(last=False)
+            self.stats["cache_read_input_tokens"] += read
+            self.stats["cache_creation_input_tokens"] += written
+        return {
+            "input_tokens": max(1, tokens - read - written),
+            "cache_read_input_tokens": read,
+            "cache_creation_input_tokens": written,
+        }
+
+
+class FakeMessagesHandler(BaseHTTPRequestHandler):
+    server: FakeMessagesServer
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_event(self, event: str, payload: Dict[str, Any]) -> None:
+        self.wfile.write(f"event: {event}\ndata: {json.dumps(payload)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+    def _stream_message(self, message: Dict[str, Any]) -> None:
+        """Sends a message as the event sequence of the streaming Messages API."""
+        self.send_response(200)
+        self.send_header("content-type", "text/event-stream")
+        self.send_header("cache-control", "no-cache")
+        self.send_header("connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        usage = message["usage"]
+        self._send_event("message_start", {"type": "message_start", "message": {
+            **message, "content": [], "stop_reason": None,
+            "usage": {**usage, "output_tokens": 0},
+        }})
+        self._send_event("content_block_start", {
+            "type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""},
+        })
+        self._send_event("ping", {"type": "ping"})
+        text = message["content"][0]["text"]
+        step = self.server.chunk_chars
+        for offset in range(0, len(text), step):
+            if offset and self.server.token_delay:
+                time.sleep(self.server.token_delay)
+            self._send_event("content_block_delta", {
+                "type": "content_block_delta", "index": 0,
+                "delta": {"type": "text_delta", "text": text[offset:offset + step]},
+            })
+        self._send_event("content_block_stop", {"type": "content_block_stop", "index": 0})
+        self._send_event("message_delta", {
+            "type": "message_delta",
+            "delta": {"stop_reason": message["stop_reason"], "stop_sequence": None},
+            "usage": {"output_tokens": usage["output_tokens"]},
+        })
+        self._send_event("message_stop", {"type": "message_stop"})
+
+    def do_GET(self) -> None:
+        if self.path.rstrip("/") == "/stats":
+            with self.server.lock:
+                self._send_json(200, dict(self.server.stats))
+        else:
+            self._send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("content-length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if self.path.split("?")[0].rstrip("/") != "/v1/messages":
+            self._send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+            return
+
+        if not self.server.next_request():
+            self._send_json(
+                429,
+                {"type": "error", "error": {"type": "rate_limit_error", "message": "Fake rate limit"}},
+                headers={"retry-after": "0"},
+            )
+            return
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        message = {
+            "id": f"msg_fake_{self.server.stats['requests']}",
+            "type": "message",
+            "role": "assistant",
+            "model": request.get("model", "fake-model"),
+            "content": [{"type": "text", "text": self.server.report}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": {**self.server.input_usage(request), "output_tokens": max(1, len(self.server.report) // 4)},
+        }
+        if request.get("stream"):
+            with self.server.lock:
+                self.server.stats["streamed"] += 1
+            self._stream_message(message)
+        else:
+            self._send_json(200, message)
+
+
+def start_fake_server(
+    host: str = "127.0.0.1",
+    port: int = 0,
+    **options: Any,
+) -> FakeMessagesServer:
+    """Starts the fake endpoint in a background thread (port 0 picks a free port)."""
+    server = FakeMessagesServer((host, port), **options)
+    threading.Thread(target=server.serve_forever, name="fake-llm", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Anthropic Messages endpoint")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fail-every", type=int, default=0, help="Answer every Nth request with a 429")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before answering")
+    parser.add_argument("--chunk-chars", type=int, default=16, help="Characters per streamed text delta")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds between streamed text deltas")
+    parser.add_argument("--report-file", help="File whose content is returned as the report")
+    parser.add_argument("--cache-min-tokens", type=int, default=DEFAULT_CACHE_MIN_TOKENS,
+                        help="Shortest prefix the simulated prompt cache stores")
+    args = parser.parse_args()
+
+    report = DEFAULT_REPORT
+    if args.report_file:
+        with open(args.report_file, encoding="utf-8") as f:
+            report = f.read()
+
+    server = FakeMessagesServer(
+        (args.host, args.port), report=report, fail_every=args.fail_every, latency=args.latency,
+        chunk_chars=args.chunk_chars, token_delay=args.token_delay, cache_min_tokens=args.cache_min_tokens,
+    )
+    print(f"🧪 Fake Messages endpoint listening on {server.base_url}")
+    server.serve_forever()
@@ -0,0 +1,237 @@
+"""
+Fleet Mode
+
+Audits many repositories in one run. A single MCP server in
+multi-repository mode (MCP_REPOS_CONFIG) serves the run: a daemon already
+running with the same config, or a stdio server started for it. Every
+repository then goes through ingestion -> steering -> inference
+concurrently, bounded by a semaphore and a shared requests-per-minute
+limiter. Each report is written as soon as its analysis completes; a JSON
+summary is written at the end.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from anthropic import AsyncAnthropic
+from mcp import ClientSession, StdioServerParameters
+
+from analysis import check_claims, describe_prompt_cache, fetch_inputs, render_report, run_analysis
+from inference import DEFAULT_TOKEN_BUDGET, LLMSettings, RateLimiter
+from inference_cache import InferenceCache
+from incremental import AnalysisStateStore
+from sessions import DEFAULT_DAEMON_SOCKET, SessionPool
+from steering.findings import Finding
+from tracing import span
+
+# Readiness states in which the server is still cloning/pulling a repository
+PREPARING_STATES = ("pending", "syncing")
+
+
+@dataclass
+class FleetOutcome:
+    """Result of one repository's analysis, as stored in the fleet summary."""
+    repo: str
+    status: str
+    seconds: float
+    attempts: int = 0
+    report_path: Optional[str] = None
+    # Uncached input tokens; total_input_tokens adds the cache reads and writes
+    input_tokens: Optional[int] = None
+    total_input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    cache_read_input_tokens: Optional[int] = None
+    cache_creation_input_tokens: Optional[int] = None
+    cached: bool = False
+    chunks: int = 1
+    local_findings: int = 0
+    ttft_seconds: Optional[float] = None
+    incremental: Optional[Dict[str, int]] = None
+    error: Optional[str] = None
+
+
+def fleet_server_params(server_script: Path, repos_config: Path) -> StdioServerParameters:
+    """Parameters that start the MCP server in multi-repository mode, with this process's environment."""
+    return StdioServerParameters(
+        command=sys.executable,
+        args=[str(server_script)],
+        env={**os.environ, "MCP_REPOS_CONFIG": str(repos_config.resolve())},
+    )
+
+
+async def call_json_tool(session: ClientSession, name: str) -> Any:
+    result = await session.call_tool(name, {})
+    return json.loads(result.content[0].text)
+
+
+async def wait_for_repositories(session: ClientSession, timeout: float, poll_interval: float = 1.0) -> Dict[str, Any]:
+    """
+    Waits until the server finished its first clone/pull of every repository.
+
+    Returns:
+        The last repository_status report (repositories still preparing
+        after the timeout are analyzed with whatever the server has)
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        status = await call_json_tool(session, "repository_status")
+        preparing = [name for name, info in status.items() if info["state"] in PREPARING_STATES]
+        if not preparing or time.monotonic() >= deadline:
+            return status
+        await asyncio.sleep(poll_interval)
+
+
+async def analyze_repository(
+    session: ClientSession,
+    client: AsyncAnthropic,
+    repo: str,
+    settings: LLMSettings,
+    limiter: RateLimiter,
+    max_retries: int,
+    output_dir: Path,
+    cache: Optional[InferenceCache] = None,
+    bypass_cache: bool = False,
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+    chunk_concurrency: int = 4,
+    local_check: bool = True,
+    stream: bool = False,
+    state: Optional[AnalysisStateStore] = None,
+) -> FleetOutcome:
+    """
+    Runs the full pipeline for one repository and writes its report. With
+    stream, each finding is printed as soon as the LLM completes it.
+    """
+    start = time.perf_counter()
+
+    def print_finding(finding: Finding) -> None:
+        print(f"🔔 HOST: {repo}: [{finding.severity or '?'}] {finding.type}: {finding.claim}", flush=True)
+
+    try:
+        with span("repository", repo=repo) as attrs:
+            domain_model, intent_text = await fetch_inputs(session, repo)
+            claim_check = check_claims(domain_model, intent_text) if local_check else None
+            result = await run_analysis(
+                client, domain_model, intent_text, settings, limiter, max_retries=max_retries,
+                cache=cache, bypass_cache=bypass_cache, token_budget=token_budget,
+                concurrency=chunk_concurrency, claim_check=claim_check,
+                stream=stream, on_finding=print_finding if stream else None,
+                state=state, repo=repo,
+            )
+            attrs.update(chunks=result.chunks, cached=result.cached, ttft_ms=(
+                round(result.ttft_seconds * 1000, 1) if result.ttft_seconds is not None else None
+            ))
+    except Exception as e:
+        return FleetOutcome(repo=repo, status="failed", seconds=time.perf_counter() - start, error=str(e))
+
+    report_path = output_dir / f"{repo}.md"
+    report_path.write_text(render_report(result.text, f"CONTEXT DEBT SMELLS REPORT: {repo}") + "\n", encoding="utf-8")
+    return FleetOutcome(
+        repo=repo,
+        status="ok",
+        seconds=time.perf_counter() - start,
+        attempts=result.attempts,
+        report_path=str(report_path),
+        input_tokens=result.input_tokens,
+        total_input_tokens=result.total_input_tokens,
+        output_tokens=result.output_tokens,
+        cache_read_input_tokens=result.cache_read_input_tokens,
+        cache_creation_input_tokens=result.cache_creation_input_tokens,
+        cached=result.cached,
+        chunks=result.chunks,
+        local_findings=result.local_findings,
+        ttft_seconds=result.ttft_seconds,
+        incremental=result.incremental,
+    )
+
+
+async def run_fleet(
+    server_script: Path,
+    repos_config: Path,
+    client: AsyncAnthropic,
+    output_dir: Path,
+    settings: LLMSettings,
+    concurrency: int = 4,
+    requests_per_minute: float = 0,
+    max_retries: int = 5,
+    ready_timeout: float = 600.0,
+    cache: Optional[InferenceCache] = None,
+    bypass_cache: bool = False,
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+    chunk_concurrency: int = 4,
+    local_check: bool = True,
+    stream: bool = False,
+    use_daemon: bool = True,
+    daemon_socket: Path = DEFAULT_DAEMON_SOCKET,
+    state: Optional[AnalysisStateStore] = None,
+) -> List[FleetOutcome]:
+    """
+    Audits every repository listed in a registry config file.
+
+    Args:
+        server_script: Path to the MCP server entry point
+        repos_config: Registry config file (see mcp_server/repo_registry.py)
+        client: Async Anthropic client
+        output_dir: Folder that receives one report per repository
+        settings: Model parameters
+        concurrency: Repositories analyzed at the same time
+        requests_per_minute: LLM request rate limit (0 = unlimited)
+        max_retries: Retries per LLM request on 429/5xx errors
+        ready_timeout: Seconds to wait for the server's initial clone/pull
+        cache: Persistent inference result cache (None = no caching)
+        bypass_cache: Skip cache lookups (fresh results are still stored)
+        token_budget: Estimated prompt tokens above which an analysis is split into chunks
+        chunk_concurrency: Chunks of one repository analyzed at the same time
+        local_check: Settle mechanical claims locally before calling the LLM
+        stream: Stream the LLM responses, printing findings as they complete
+        use_daemon: Use a server daemon running with the same repos_config
+            instead of starting a stdio server
+        daemon_socket: Unix socket of the daemon
+        state: Findings of the previous runs, to only re-send what changed
+            in each repository (None = analyze everything)
+
+    Returns:
+        One FleetOutcome per repository, in completion order
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    limiter = RateLimiter(requests_per_minute)
+    outcomes: List[FleetOutcome] = []
+
+    pool = SessionPool(fleet_server_params(server_script, repos_config), repos_config, daemon_socket, use_daemon)
+    async with pool:
+        session = await pool.acquire()
+
+        print("📥 HOST: Waiting for the server to prepare the repositories...")
+        with span("fleet.wait_for_repositories"):
+            status = await wait_for_repositories(session, ready_timeout)
+        repos = list(status.keys())
+        print(f"🚀 HOST: Auditing {len(repos)} repositories (concurrency={concurrency})...")
+
+        async def run_one(repo: str) -> FleetOutcome:
+            async with semaphore:
+                return await analyze_repository(
+                    session, client, repo, settings, limiter, max_retries, output_dir,
+                    cache, bypass_cache, token_budget, chunk_concurrency, local_check, stream, state,
+                )
+
+        for next_done in asyncio.as_completed([run_one(repo) for repo in repos]):
+            outcome = await next_done
+            outcomes.append(outcome)
+            icon = ("💾" if outcome.cached else "✅") if outcome.status == "ok" else "❌"
+            detail = outcome.report_path if outcome.status == "ok" else outcome.error
+            print(f"{icon} HOST: [{len(outcomes)}/{len(repos)}] {outcome.repo} ({outcome.seconds:.1f}s): {detail}")
+
+    summary_path = output_dir / "fleet_summary.json"
+    summary_path.write_text(json.dumps([asdict(o) for o in outcomes], indent=2), encoding="utf-8")
+    print(f"📊 HOST: Fleet summary written to {summary_path}")
+    # Reports served from the inference cache didn't reach the provider this time
+    sent = [o for o in outcomes if o.status == "ok" and o.chunks and not o.cached]
+    if any(o.cache_read_input_tokens is not None for o in sent):
+        print(f"🧊 HOST: {describe_prompt_cache(sent)}")
+    return outcomes
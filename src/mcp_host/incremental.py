@@ -0,0 +1,288 @@
+"""
+Incremental Analysis
+
+Nightly audits mostly see the workflows and the documentation of the night
+before. In incremental mode the host keeps, per repository, the LLM
+findings of every intent section together with a fingerprint of the inputs
+that produced them: the text of the section and the structural boundaries
+of the workflows it mentions (by file, name, job id or action), or the
+entity roster when it mentions none. The next
+run diffs the domain model workflow by workflow and the intent heading by
+heading, re-sends only the sections whose inputs changed, and merges the
+stored findings of the others back into the report. The LLM cost follows
+the churn, not the size of the repository.
+
+The state is one JSON file per repository, only trusted when it was
+written with the same model parameters. Sections the LLM answered in free
+form are saved unsettled, so the next run sends them again.
+"""
+
+import hashlib
+import json
+import os
+import re
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from inference import LLMSettings
+from steering.budget import estimate_tokens, markdown_sections
+from steering.claims import WorkflowMentions
+from steering.constraints import derive_entity_roster, workflow_boundary_lines
+from steering.findings import Finding
+
+# Bump to discard every state file written by an older format
+STATE_FORMAT_VERSION = 2
+
+# Key of the text that comes before the first heading
+PREAMBLE = "(preamble)"
+# State key of the server's default repository
+DEFAULT_REPO_KEY = "_default"
+
+_HEADING = re.compile(r"^#{1,6}\s")
+_WORD = re.compile(r"[\w./@-]+")
+_UNSAFE = re.compile(r"[^\w.-]")
+
+
+def _digest(payload: Any) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def workflow_fingerprints(domain_model: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Hashes the structural boundaries of every workflow, so that only the
+    changes the LLM would see count (not comments, env or formatting).
+    """
+    return {
+        filename: _digest(workflow_boundary_lines(filename, wf_data))
+        for filename, wf_data in domain_model.get("workflows", {}).items()
+    }
+
+
+@dataclass
+class IntentSection:
+    """A section of the intent document, identified by its heading."""
+    key: str
+    text: str
+
+
+def intent_sections(intent_text: str) -> List[IntentSection]:
+    """
+    Splits the intent into its markdown sections. The text before the first
+    heading is the preamble; a heading used twice gets a counter.
+    """
+    sections = []
+    seen: Dict[str, int] = {}
+    for text in markdown_sections(intent_text):
+        if not text.strip():
+            continue
+        first = text.splitlines()[0]
+        heading = " ".join(first.split()) if _HEADING.match(first) else PREAMBLE
+        seen[heading] = seen.get(heading, 0) + 1
+        key = heading if seen[heading] == 1 else f"{heading} ({seen[heading]})"
+        sections.append(IntentSection(key=key, text=text))
+    return sections
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.strip().strip('"').lower().split())
+
+
+def attribute_findings(findings: List[Finding], sections: List[IntentSection]) -> Dict[str, List[Finding]]:
+    """
+    Assigns each finding of a prompt to the section its claim quotes, or
+    shares the most words with. A finding that matches none goes to the
+    first section of the prompt, so it is stored (and reported) once.
+    """
+    attributed: Dict[str, List[Finding]] = {section.key: [] for section in sections}
+    texts = {section.key: _normalize(section.text) for section in sections}
+    words = {key: set(_WORD.findall(text)) for key, text in texts.items()}
+    for finding in findings:
+        claim = _normalize(finding.claim)
+        owners = [key for key, text in texts.items() if claim and claim in text][:1]
+        if not owners:
+            claim_words = set(_WORD.findall(claim))
+            overlap = {key: len(claim_words & section_words) for key, section_words in words.items()}
+            best = max(overlap.values(), default=0)
+            owners = [key for key, count in overlap.items() if count == best][:1] if best else list(texts)[:1]
+        for key in owners:
+            attributed[key].append(finding)
+    return attributed
+
+
+@dataclass
+class IncrementalPlan:
+    """What an incremental run sends to the LLM and what it reuses."""
+    sections: List[IntentSection]
+    # Workflow file -> fingerprint / estimated tokens of its boundaries
+    workflows: Dict[str, str]
+    workflow_tokens: Dict[str, int]
+    # Section key -> workflows it mentions / fingerprint of its inputs
+    mentions: Dict[str, List[str]]
+    fingerprints: Dict[str, str]
+    # Sections whose inputs changed, and the stored findings of the others
+    stale: List[IntentSection] = field(default_factory=list)
+    reused: Dict[str, List[Finding]] = field(default_factory=dict)
+    workflows_added: List[str] = field(default_factory=list)
+    workflows_removed: List[str] = field(default_factory=list)
+    workflows_changed: List[str] = field(default_factory=list)
+    sections_added: List[str] = field(default_factory=list)
+    sections_removed: List[str] = field(default_factory=list)
+    sections_changed: List[str] = field(default_factory=list)
+
+    def batches(self, budget: int) -> List[List[IntentSection]]:
+        """
+        Groups the stale sections so that the text of each group plus the
+        boundaries of the workflows it mentions fit the budget. A section
+        too large on its own gets a group of its own (the policy splits it).
+        """
+        batches: List[List[IntentSection]] = []
+        current: List[IntentSection] = []
+        detailed: Set[str] = set()
+        used = 0
+        for section in self.stale:
+            cost = self._cost(section, detailed)
+            if current and used + cost > budget:
+                batches.append(current)
+                current, detailed, used = [], set(), 0
+                cost = self._cost(section, detailed)
+            current.append(section)
+            detailed.update(self.mentions[section.key])
+            used += cost
+        if current:
+            batches.append(current)
+        return batches
+
+    def _cost(self, section: IntentSection, detailed: Set[str]) -> int:
+        extra = [f for f in self.mentions[section.key] if f not in detailed]
+        return estimate_tokens(section.text) + sum(self.workflow_tokens[f] for f in extra)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workflows": len(self.workflows),
+            "workflows_changed": len(self.workflows_added) + len(self.workflows_removed) + len(self.workflows_changed),
+            "sections": len(self.sections),
+            "sections_changed": len(self.sections_added) + len(self.sections_removed) + len(self.sections_changed),
+            "sections_sent": len(self.stale),
+            "reused_findings": sum(len(findings) for findings in self.reused.values()),
+        }
+
+
+class AnalysisStateStore:
+    """
+    Findings of the previous incremental run of each repository, one JSON
+    file per repository.
+
+    Args:
+        directory: Folder that holds the state files
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, repo: Optional[str]) -> Path:
+        return self.directory / f"{_UNSAFE.sub('_', repo or DEFAULT_REPO_KEY)}.json"
+
+    def load(self, repo: Optional[str], settings: LLMSettings) -> Dict[str, Any]:
+        """Returns the saved state of a repository, or an empty one when it can't be reused."""
+        try:
+            state = json.loads(self._path(repo).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        if state.get("version") != STATE_FORMAT_VERSION or state.get("settings") != settings.fingerprint(""):
+            return {}
+        return state
+
+    def plan(
+        self, repo: Optional[str], settings: LLMSettings, domain_model: Dict[str, Any], intent_text: str
+    ) -> IncrementalPlan:
+        """
+        Diffs the domain model and the intent against the saved state.
+
+        Args:
+            repo: Repository name (None for the server's default repository)
+            settings: Model parameters (a state written with others is ignored)
+            domain_model: Domain model dict (see analysis.fetch_inputs)
+            intent_text: The part of the intent sent to the LLM
+
+        Returns:
+            The sections to re-send and the findings to reuse
+        """
+        previous = self.load(repo, settings)
+        old_workflows: Dict[str, str] = previous.get("workflows", {})
+        old_sections: Dict[str, Dict[str, Any]] = previous.get("sections", {})
+
+        workflows = domain_model.get("workflows", {})
+        plan = IncrementalPlan(
+            sections=intent_sections(intent_text),
+            workflows=workflow_fingerprints(domain_model),
+            workflow_tokens={
+                filename: estimate_tokens("\n".join(workflow_boundary_lines(filename, wf_data)))
+                for filename, wf_data in workflows.items()
+            },
+            mentions={},
+            fingerprints={},
+        )
+        plan.workflows_added = [f for f in plan.workflows if f not in old_workflows]
+        plan.workflows_removed = [f for f in old_workflows if f not in plan.workflows]
+        plan.workflows_changed = [f for f, fp in plan.workflows.items() if f in old_workflows and old_workflows[f] != fp]
+
+        mentions = WorkflowMentions(domain_model)
+        # A section that mentions no workflow is checked against the roster alone
+        roster = _digest(derive_entity_roster(domain_model))
+        for section in plan.sections:
+            mentioned = mentions.find(section.text)
+            inputs = [[f, plan.workflows[f]] for f in mentioned] if mentioned else [["(roster)", roster]]
+            fingerprint = _digest([section.text, inputs])
+            plan.mentions[section.key] = mentioned
+            plan.fingerprints[section.key] = fingerprint
+
+            stored = old_sections.get(section.key)
+            if stored is None:
+                plan.sections_added.append(section.key)
+            elif stored["text_sha256"] != _digest(section.text):
+                plan.sections_changed.append(section.key)
+            if stored is not None and stored["fingerprint"] == fingerprint:
+                plan.reused[section.key] = [Finding(**finding) for finding in stored["findings"]]
+            else:
+                plan.stale.append(section)
+        plan.sections_removed = [key for key in old_sections if key not in plan.fingerprints]
+        return plan
+
+    def save(
+        self,
+        repo: Optional[str],
+        settings: LLMSettings,
+        plan: IncrementalPlan,
+        fresh: Dict[str, List[Finding]],
+        unsettled: Iterable[str] = (),
+    ) -> None:
+        """
+        Writes the findings of every current section: the reused ones and the
+        fresh ones of the stale sections.
+
+        Args:
+            unsettled: Sections whose answer couldn't be parsed; saved without
+                a fingerprint, so the next run sends them again
+        """
+        findings = {**plan.reused, **fresh}
+        unsettled = set(unsettled)
+        state = {
+            "version": STATE_FORMAT_VERSION,
+            "settings": settings.fingerprint(""),
+            "workflows": plan.workflows,
+            "sections": {
+                section.key: {
+                    "text_sha256": _digest(section.text),
+                    "fingerprint": None if section.key in unsettled else plan.fingerprints[section.key],
+                    "workflows": plan.mentions[section.key],
+                    "findings": [asdict(finding) for finding in findings.get(section.key, [])],
+                }
+                for section in plan.sections
+            },
+        }
+        path = self._path(repo)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(state, indent=2), encoding="utf-8")
+        os.replace(tmp_path, path)
@@ -0,0 +1,322 @@
+"""
+Inference Module
+
+Runs the LLM step of the host without blocking the event loop
+(AsyncAnthropic), with a shared requests-per-minute limiter and
+retry/backoff on 429 and 5xx responses.
+
+In streaming mode the report is read as server-sent events: text is
+handed to a callback as it arrives and the time to first token is
+recorded.
+
+The static segments the steering policy puts first are sent as the
+system prompt, the dynamic ones as the user message. A prefix ending with
+the system prompt or with a segment marked 'cache' gets a cache_control
+marker when it reaches the provider's minimum cacheable length
+(MIN_CACHEABLE_TOKENS); shorter prefixes are never cached, so no marker
+is sent for them. The policy's instructions alone are below that minimum:
+in practice the cached prefix is the instructions plus the entity roster
+that every chunk of a split analysis shares. The usage of each response
+reports how many input tokens were read from or written to the cache;
+input_tokens only counts the rest, total_input_tokens all of them.
+
+Point ANTHROPIC_BASE_URL at a local endpoint (see fake_llm.py) to run
+everything without the real API.
+"""
+
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+import anthropic
+from anthropic import AsyncAnthropic
+from inference_cache import InferenceCache, prompt_fingerprint
+from steering.base import PromptSegment
+from steering.budget import estimate_tokens
+from tracing import span
+
+# Default LLM parameters. Temperature 0 is vital for strict compliance tasks.
+DEFAULT_MODEL = "claude-sonnet-4-5"
+DEFAULT_MAX_TOKENS = 1500
+DEFAULT_TEMPERATURE = 0
+
+# Prompts estimated above this many tokens are split into chunks
+# (well below the context window, so each chunk also answers faster)
+DEFAULT_TOKEN_BUDGET = 60000
+
+# Marks the end of a prefix the provider should cache
+CACHE_CONTROL = {"type": "ephemeral"}
+# Shortest prefix the provider caches (Sonnet and Opus; Haiku needs 2048)
+MIN_CACHEABLE_TOKENS = 1024
+
+
+@dataclass
+class LLMSettings:
+    """Parameters of the Messages request sent for every analysis."""
+    model: str = DEFAULT_MODEL
+    max_tokens: int = DEFAULT_MAX_TOKENS
+    temperature: float = DEFAULT_TEMPERATURE
+
+    def fingerprint(self, prompt: str) -> str:
+        """Cache key of a request made with these settings."""
+        return prompt_fingerprint(
+            self.model, {"max_tokens": self.max_tokens, "temperature": self.temperature}, prompt
+        )
+
+
+@dataclass
+class InferenceResult:
+    """Report text of one analysis, with the attempts and time it took."""
+    text: str
+    attempts: int
+    seconds: float
+    # Input tokens that were neither read from nor written to the prompt cache
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    cached: bool = False
+    chunks: int = 1
+    local_findings: int = 0
+    # Seconds until the first streamed token (None when not streamed)
+    ttft_seconds: Optional[float] = None
+    # Answers that weren't in the finding format, kept verbatim after the
+    # merged findings of a multi-chunk or post-processed report
+    free_text: List[str] = field(default_factory=list)
+    # Input tokens read from / written to the provider's prompt cache
+    # (both excluded from input_tokens)
+    cache_read_input_tokens: Optional[int] = None
+    cache_creation_input_tokens: Optional[int] = None
+    # Incremental mode: what changed and what was re-sent (see IncrementalPlan.stats)
+    incremental: Optional[Dict[str, int]] = None
+
+    @property
+    def total_input_tokens(self) -> Optional[int]:
+        """Every input token of the request(s), cached or not."""
+        return total_input_tokens(self.input_tokens, self.cache_read_input_tokens, self.cache_creation_input_tokens)
+
+
+def total_input_tokens(
+    input_tokens: Optional[int], cache_read_input_tokens: Optional[int], cache_creation_input_tokens: Optional[int]
+) -> Optional[int]:
+    """Sums the uncached, cache-read and cache-written input tokens (None when input_tokens is unknown)."""
+    if input_tokens is None:
+        return None
+    return input_tokens + (cache_read_input_tokens or 0) + (cache_creation_input_tokens or 0)
+
+
+class RateLimiter:
+    """
+    Async limiter that spaces requests so that at most 'requests_per_minute'
+    start in any minute. A value of 0 disables limiting.
+    """
+
+    def __init__(self, requests_per_minute: float = 0):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+def is_retryable(error: Exception) -> bool:
+    """429 (rate limit), 5xx/529 (overloaded) and connection errors are worth retrying."""
+    if isinstance(error, (anthropic.RateLimitError, anthropic.APIConnectionError)):
+        return True
+    if isinstance(error, anthropic.APIStatusError):
+        return error.status_code >= 500
+    return False
+
+
+def retry_delay(error: Exception, attempt: int, base_delay: float, max_delay: float) -> float:
+    """Honors the server's retry-after header, otherwise exponential backoff with jitter."""
+    response = getattr(error, "response", None)
+    if response is not None:
+        retry_after = response.headers.get("retry-after")
+        try:
+            if retry_after is not None:
+                return min(float(retry_after), max_delay)
+        except ValueError:
+            pass
+    delay = min(base_delay * (2 ** (attempt - 1)), max_delay)
+    return delay * (0.5 + random.random() / 2)
+
+
+def layout_request(
+    prompt: Union[str, Sequence[PromptSegment]], min_cacheable_tokens: int = MIN_CACHEABLE_TOKENS
+) -> Dict[str, Any]:
+    """
+    Lays a prompt out as the 'system' and 'messages' of a Messages request.
+    The leading static segments become the system prompt; the others the
+    user message. The system prompt and every segment marked 'cache' end
+    with a cache_control marker (the API accepts up to 4), unless the
+    prefix up to that point is estimated below min_cacheable_tokens.
+    """
+    segments = [PromptSegment(prompt)] if isinstance(prompt, str) else list(prompt)
+    split = next((i for i, segment in enumerate(segments) if not segment.static), len(segments))
+    request: Dict[str, Any] = {}
+    # Estimated tokens of everything before the current block
+    prefix_tokens = 0
+    if split:
+        system = "\n\n".join(segment.text for segment in segments[:split])
+        prefix_tokens = estimate_tokens(system)
+        request["system"] = [{"type": "text", "text": system}]
+        if prefix_tokens >= min_cacheable_tokens:
+            request["system"][0]["cache_control"] = CACHE_CONTROL
+
+    # Consecutive segments share a text block, up to the next cache marker
+    blocks: List[Dict[str, Any]] = []
+    pending: List[str] = []
+    for segment in segments[split:]:
+        pending.append(segment.text)
+        if not segment.cache:
+            continue
+        text = "\n\n".join(pending)
+        if prefix_tokens + estimate_tokens(text) >= min_cacheable_tokens:
+            prefix_tokens += estimate_tokens(text)
+            blocks.append({"type": "text", "text": text, "cache_control": CACHE_CONTROL})
+            pending = []
+    if pending:
+        blocks.append({"type": "text", "text": "\n\n".join(pending)})
+    content: Union[str, List[Dict[str, Any]]] = blocks
+    if len(blocks) == 1 and "cache_control" not in blocks[0]:
+        content = blocks[0]["text"]
+    request["messages"] = [{"role": "user", "content": content}]
+    return request
+
+
+def create_client(api_key: Optional[str]) -> AsyncAnthropic:
+    """
+    Creates the async client. The SDK's own retries are disabled because
+    run_inference() applies the host's retry policy.
+    """
+    return AsyncAnthropic(api_key=api_key, max_retries=0)
+
+
+async def run_inference(
+    client: AsyncAnthropic,
+    prompt: Union[str, Sequence[PromptSegment]],
+    settings: LLMSettings,
+    limiter: Optional[RateLimiter] = None,
+    max_retries: int = 5,
+    base_delay: float = 1.0,
+    max_delay: float = 60.0,
+    cache: Optional[InferenceCache] = None,
+    bypass_cache: bool = False,
+    stream: bool = False,
+    on_text: Optional[Callable[[str], None]] = None,
+) -> InferenceResult:
+    """
+    Sends the prompt to the Messages API and returns the report text.
+    With a cache, an identical earlier request is answered from disk
+    without calling the LLM.
+
+    A streamed request is only retried while no text has reached on_text,
+    so the callback never sees the same text twice.
+
+    Args:
+        client: Async Anthropic client
+        prompt: Fully assembled prompt, or its segments (see layout_request)
+        settings: Model parameters
+        limiter: Shared rate limiter (every attempt takes a slot)
+        max_retries: Retries after the first attempt on 429/5xx errors
+        base_delay: First backoff delay in seconds
+        max_delay: Upper bound of a single backoff delay
+        cache: Persistent result cache (None = no caching)
+        bypass_cache: Skip the cache lookup (the fresh result is still stored)
+        stream: Read the response as a stream of server-sent events
+        on_text: Called with each piece of text as it arrives (cached and
+            non-streamed reports arrive in one piece)
+
+    Raises:
+        anthropic.APIError: When the request fails for good
+    """
+    start = time.perf_counter()
+    layout = layout_request(prompt)
+    cache_key = settings.fingerprint(json.dumps(layout, sort_keys=True)) if cache is not None else None
+    if cache is not None and not bypass_cache:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            if on_text is not None:
+                on_text(cached.text)
+            return InferenceResult(
+                text=cached.text,
+                attempts=0,
+                seconds=time.perf_counter() - start,
+                input_tokens=cached.input_tokens,
+                output_tokens=cached.output_tokens,
+                cache_read_input_tokens=cached.cache_read_input_tokens,
+                cache_creation_input_tokens=cached.cache_creation_input_tokens,
+                cached=True,
+            )
+
+    first_token: Optional[float] = None
+
+    def receive(text: str) -> None:
+        nonlocal first_token
+        if first_token is None:
+            first_token = time.perf_counter()
+        if on_text is not None:
+            on_text(text)
+
+    request = {
+        "model": settings.model,
+        "max_tokens": settings.max_tokens,
+        "temperature": settings.temperature,
+        **layout,
+    }
+    attempt = 0
+    while True:
+        attempt += 1
+        if limiter is not None:
+            with span("inference.rate_limit"):
+                await limiter.acquire()
+        try:
+            with span("inference.request", attempt=attempt, model=settings.model, stream=stream) as attrs:
+                if stream:
+                    async with client.messages.stream(**request) as events:
+                        async for text in events.text_stream:
+                            receive(text)
+                        message = await events.get_final_message()
+                    if first_token is not None:
+                        attrs["ttft_ms"] = round((first_token - start) * 1000, 3)
+                else:
+                    message = await client.messages.create(**request)
+        except Exception as e:
+            if attempt > max_retries or not is_retryable(e) or first_token is not None:
+                raise
+            delay = retry_delay(e, attempt, base_delay, max_delay)
+            print(f"⏳ HOST: LLM request failed ({e.__class__.__name__}), retry {attempt}/{max_retries} in {delay:.1f}s")
+            with span("inference.backoff", seconds=round(delay, 3)):
+                await asyncio.sleep(delay)
+            continue
+
+        text = "".join(block.text for block in message.content if block.type == "text")
+        if not stream and on_text is not None:
+            on_text(text)
+        usage = getattr(message, "usage", None)
+        result = InferenceResult(
+            text=text,
+            attempts=attempt,
+            seconds=time.perf_counter() - start,
+            input_tokens=getattr(usage, "input_tokens", None),
+            output_tokens=getattr(usage, "output_tokens", None),
+            cache_read_input_tokens=getattr(usage, "cache_read_input_tokens", None),
+            cache_creation_input_tokens=getattr(usage, "cache_creation_input_tokens", None),
+            ttft_seconds=first_token - start if first_token is not None else None,
+        )
+        if cache is not None:
+            cache.put(
+                cache_key, result.text, result.input_tokens, result.output_tokens,
+                result.cache_read_input_tokens, result.cache_creation_input_tokens,
+            )
+        return result
@@ -0,0 +1,163 @@
+"""
+Inference Result Cache
+
+Persists LLM reports on disk, keyed by a fingerprint of the model name,
+the request parameters and the assembled prompt. Since the host runs at
+temperature 0, an unchanged prompt gets the cached report back and the
+LLM call is skipped entirely.
+
+Entries are evicted least-recently-used first once the cache grows past
+its size budget, and optionally expire after a TTL.
+"""
+
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# Bump to invalidate every entry written by an older cache format
+CACHE_FORMAT_VERSION = 1
+
+
+@dataclass
+class CachedReport:
+    """A report read back from the cache."""
+    text: str
+    created_at: float
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    cache_read_input_tokens: Optional[int] = None
+    cache_creation_input_tokens: Optional[int] = None
+
+
+def prompt_fingerprint(model: str, params: Dict[str, Any], prompt: str) -> str:
+    """Hashes everything that determines the LLM output into a cache key."""
+    payload = json.dumps(
+        {"version": CACHE_FORMAT_VERSION, "model": model, "params": params, "prompt": prompt},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class InferenceCache:
+    """
+    Size-bounded LRU cache of reports, one JSON file per entry.
+
+    Args:
+        directory: Folder that holds the entries
+        max_bytes: Size budget; least recently used entries are evicted past it
+        ttl_seconds: Entries older than this are treated as misses (None = never expire)
+    """
+
+    def __init__(self, directory: Path, max_bytes: int = 256 * 1024 * 1024, ttl_seconds: Optional[float] = None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._sizes: Dict[Path, int] = {
+            path: path.stat().st_size for path in self.directory.glob("*/*.json")
+        }
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(self._sizes.values())
+
+    def _entry_path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[CachedReport]:
+        """Returns the cached report for a key, or None on a miss."""
+        path = self._entry_path(key)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        if self.ttl_seconds is not None and time.time() - data["created_at"] > self.ttl_seconds:
+            self._remove(path)
+            self.expired += 1
+            self.misses += 1
+            return None
+
+        # Reading an entry makes it the most recently used one
+        os.utime(path)
+        self.hits += 1
+        return CachedReport(
+            text=data["text"],
+            created_at=data["created_at"],
+            input_tokens=data.get("input_tokens"),
+            output_tokens=data.get("output_tokens"),
+            cache_read_input_tokens=data.get("cache_read_input_tokens"),
+            cache_creation_input_tokens=data.get("cache_creation_input_tokens"),
+        )
+
+    def put(
+        self,
+        key: str,
+        text: str,
+        input_tokens: Optional[int] = None,
+        output_tokens: Optional[int] = None,
+        cache_read_input_tokens: Optional[int] = None,
+        cache_creation_input_tokens: Optional[int] = None,
+    ) -> None:
+        """Stores a report, then evicts LRU entries until the cache fits its budget."""
+        path = self._entry_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        body = json.dumps({
+            "created_at": time.time(),
+            "text": text,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "cache_read_input_tokens": cache_read_input_tokens,
+            "cache_creation_input_tokens": cache_creation_input_tokens,
+        })
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(body, encoding="utf-8")
+        os.replace(tmp_path, path)
+        self._sizes[path] = path.stat().st_size
+        self._evict()
+
+    def _remove(self, path: Path) -> None:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        self._sizes.pop(path, None)
+
+    def _evict(self) -> None:
+        total = self.total_bytes
+        if total <= self.max_bytes:
+            return
+
+        def last_used(path: Path) -> float:
+            try:
+                return path.stat().st_mtime
+            except FileNotFoundError:
+                return 0.0
+
+        for path in sorted(self._sizes, key=last_used):
+            if total <= self.max_bytes:
+                break
+            total -= self._sizes[path]
+            self._remove(path)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._sizes),
+            "bytes": self.total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
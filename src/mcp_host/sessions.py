@@ -0,0 +1,159 @@
+"""
+Server Sessions
+
+Every analysis needs an MCP session with the server. Starting server.py as a
+stdio subprocess pays Python startup, the imports, a git pull and a cold
+parse of the models each time. When a daemon is running
+(python server.py --daemon), the host connects to its Unix socket instead
+and finds the caches already warm; otherwise it falls back to a stdio
+subprocess. A SessionPool keeps its session open, so the analyses of one
+host process share a single connection.
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+from contextlib import AsyncExitStack
+from pathlib import Path
+from typing import Optional
+
+import httpx
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from mcp.client.streamable_http import streamable_http_client
+
+from tracing import span
+
+# Same default as the server's config.DAEMON_SOCKET
+DEFAULT_DAEMON_SOCKET = Path(
+    os.environ.get("MCP_DAEMON_SOCKET")
+    or (
+        Path(os.environ["XDG_RUNTIME_DIR"]) / "mcp-context-server"
+        if os.environ.get("XDG_RUNTIME_DIR")
+        else Path(tempfile.gettempdir()) / f"mcp-context-server-{os.getuid()}"
+    ) / "server.sock"
+)
+# Requests go through the socket: the host part only fills the Host header
+DAEMON_URL = "http://localhost/mcp"
+# Seconds to wait for a response from the daemon (models of large repositories take a while)
+DAEMON_READ_TIMEOUT = 300.0
+
+
+async def daemon_listening(socket_path: Path) -> bool:
+    """Whether a daemon accepts connections on a Unix socket."""
+    if not socket_path.exists():
+        return False
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_unix_connection(str(socket_path)), timeout=1.0)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    writer.close()
+    return True
+
+
+class SessionPool:
+    """
+    Opens one MCP session on first use, on the daemon when one serves the
+    wanted repositories and over stdio otherwise, and keeps it open until
+    close(). The pool must be opened and closed by the same task; the
+    session itself can be shared by concurrent tasks.
+    """
+
+    def __init__(
+        self,
+        server_params: StdioServerParameters,
+        repos_config: Optional[Path] = None,
+        socket_path: Path = DEFAULT_DAEMON_SOCKET,
+        use_daemon: bool = True,
+    ):
+        """
+        Args:
+            server_params: How to start the server when no daemon can be used
+            repos_config: Registry config file the server must be running with
+                (None = the single default repository)
+            socket_path: Unix socket of the daemon
+            use_daemon: Try the daemon before starting a stdio server
+        """
+        self.server_params = server_params
+        self.repos_config = str(repos_config.resolve()) if repos_config else None
+        self.socket_path = socket_path
+        self.use_daemon = use_daemon
+        self.transport: Optional[str] = None
+        self.sessions_served = 0
+        self._session: Optional[ClientSession] = None
+        self._stack: Optional[AsyncExitStack] = None
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> ClientSession:
+        """Returns the open session, connecting on the first call."""
+        async with self._lock:
+            if self._session is None:
+                self._session = await self._open()
+            self.sessions_served += 1
+            return self._session
+
+    async def close(self) -> None:
+        """Closes the session (a daemon keeps running, a stdio server exits)."""
+        async with self._lock:
+            if self._stack is not None:
+                await self._stack.aclose()
+            self._session = None
+            self._stack = None
+            self.transport = None
+
+    async def __aenter__(self) -> "SessionPool":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def _open(self) -> ClientSession:
+        if self.use_daemon and await daemon_listening(self.socket_path):
+            stack = AsyncExitStack()
+            try:
+                session = await self._connect_daemon(stack)
+                reason = await self._mismatch(session)
+            except Exception as e:
+                reason = f"is unreachable ({e})"
+            if reason is None:
+                print(f"🔌 HOST: Connected to the server daemon at {self.socket_path}")
+                self._stack, self.transport = stack, "daemon"
+                return session
+            await stack.aclose()
+            print(f"⚠️ HOST: The daemon at {self.socket_path} {reason}, starting a stdio server instead.")
+
+        stack = AsyncExitStack()
+        try:
+            read, write = await stack.enter_async_context(stdio_client(self.server_params))
+            session = await stack.enter_async_context(ClientSession(read, write))
+            with span("mcp.initialize", transport="stdio"):
+                await session.initialize()
+        except BaseException:
+            await stack.aclose()
+            raise
+        self._stack, self.transport = stack, "stdio"
+        return session
+
+    async def _connect_daemon(self, stack: AsyncExitStack) -> ClientSession:
+        http_client = await stack.enter_async_context(httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(uds=str(self.socket_path)),
+            timeout=httpx.Timeout(30.0, read=DAEMON_READ_TIMEOUT),
+        ))
+        read, write, _ = await stack.enter_async_context(streamable_http_client(DAEMON_URL, http_client=http_client))
+        session = await stack.enter_async_context(ClientSession(read, write))
+        with span("mcp.initialize", transport="daemon"):
+            await session.initialize()
+        return session
+
+    async def _mismatch(self, session: ClientSession) -> Optional[str]:
+        """Why the daemon can't serve this host, or None when it can."""
+        result = await session.call_tool("daemon_info", {})
+        if result.isError:
+            return "doesn't identify itself"
+        info = json.loads(result.content[0].text)
+        if info["repos_config"] != self.repos_config:
+            served = info["repos_config"] or "the default repository"
+            wanted = self.repos_config or "the default repository"
+            return f"serves {served}, not {wanted}"
+        return None
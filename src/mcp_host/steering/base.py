@@ -1,5 +1,26 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from dataclasses import dataclass
+from typing import Dict, Any, List, Sequence
+
+@dataclass(frozen=True)
+class PromptSegment:
+    """
+    One ordered piece of a prompt.
+    Static segments are the same for every repository and every run (the
+    policy's instructions), so they make a prefix the provider can cache.
+    Dynamic segments carry the inputs of one analysis; 'cache' marks one
+    that several prompts share (e.g. the roster of a split analysis).
+    """
+    text: str
+    static: bool = False
+    cache: bool = False
+
+# A prompt is its segments, static ones first
+Prompt = List[PromptSegment]
+
+def render_prompt(segments: Sequence[PromptSegment]) -> str:
+    """Flattens the segments into the text the model reads."""
+    return "\n\n".join(segment.text for segment in segments)
 
 class SteeringPolicy(ABC):
     """
@@ -18,4 +39,20 @@ class SteeringPolicy(ABC):
         """
         Composes the cognitive task by injecting the constraints.
         """
-        pass
\ No newline at end of file
+        pass
+
+    def assemble_segments(self, domain_model: Dict[str, Any], intent_context: str) -> Prompt:
+        """
+        Composes the cognitive task as ordered segments, the static ones
+        first. Policies without a layout return their assembled prompt as
+        a single dynamic segment.
+        """
+        return [PromptSegment(self.assemble_prompt(domain_model, intent_context))]
+
+    def assemble_prompts(self, domain_model: Dict[str, Any], intent_context: str, token_budget: int) -> List[Prompt]:
+        """
+        Composes the cognitive task as one or more prompts that each fit
+        the token budget. Policies that cannot split their task return
+        the single assembled prompt.
+        """
+        return [self.assemble_segments(domain_model, intent_context)]
@@ -0,0 +1,128 @@
+import math
+import re
+from typing import Any, Dict, List
+
+from .constraints import workflow_boundary_lines
+
+# Rough size of a token for English text and YAML-ish identifiers.
+# Good enough to stay under the context window without calling a tokenizer.
+CHARS_PER_TOKEN = 4
+
+_HEADING = re.compile(r"^#{1,6}\s")
+_FENCE = re.compile(r"^\s*(```|~~~)")
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimates the token count of a text."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _pack(pieces: List[Any], costs: List[int], budget: int) -> List[List[Any]]:
+    """Greedily groups consecutive pieces so that each group fits the budget."""
+    groups: List[List[Any]] = []
+    current: List[Any] = []
+    used = 0
+    for piece, cost in zip(pieces, costs):
+        if current and used + cost > budget:
+            groups.append(current)
+            current, used = [], 0
+        current.append(piece)
+        used += cost
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _split_workflow(filename: str, wf_data: Dict[str, Any], budget: int) -> List[Dict[str, Any]]:
+    """Splits an oversized workflow into parts that keep the same name but hold fewer jobs."""
+    jobs = list(wf_data.get("jobs", {}).items())
+    if len(jobs) <= 1:
+        return [wf_data]
+    costs = [
+        estimate_tokens("\n".join(workflow_boundary_lines(filename, {**wf_data, "jobs": dict([job])})))
+        for job in jobs
+    ]
+    return [{**wf_data, "jobs": dict(group)} for group in _pack(jobs, costs, budget)]
+
+
+def split_domain_model(domain_model: Dict[str, Any], budget: int) -> List[Dict[str, Any]]:
+    """
+    Splits the domain model into chunks whose structural boundaries fit the
+    token budget. Workflows are never mixed up: a chunk holds whole workflows,
+    and only a workflow too large on its own is split, by job.
+
+    Returns:
+        Domain model dicts with the same shape as the input
+    """
+    workflows = domain_model.get("workflows", {})
+    if not workflows:
+        return [domain_model]
+
+    pieces = []
+    costs = []
+    for filename, wf_data in workflows.items():
+        cost = estimate_tokens("\n".join(workflow_boundary_lines(filename, wf_data)))
+        parts = _split_workflow(filename, wf_data, budget) if cost > budget else [wf_data]
+        for part in parts:
+            pieces.append((filename, part))
+            costs.append(cost if part is wf_data else estimate_tokens("\n".join(workflow_boundary_lines(filename, part))))
+
+    chunks = []
+    for group in _pack(pieces, costs, budget):
+        chunk_workflows: Dict[str, Any] = {}
+        for filename, part in group:
+            if filename in chunk_workflows:
+                # Two parts of one split workflow landed in the same chunk
+                chunk_workflows[filename] = {
+                    **part, "jobs": {**chunk_workflows[filename]["jobs"], **part["jobs"]}
+                }
+            else:
+                chunk_workflows[filename] = part
+        chunks.append({**domain_model, "workflows": chunk_workflows})
+    return chunks
+
+
+def markdown_sections(text: str) -> List[str]:
+    """Splits a markdown document before each heading (headings in code blocks don't count)."""
+    sections: List[List[str]] = [[]]
+    in_fence = False
+    for line in text.splitlines(keepends=True):
+        if _FENCE.match(line):
+            in_fence = not in_fence
+        elif not in_fence and _HEADING.match(line) and sections[-1]:
+            sections.append([])
+        sections[-1].append(line)
+    return ["".join(lines) for lines in sections if lines]
+
+
+def _split_oversized(section: str, budget: int) -> List[str]:
+    """Splits a section that doesn't fit the budget by paragraph, then by line."""
+    paragraphs = re.split(r"(?<=\n\n)", section)
+    pieces = []
+    for paragraph in paragraphs:
+        if estimate_tokens(paragraph) > budget:
+            pieces.extend(paragraph.splitlines(keepends=True))
+        else:
+            pieces.append(paragraph)
+    return ["".join(group) for group in _pack(pieces, [estimate_tokens(p) for p in pieces], budget)]
+
+
+def split_intent(intent_text: str, budget: int) -> List[str]:
+    """
+    Splits the intent document into chunks that fit the token budget.
+    Chunks follow the markdown sections, so a claim is never cut from the
+    heading it is made under.
+
+    Returns:
+        Chunks that, concatenated, give back the original document
+    """
+    if estimate_tokens(intent_text) <= budget:
+        return [intent_text]
+
+    pieces = []
+    for section in markdown_sections(intent_text):
+        if estimate_tokens(section) > budget:
+            pieces.extend(_split_oversized(section, budget))
+        else:
+            pieces.append(section)
+    return ["".join(group) for group in _pack(pieces, [estimate_tokens(p) for p in pieces], budget)]
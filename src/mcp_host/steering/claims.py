@@ -0,0 +1,289 @@
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Set, Tuple
+
+from .budget import estimate_tokens
+from .findings import Finding
+
+# owner/repo[/path]@ref, e.g. actions/checkout@v4 or github/codeql-action/init@v3,
+# starting the line or after whitespace, an opening bracket, a quote or a backtick
+ACTION_REF = re.compile(r"(?<![^\s(\[{'\"`])([A-Za-z0-9][\w.-]*/[\w.-]+(?:/[\w.-]+)*)@([\w.-]*\w)")
+# A ref that is a domain name: 'team/ops@example.com' is an email address, not an action
+EMAIL_DOMAIN = re.compile(r"^[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}$")
+# ci.yml or .github/workflows/ci.yml (not the tail of another path)
+WORKFLOW_FILE = re.compile(r"(?<![\w./-])((?:\.github/workflows/)?)([\w.-]+\.ya?ml)\b")
+# A workflow noun right before or after a bare file name: "the ci.yml workflow", "workflow ci.yml"
+WORKFLOW_NOUN_BEFORE = re.compile(r"\bworkflows?(?:\s+file)?\s*[:`'\"]*\s*$", re.IGNORECASE)
+WORKFLOW_NOUN_AFTER = re.compile(r"^\s*[`'\"]*\s*workflows?\b", re.IGNORECASE)
+VERSION = re.compile(r"^v?(\d+(?:\.\d+)*)$")
+HEADING = re.compile(r"^#{1,6}\s")
+# Lines about what is no longer true: a missing entity there may be exactly what they say
+NEGATION = re.compile(
+    r"\b(?:no longer|not|never|don't|doesn't|didn't|removed|deprecated|replaced|migrated|"
+    r"used to|previously|formerly|instead of|dropped|stopped|legacy)\b",
+    re.IGNORECASE,
+)
+
+# Words that make a line a claim about the CI/CD system
+CLAIM_KEYWORDS = [
+    "workflow", "job", "action", "step", "pipeline", "runner", "matrix", "trigger",
+    "deploy", "release", "build", "test", "lint", "ci", "cd", "cron", "schedule",
+    "push", "pull request", "github", "uses", "runs-on", "needs",
+]
+
+
+class AhoCorasick:
+    """
+    Multi-pattern matcher: finds every occurrence of a set of words in one
+    pass over the text, whatever the number of words. Matching is
+    case-insensitive and only reports whole words.
+    """
+
+    def __init__(self, patterns: Dict[str, Any]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, Any]]] = [[]]
+        for pattern, value in patterns.items():
+            if pattern:
+                self._add(pattern.lower(), value)
+        self._build()
+
+    def _add(self, pattern: str, value: Any) -> None:
+        state = 0
+        for char in pattern:
+            if char not in self._goto[state]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._goto[state][char] = len(self._goto) - 1
+            state = self._goto[state][char]
+        self._out[state].append((len(pattern), value))
+
+    def _build(self) -> None:
+        # Breadth-first, so the failure state of a node is always computed first
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, int, Any]]:
+        """Yields (start, end, value) for every whole-word occurrence."""
+        lowered = text.lower()
+        state = 0
+        for index, char in enumerate(lowered):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for length, value in self._out[state]:
+                start, end = index - length + 1, index + 1
+                if _is_word_boundary(lowered, start - 1) and _is_word_boundary(lowered, end):
+                    yield start, end, value
+
+
+class WorkflowMentions:
+    """Finds the workflows a piece of intent talks about: by file, name, job id or action."""
+
+    def __init__(self, domain_model: Dict[str, Any]):
+        entities: Dict[str, Set[str]] = {}
+        for filename, wf_data in domain_model.get("workflows", {}).items():
+            names = {filename, filename.rsplit(".", 1)[0], wf_data.get("name")}
+            for job_id, job_data in wf_data.get("jobs", {}).items():
+                names.add(job_id)
+                references = [step.get("uses") for step in job_data.get("steps", [])]
+                references += [job_data.get("uses"), *job_data.get("expands_to", [])]
+                names.update((uses or "").partition("@")[0] for uses in references)
+            for name in names:
+                if name:
+                    entities.setdefault(name.lower(), set()).add(filename)
+        self._matcher = AhoCorasick(entities)
+        self._order = {filename: i for i, filename in enumerate(domain_model.get("workflows", {}))}
+
+    def find(self, text: str) -> List[str]:
+        """Returns the mentioned workflow files, in domain model order."""
+        found: Set[str] = set()
+        for _, _, filenames in self._matcher.finditer(text):
+            found.update(filenames)
+        return sorted(found, key=self._order.__getitem__)
+
+
+def _is_word_boundary(text: str, index: int) -> bool:
+    return index < 0 or index >= len(text) or not (text[index].isalnum() or text[index] in "_-")
+
+
+def _version_parts(ref: str) -> Tuple[str, ...]:
+    match = VERSION.match(ref)
+    return tuple(match.group(1).split(".")) if match else ()
+
+
+def _same_version(claimed: str, actual: str) -> bool:
+    """v4 and v4.1.2 name the same major version; v3 and v4 don't."""
+    a, b = _version_parts(claimed), _version_parts(actual)
+    shortest = min(len(a), len(b))
+    return a[:shortest] == b[:shortest]
+
+
+@dataclass
+class ClaimCheck:
+    """Outcome of the local pass over the intent document."""
+    findings: List[Finding] = field(default_factory=list)
+    residual_intent: str = ""
+    lines_total: int = 0
+    lines_ambiguous: int = 0
+    tokens_before: int = 0
+    tokens_after: int = 0
+
+
+class ClaimChecker:
+    """
+    Deterministic pre-pass of the Context Debt analysis.
+
+    Indexes the entities of the domain model (workflow files and names, job
+    ids, action refs) and checks the mechanical claims of the intent document
+    against them: a workflow file that doesn't exist is an Entity Mismatch,
+    an action pinned to another version is a Version Drift (except in
+    negated or historical lines, "no longer uses ...", which are left to
+    the LLM). A *.yml name only counts as a workflow file under
+    .github/workflows/ or right next to the word "workflow"; an action that
+    no workflow uses may still be real (a typo, an address), so both are
+    left to the LLM too.
+    Only lines whose references were all settled, and that make no other
+    claim about the CI/CD system, are dropped; every other line goes to the
+    LLM unchanged.
+    """
+
+    def __init__(self, domain_model: Dict[str, Any]):
+        self.workflow_files: Set[str] = set()
+        # action path -> {ref -> ["ci.yml:build", ...]}
+        self.actions: Dict[str, Dict[str, List[str]]] = {}
+        entities: Dict[str, str] = {}
+
+        for filename, wf_data in domain_model.get("workflows", {}).items():
+            self.workflow_files.add(filename)
+            entities[filename] = filename
+            if wf_data.get("name"):
+                entities[wf_data["name"]] = filename
+            for job_id, job_data in wf_data.get("jobs", {}).items():
+                entities[job_id] = f"{filename}:{job_id}"
+                # Direct references, then those reached through composite actions and reusable workflows
+                references = [step.get("uses") for step in job_data.get("steps", [])]
+                references += [job_data.get("uses"), *job_data.get("expands_to", [])]
+                for uses in references:
+                    path, _, ref = (uses or "").partition("@")
+                    if path and ref:
+                        self.actions.setdefault(path.lower(), {}).setdefault(ref, []).append(f"{filename}:{job_id}")
+
+        self.entities = AhoCorasick(entities)
+        self.keywords = AhoCorasick({keyword: keyword for keyword in CLAIM_KEYWORDS})
+
+    def _check_action(self, claim: str, path: str, ref: str, negated: bool = False) -> Tuple[bool, List[Finding]]:
+        """
+        Returns (settled, findings) for one owner/repo@ref reference. An
+        action no workflow uses, or a mismatch in a negated or historical
+        line, is left to the LLM.
+        """
+        known = self.actions.get(path.lower())
+        if known is None:
+            return False, []
+        if ref in known:
+            return True, []
+        versioned = [actual for actual in known if _version_parts(actual)]
+        if not _version_parts(ref) or len(versioned) < len(known):
+            # Branches and SHA pins can't be compared mechanically
+            return False, []
+        if any(_same_version(ref, actual) for actual in versioned):
+            return True, []
+        if negated:
+            return False, []
+        used = "; ".join(f"'{path}@{actual}' in {', '.join(where)}" for actual, where in known.items())
+        return True, [Finding(
+            type="Version Drift",
+            claim=claim,
+            reality=f"The workflows use {used}",
+            severity="Medium",
+        )]
+
+    def _check_workflow_file(
+        self, claim: str, line: str, match: "re.Match[str]", negated: bool = False
+    ) -> Tuple[bool, List[Finding]]:
+        """Returns (settled, findings) for one workflow file reference."""
+        prefix, filename = match.group(1), match.group(2)
+        if filename in self.workflow_files:
+            return True, []
+        # A bare *.yml may be any config file; only trust explicit workflow references
+        named = WORKFLOW_NOUN_BEFORE.search(line[:match.start()]) or WORKFLOW_NOUN_AFTER.match(line[match.end():])
+        if negated or not (prefix or named):
+            return False, []
+        return True, [Finding(
+            type="Entity Mismatch",
+            claim=claim,
+            reality=f"No workflow file '{filename}' exists (known: {sorted(self.workflow_files)})",
+            severity="High",
+        )]
+
+    def _is_claim(self, text: str) -> bool:
+        return any(True for _ in self.keywords.finditer(text)) or any(True for _ in self.entities.finditer(text))
+
+    def check(self, intent_text: str) -> ClaimCheck:
+        """
+        Checks the intent document line by line.
+
+        Returns:
+            The certain findings, plus the intent without the lines settled
+            locally (the others under their section headings) for the LLM
+        """
+        result = ClaimCheck(tokens_before=estimate_tokens(intent_text))
+        kept: List[str] = []
+        pending_heading = None
+
+        for line in intent_text.splitlines():
+            if HEADING.match(line):
+                pending_heading = line
+                continue
+            if not line.strip():
+                continue
+            result.lines_total += 1
+            claim = line.strip().lstrip("-*> ").strip()
+            remainder = line
+            references = 0
+            ambiguous = False
+            negated = NEGATION.search(line) is not None
+            line_findings: List[Finding] = []
+
+            for match in ACTION_REF.finditer(line):
+                if EMAIL_DOMAIN.match(match.group(2)):
+                    continue
+                references += 1
+                settled, findings = self._check_action(claim, match.group(1), match.group(2), negated)
+                line_findings.extend(findings)
+                ambiguous = ambiguous or not settled
+                remainder = remainder.replace(match.group(0), " ")
+            for match in WORKFLOW_FILE.finditer(line):
+                if match.group(0) not in remainder:
+                    continue
+                references += 1
+                settled, findings = self._check_workflow_file(claim, line, match, negated)
+                line_findings.extend(findings)
+                ambiguous = ambiguous or not settled
+                if settled:
+                    remainder = remainder.replace(match.group(0), " ")
+            result.findings.extend(line_findings)
+
+            # A line without a reference was not settled here; whatever the
+            # settled references leave may still be a claim (jobs, runners, steps)
+            if not references or ambiguous or self._is_claim(remainder):
+                result.lines_ambiguous += 1
+                if pending_heading is not None:
+                    kept.append(pending_heading)
+                    pending_heading = None
+                kept.append(line)
+
+        result.residual_intent = "\n".join(kept)
+        result.tokens_after = estimate_tokens(result.residual_intent)
+        return result
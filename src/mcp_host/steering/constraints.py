@@ -1,5 +1,31 @@
 from typing import Dict, Any, List
 
+def workflow_boundary_lines(filename: str, wf_data: Dict[str, Any]) -> List[str]:
+    """
+    Lists one workflow, its jobs and the actions each job uses.
+    """
+    lines = []
+    wf_name = wf_data.get("name", "Unnamed")
+    lines.append(f"  - Workflow File: '{filename}' (ID: {wf_name})")
+
+    # 2. Jobs Boundary
+    jobs = wf_data.get("jobs", {})
+    job_ids = list(jobs.keys())
+    lines.append(f"    -> Allowed Jobs in '{filename}': {job_ids}")
+
+    # 3. Steps/Actions Boundary (Optional deep dive)
+    for j_id, j_data in jobs.items():
+        steps = j_data.get("steps", [])
+        uses = [s.get("uses") for s in steps if s.get("uses")]
+        if j_data.get("uses"):
+            lines.append(f"       -> '{j_id}' calls the reusable workflow: {j_data['uses']}")
+        if uses:
+            lines.append(f"       -> Valid Actions in '{j_id}': {uses}")
+        # Actions run through local composite actions and reusable workflows
+        if j_data.get("expands_to"):
+            lines.append(f"       -> Also reached through them in '{j_id}': {j_data['expands_to']}")
+    return lines
+
 def derive_structural_boundaries(domain_model: Dict[str, Any]) -> str:
     """
     Analyzes the 'cicd://model' and generates an explicit list of existing entities.
@@ -17,22 +43,61 @@ def derive_structural_boundaries(domain_model: Dict[str, Any]) -> str:
     boundaries.append(f"RESTRICTION: Only the following {len(workflows)} workflows exist:")
     
     for filename, wf_data in workflows.items():
-        wf_name = wf_data.get("name", "Unnamed")
-        boundaries.append(f"  - Workflow File: '{filename}' (ID: {wf_name})")
-        
-        # 2. Jobs Boundary
-        jobs = wf_data.get("jobs", {})
-        job_ids = list(jobs.keys())
-        boundaries.append(f"    -> Allowed Jobs in '{filename}': {job_ids}")
-        
-        # 3. Steps/Actions Boundary (Optional deep dive)
-        for j_id, j_data in jobs.items():
-            steps = j_data.get("steps", [])
-            uses = [s.get("uses") for s in steps if s.get("uses")]
-            if uses:
-                boundaries.append(f"       -> Valid Actions in '{j_id}': {uses}")
+        boundaries.extend(workflow_boundary_lines(filename, wf_data))
 
     boundaries.append("================================================")
     boundaries.append("RULE: Any assertion referencing a workflow, job, or action NOT listed above is FALSE.")
     
-    return "\n".join(boundaries)
\ No newline at end of file
+    return "\n".join(boundaries)
+
+def derive_entity_roster(domain_model: Dict[str, Any]) -> str:
+    """
+    Lists every workflow and job without their actions.
+    Much smaller than the full boundaries, so each chunk of a split
+    analysis can still tell an unknown entity from one in another chunk.
+    """
+    roster = []
+    workflows = domain_model.get("workflows", {})
+    roster.append(f"ENTITY ROSTER: The repository has exactly these {len(workflows)} workflows and their jobs:")
+    for filename, wf_data in workflows.items():
+        wf_name = wf_data.get("name", "Unnamed")
+        roster.append(f"  - '{filename}' (ID: {wf_name}): {list(wf_data.get('jobs', {}).keys())}")
+    return "\n".join(roster)
+
+def derive_roster_boundaries(roster: str) -> str:
+    """
+    Shared part of the boundaries of a split analysis: the full entity
+    roster, the same for every chunk of a repository.
+    """
+    boundaries = []
+    boundaries.append("=== STRUCTURAL BOUNDARIES (SOURCE OF TRUTH, SPLIT INTO SLICES) ===")
+    boundaries.append(roster)
+    boundaries.append("RULE: Any assertion referencing a workflow or job NOT in the ENTITY ROSTER is FALSE.")
+    return "\n".join(boundaries)
+
+def derive_slice_detail(domain_slice: Dict[str, Any], index: int, total: int) -> str:
+    """
+    Own part of the boundaries of one chunk: the actions of the workflows
+    that belong to this chunk.
+    """
+    boundaries = []
+    workflows = domain_slice.get("workflows", {})
+    boundaries.append(f"SLICE {index}/{total} DETAIL: Actions of the following {len(workflows)} workflows (other slices cover the rest):")
+    for filename, wf_data in workflows.items():
+        boundaries.extend(workflow_boundary_lines(filename, wf_data))
+
+    boundaries.append("================================================")
+    boundaries.append("RULE: Only judge action references against the workflows detailed in this slice; ignore claims about actions of other workflows.")
+
+    return "\n".join(boundaries)
+
+def derive_roster_only_detail() -> str:
+    """
+    Own part of the boundaries of a chunk whose documentation mentions no
+    known workflow: nothing is detailed, it is judged against the roster.
+    """
+    boundaries = []
+    boundaries.append("NO SLICE DETAIL: This documentation mentions none of the workflows above.")
+    boundaries.append("================================================")
+    boundaries.append("RULE: Only judge workflow and job references against the ENTITY ROSTER; ignore claims about actions.")
+    return "\n".join(boundaries)
@@ -1,6 +1,40 @@
-from typing import Dict, Any
-from .base import SteeringPolicy
-from .constraints import derive_structural_boundaries
+from typing import Dict, Any, List
+from .base import Prompt, PromptSegment, SteeringPolicy, render_prompt
+from .budget import estimate_tokens, split_domain_model, split_intent
+from .claims import WorkflowMentions
+from .constraints import (
+    derive_entity_roster, derive_roster_boundaries, derive_roster_only_detail, derive_slice_detail,
+    derive_structural_boundaries
+)
+
+# Smallest chunk worth sending when the fixed part of the prompt eats most of the budget
+MIN_CHUNK_TOKENS = 512
+
+# Interpretation policy (System Instructions), identical for every analysis
+POLICY_INSTRUCTIONS = """Act as a Structural Consistency Auditor.
+
+OBJECTIVE: Detect "Context Debt Smells" by validating the DECLARED INTENT against the STRUCTURAL BOUNDARIES.
+
+INPUT DATA:
+1. [INTENT] Declarative documentation (agents.md), given under DOCUMENTATION TO ANALYZE:
+   Represents what humans *claim* exists.
+
+2. [REALITY] Structural Boundaries (Derived from cicd://model), given under STRUCTURAL BOUNDARIES:
+   Represents the ONLY entities that *actually* exist.
+
+ANALYSIS POLICY (STRICT):
+1. GROUNDING: You cannot assume the existence of any workflow, job, or step that is not explicitly defined in the Structural Boundaries.
+2. VERIFIABILITY: If the Intent mentions a workflow "X" and "X" is not in the Boundaries -> This is a Context Debt Smell (Hallucinated Entity).
+3. OBSOLESCENCE: If the Intent claims to use Action "v1" but the Boundary shows "v2" -> This is a Context Debt Smell (Drift).
+
+OUTPUT FORMAT:
+Generate a list of verifiable violations. Do not summarize the code. Only report discrepancies where the Intent violates the Structural Boundaries.
+
+Format:
+- [TYPE: Entity Mismatch | Version Drift | Logic Hallucination]
+  - Claim: "Quote from agents.md"
+  - Reality: "Reference to Structural Boundary"
+  - Severity: High/Medium"""
 
 class ContextDebtPolicy(SteeringPolicy):
     """
@@ -16,34 +50,70 @@ class ContextDebtPolicy(SteeringPolicy):
         return derive_structural_boundaries(domain_model)
 
     def assemble_prompt(self, domain_model: Dict[str, Any], intent_context: str) -> str:
+        return render_prompt(self.assemble_segments(domain_model, intent_context))
+
+    def assemble_segments(self, domain_model: Dict[str, Any], intent_context: str) -> Prompt:
         # 1. Get the rigid boundaries
         structural_constraints = self.compute_constraints(domain_model)
 
-        # 2. Define the interpretation policy (System Instructions)
-        return f"""
-Act as a Structural Consistency Auditor.
+        # 2. Put them after the interpretation policy (System Instructions)
+        return self._segments([PromptSegment(structural_constraints)], intent_context)
 
-OBJECTIVE: Detect "Context Debt Smells" by validating the DECLARED INTENT against the STRUCTURAL BOUNDARIES.
+    def assemble_prompts(self, domain_model: Dict[str, Any], intent_context: str, token_budget: int) -> List[Prompt]:
+        # Small repositories keep the single, unchanged prompt
+        prompt = self.assemble_segments(domain_model, intent_context)
+        if estimate_tokens(render_prompt(prompt)) <= token_budget:
+            return [prompt]
 
-INPUT DATA:
-1. [INTENT] Declarative documentation (agents.md): 
-   Represents what humans *claim* exists.
+        # Map step: every chunk knows the whole roster of workflows and jobs,
+        # but only details the actions of its own workflows
+        return self._assemble_slices(domain_model, derive_entity_roster(domain_model), intent_context, token_budget)
 
-2. [REALITY] Structural Boundaries (Derived from cicd://model):
-   Represents the ONLY entities that *actually* exist.
-   {structural_constraints}
+    def assemble_slice_prompts(
+        self, domain_model: Dict[str, Any], filenames: List[str], intent_context: str, token_budget: int
+    ) -> List[Prompt]:
+        # Incremental analysis: the whole roster, but only the named workflows in detail
+        workflows = domain_model.get("workflows", {})
+        detailed = {**domain_model, "workflows": {f: workflows[f] for f in filenames if f in workflows}}
+        return self._assemble_slices(detailed, derive_entity_roster(domain_model), intent_context, token_budget)
 
-ANALYSIS POLICY (STRICT):
-1. GROUNDING: You cannot assume the existence of any workflow, job, or step that is not explicitly defined in the Structural Boundaries.
-2. VERIFIABILITY: If the Intent mentions a workflow "X" and "X" is not in the Boundaries -> This is a Context Debt Smell (Hallucinated Entity).
-3. OBSOLESCENCE: If the Intent claims to use Action "v1" but the Boundary shows "v2" -> This is a Context Debt Smell (Drift).
+    def _assemble_slices(self, domain_model: Dict[str, Any], roster: str, intent_context: str, token_budget: int) -> List[Prompt]:
+        # Every chunk of the repository repeats the roster: a second cacheable prefix
+        shared = PromptSegment(derive_roster_boundaries(roster), cache=True)
+        fixed_cost = estimate_tokens(render_prompt(self._segments([shared, PromptSegment(derive_slice_detail({}, 1, 1))], "")))
+        available = max(token_budget - fixed_cost, 2 * MIN_CHUNK_TOKENS)
 
-OUTPUT FORMAT:
-Generate a list of verifiable violations. Do not summarize the code. Only report discrepancies where the Intent violates the Structural Boundaries.
+        boundary_cost = estimate_tokens(self.compute_constraints(domain_model))
+        intent_cost = estimate_tokens(intent_context)
+        if intent_cost <= available // 2:
+            intent_budget = intent_cost
+        elif boundary_cost <= available // 2:
+            intent_budget = available - boundary_cost
+        else:
+            intent_budget = available // 2
+        boundary_budget = max(available - intent_budget, MIN_CHUNK_TOKENS)
+        intent_budget = max(intent_budget, MIN_CHUNK_TOKENS)
 
-Format:
-- [TYPE: Entity Mismatch | Version Drift | Logic Hallucination]
-  - Claim: "Quote from agents.md"
-  - Reality: "Reference to Structural Boundary"
-  - Severity: High/Medium
-""" + f"\n\n---\nDOCUMENTATION TO ANALYZE:\n{intent_context}"
\ No newline at end of file
+        domain_slices = split_domain_model(domain_model, boundary_budget)
+        details = [derive_slice_detail(domain_slice, index, len(domain_slices))
+                   for index, domain_slice in enumerate(domain_slices, start=1)]
+        # Each intent chunk only meets the slices of the workflows it mentions;
+        # a chunk that mentions none is checked against the roster alone
+        mentions = WorkflowMentions(domain_model)
+        prompts = []
+        for intent_chunk in split_intent(intent_context, intent_budget):
+            mentioned = set(mentions.find(intent_chunk))
+            chunk_details = [
+                detail for domain_slice, detail in zip(domain_slices, details)
+                if mentioned.intersection(domain_slice.get("workflows", {}))
+            ] or [derive_roster_only_detail()]
+            prompts.extend(self._segments([shared, PromptSegment(detail)], intent_chunk) for detail in chunk_details)
+        return prompts
+
+    def _segments(self, structural_constraints: List[PromptSegment], intent_context: str) -> Prompt:
+        # The instructions come first and never change: a prefix every prompt of every repository shares
+        return [
+            PromptSegment(POLICY_INSTRUCTIONS, static=True),
+            *structural_constraints,
+            PromptSegment(f"---\nDOCUMENTATION TO ANALYZE:\n{intent_context}"),
+        ]
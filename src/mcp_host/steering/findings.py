@@ -0,0 +1,162 @@
+import re
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
+# A finding starts with its TYPE tag, e.g. "- [TYPE: Entity Mismatch]"
+_TYPE_LINE = re.compile(r"^\s*(?:[-*]\s*)?\**\s*\[\s*TYPE\s*:\s*(?P<type>[^\]]+?)\s*\]\**\s*$", re.IGNORECASE)
+_FIELD_LINE = re.compile(r"^\s*(?:[-*]\s*)?\**(?P<key>Claim|Reality|Severity)\**\s*:\s*\**\s*(?P<value>.*?)\s*$", re.IGNORECASE)
+# Report of an analysis without findings
+NO_FINDINGS = "No Context Debt Smells found."
+
+
+@dataclass
+class Finding:
+    """
+    One Context Debt Smell, as listed in the OUTPUT FORMAT of the policy.
+    """
+    type: str
+    claim: str = ""
+    reality: str = ""
+    severity: str = ""
+
+    def key(self) -> tuple:
+        """Identity used for deduplication: same type and same claim."""
+        return (self.type.lower(), _normalize(self.claim))
+
+    def render(self) -> str:
+        return "\n".join([
+            f"- [TYPE: {self.type}]",
+            f"  - Claim: {_quote(self.claim)}",
+            f"  - Reality: {_quote(self.reality)}",
+            f"  - Severity: {self.severity}",
+        ])
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.strip().strip('"').lower().split())
+
+
+def _quote(text: str) -> str:
+    text = text.strip()
+    return text if text.startswith('"') else f'"{text}"'
+
+
+def parse_findings(text: str) -> List[Finding]:
+    """
+    Extracts the findings of an LLM report written in the policy's format.
+    Lines that are not part of a finding are ignored.
+    """
+    findings: List[Finding] = []
+    current: Optional[Finding] = None
+    for line in text.splitlines():
+        type_match = _TYPE_LINE.match(line)
+        if type_match:
+            current = Finding(type=type_match.group("type").strip())
+            findings.append(current)
+            continue
+        field_match = _FIELD_LINE.match(line)
+        if current is not None and field_match:
+            setattr(current, field_match.group("key").lower(), field_match.group("value").rstrip("*").strip())
+    return findings
+
+
+class FindingStream:
+    """
+    Incremental parse_findings() for streamed reports: feed() the text as it
+    arrives and get back each finding as soon as it is complete (its
+    Severity line ended after its Claim and Reality, or the next finding
+    started).
+    """
+
+    def __init__(self):
+        self._pending = ""
+        self._current: Optional[Finding] = None
+        self.findings: List[Finding] = []
+
+    def feed(self, text: str) -> List[Finding]:
+        """Adds streamed text; returns the findings it completed."""
+        *lines, self._pending = (self._pending + text).split("\n")
+        completed: List[Finding] = []
+        for line in lines:
+            completed += self._parse_line(line)
+        return completed
+
+    def close(self) -> List[Finding]:
+        """Ends the stream; returns the last, possibly partial, finding."""
+        completed = self._parse_line(self._pending)
+        self._pending = ""
+        if self._current is not None:
+            completed.append(self._current)
+            self.findings.append(self._current)
+            self._current = None
+        return completed
+
+    def _parse_line(self, line: str) -> List[Finding]:
+        completed: List[Finding] = []
+        type_match = _TYPE_LINE.match(line)
+        if type_match:
+            if self._current is not None:
+                completed.append(self._current)
+                self.findings.append(self._current)
+            self._current = Finding(type=type_match.group("type").strip())
+            return completed
+        field_match = _FIELD_LINE.match(line)
+        if self._current is not None and field_match:
+            key = field_match.group("key").lower()
+            setattr(self._current, key, field_match.group("value").rstrip("*").strip())
+            if key == "severity" and self._current.claim and self._current.reality:
+                completed.append(self._current)
+                self.findings.append(self._current)
+                self._current = None
+        return completed
+
+
+def merge_findings(groups: Iterable[List[Finding]]) -> List[Finding]:
+    """
+    Merges the findings of several partial reports, dropping duplicates.
+    When the same claim is reported twice, the highest severity is kept.
+    """
+    rank = {"high": 2, "medium": 1, "low": 0}
+    merged: dict = {}
+    for findings in groups:
+        for finding in findings:
+            existing = merged.get(finding.key())
+            if existing is None:
+                merged[finding.key()] = finding
+            elif rank.get(finding.severity.lower(), -1) > rank.get(existing.severity.lower(), -1):
+                merged[finding.key()] = finding
+    return list(merged.values())
+
+
+def merge_free_text(texts: Iterable[str]) -> List[str]:
+    """
+    Merges the free-form answers of several partial reports: an answer
+    repeated by many chunks (e.g. "nothing to report") is kept once.
+    """
+    merged: dict = {}
+    for text in texts:
+        merged.setdefault(" ".join(text.lower().split()), text)
+    return list(merged.values())
+
+
+def free_form(text: str) -> Optional[str]:
+    """
+    Returns the text of a report that holds no finding in the policy's
+    format (a free-form answer), or None when it has findings or is empty.
+    """
+    text = text.strip()
+    if not text or text == NO_FINDINGS or parse_findings(text):
+        return None
+    return text
+
+
+def render_findings(findings: List[Finding], free_text: Iterable[str] = ()) -> str:
+    """
+    Renders findings back in the policy's OUTPUT FORMAT, followed by the
+    free-form answers that couldn't be parsed into findings.
+    """
+    free_text = list(free_text)
+    parts = [finding.render() for finding in findings]
+    if not findings and not free_text:
+        parts.append(NO_FINDINGS)
+    return "\n".join(parts + free_text)
@@ -0,0 +1,135 @@
+"""
+Host Tracing
+
+Structured timing spans around each phase of a host run: server start,
+resource reads (stdio transfer included), claim check, prompt assembly,
+inference per chunk, report rendering. Spans nest (a span opened inside
+another one records it as its parent) and follow asyncio tasks, so
+concurrent chunks and fleet repositories each get their own lane.
+
+A run writes its spans as one JSON file in the Chrome trace event format,
+which chrome://tracing and https://ui.perfetto.dev open as a timeline.
+Outside a run (no active Tracer), span() costs next to nothing.
+"""
+
+import asyncio
+import json
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+_current_tracer: ContextVar[Optional["Tracer"]] = ContextVar("current_tracer", default=None)
+_current_span: ContextVar[Optional[int]] = ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """Collects the spans of one host run."""
+
+    def __init__(self, name: str, **metadata: Any):
+        self.name = name
+        self.metadata = metadata
+        self.started_at = time.time()
+        self._origin = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self._lanes: Dict[int, int] = {}
+
+    def _lane(self) -> int:
+        """Small integer id of the running asyncio task (0 outside of a task)."""
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        if task is None:
+            return 0
+        return self._lanes.setdefault(id(task), len(self._lanes) + 1)
+
+    @contextmanager
+    def activate(self) -> Iterator["Tracer"]:
+        """Makes this tracer the target of span() in the current context."""
+        token = _current_tracer.set(self)
+        try:
+            yield self
+        finally:
+            _current_tracer.reset(token)
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Dict[str, Any]]:
+        """
+        Times the enclosed block. Yields the span's attribute dict, so the
+        block can add results (sizes, token counts...) as it learns them.
+        """
+        span_id = len(self.spans)
+        record: Dict[str, Any] = {
+            "id": span_id,
+            "name": name,
+            "parent": _current_span.get(),
+            "lane": self._lane(),
+            "start_ms": (time.perf_counter() - self._origin) * 1000,
+            "duration_ms": None,
+            "attributes": dict(attributes),
+        }
+        self.spans.append(record)
+        token = _current_span.set(span_id)
+        try:
+            yield record["attributes"]
+        except BaseException as e:
+            record["attributes"]["error"] = f"{e.__class__.__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            record["duration_ms"] = (time.perf_counter() - self._origin) * 1000 - record["start_ms"]
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Total time and count per span name."""
+        totals: Dict[str, Dict[str, float]] = {}
+        for record in self.spans:
+            entry = totals.setdefault(record["name"], {"count": 0, "total_ms": 0.0})
+            entry["count"] += 1
+            entry["total_ms"] += record["duration_ms"] or 0.0
+        return {name: {"count": v["count"], "total_ms": round(v["total_ms"], 3)} for name, v in totals.items()}
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        events = [
+            {
+                "name": record["name"],
+                "ph": "X",
+                "ts": round(record["start_ms"] * 1000, 1),
+                "dur": round((record["duration_ms"] or 0.0) * 1000, 1),
+                "pid": os.getpid(),
+                "tid": record["lane"],
+                "args": {**record["attributes"], "span_id": record["id"], "parent": record["parent"]},
+            }
+            for record in self.spans
+        ]
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "metadata": {
+                "run": self.name,
+                "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(self.started_at)),
+                **self.metadata,
+                "summary": self.summary(),
+            },
+        }
+
+    def dump(self, trace_dir: Path) -> Path:
+        """Writes the trace as '<trace_dir>/<run>-<timestamp>.json' and returns its path."""
+        trace_dir.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started_at))
+        path = trace_dir / f"{self.name}-{stamp}-{os.getpid()}.json"
+        path.write_text(json.dumps(self.to_chrome_trace(), indent=1, default=str), encoding="utf-8")
+        return path
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Dict[str, Any]]:
+    """Times the enclosed block into the active Tracer; a no-op when none is active."""
+    tracer = _current_tracer.get()
+    if tracer is None:
+        yield dict(attributes)
+        return
+    with tracer.span(name, **attributes) as attrs:
+        yield attrs
@@ -5,16 +5,32 @@ This module exposes the following capabilities:
 1. Workflow Files (Source Artifact) - Raw workflow file access
 2. CI/CD Domain Model - Parsed and validated workflow structure
 3. Project Intent Files - Documentation and intent (agents.md)
+4. Action Usage Index - Which workflows, jobs and steps use an action
+5. Workflow History - Per-commit timeline of structural workflow changes
 
 Each capability is implemented in its own module for better maintainability.
 """
 
+from . import workflow_files, cicd_model, project_intent, action_usage, workflow_history
 from .workflow_files import register_workflow_capabilities
 from .cicd_model import register_cicd_capabilities
 from .project_intent import register_intent_capabilities
+from .action_usage import register_action_usage_capabilities
+from .workflow_history import register_history_capabilities
+
+# Every repository path read by some capability. Sparse clones check out
+# only these paths (see utils.git_operations).
+SPARSE_CHECKOUT_PATTERNS = sorted({
+    pattern
+    for module in (workflow_files, cicd_model, project_intent, action_usage, workflow_history)
+    for pattern in module.SPARSE_PATTERNS
+})
 
 __all__ = [
     'register_workflow_capabilities',
     'register_cicd_capabilities',
-    'register_intent_capabilities'
+    'register_intent_capabilities',
+    'register_action_usage_capabilities',
+    'register_history_capabilities',
+    'SPARSE_CHECKOUT_PATTERNS'
 ]
\ No newline at end of file
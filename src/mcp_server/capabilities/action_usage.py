@@ -0,0 +1,96 @@
+"""
+CAPABILITY: Action Usage Index
+Row: Action Usage Index | Controlled By: Application
+
+Answers "which workflows use actions/checkout@v2?" without shipping the
+domain model to the client. An inverted index (action -> ref -> workflow,
+job and step index) is kept next to the model cache and re-indexes only
+the workflow files that changed.
+"""
+
+import json
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+from mcp.server.fastmcp import FastMCP
+from config import REPO_READY_TIMEOUT
+from repo_registry import RepoRegistry, REPO_LOOKUP_ERRORS
+from utils.action_index import ActionIndex
+from utils.model_cache import get_model_cache
+
+# Repository paths read by this capability (sparse-checkout patterns)
+SPARSE_PATTERNS = ["/.github/workflows/"]
+
+def run_query(repo_path: Path, query: Callable[[ActionIndex], Dict[str, Any]]) -> str:
+    """
+    Runs a query against the repository's action index.
+
+    Returns:
+        JSON with the matches, the number of matching steps and the query time
+    """
+    index = get_model_cache(repo_path).get_action_index()
+    start = time.perf_counter()
+    matches = query(index)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    return json.dumps({
+        "matches": matches,
+        "total_usages": sum(len(locations) for refs in matches.values() for locations in refs.values()),
+        "query_ms": round(elapsed_ms, 3),
+    }, indent=2)
+
+def register_action_usage_capabilities(mcp: FastMCP, registry: RepoRegistry):
+    """
+    Registers the action usage query tools with the MCP server.
+
+    Args:
+        mcp: FastMCP server instance
+        registry: Registry of the repositories served by this process
+    """
+
+    async def query(repo: Optional[str], run: Callable[[ActionIndex], Dict[str, Any]]) -> str:
+        try:
+            repo_path = await registry.wait_path(repo, REPO_READY_TIMEOUT)
+        except REPO_LOOKUP_ERRORS as e:
+            return f"Error: {e.args[0]}"
+        try:
+            return run_query(repo_path, run)
+        except ValueError as e:
+            return f"Error: {e}"
+
+    @mcp.tool()
+    async def find_action_usages(action: str, ref: Optional[str] = None, repo: Optional[str] = None) -> str:
+        """
+        Lists the steps that use an action, grouped by ref.
+
+        Args:
+            action: Action name without ref, e.g. "actions/checkout"
+            ref: Only this ref, e.g. "v2" (defaults to every ref)
+            repo: Repository to query (defaults to the default repository)
+        """
+        return await query(repo, lambda index: index.exact(action, ref))
+
+    @mcp.tool()
+    async def search_actions(prefix: str, repo: Optional[str] = None, limit: int = 100) -> str:
+        """
+        Lists the usages of every action whose name starts with a prefix.
+
+        Args:
+            prefix: Start of the action name, e.g. "actions/" or "docker/build"
+            repo: Repository to query (defaults to the default repository)
+            limit: Maximum number of actions returned
+        """
+        return await query(repo, lambda index: index.prefix(prefix, max(limit, 1)))
+
+    @mcp.tool()
+    async def find_action_versions(action: str, version_range: str, repo: Optional[str] = None) -> str:
+        """
+        Lists the usages of an action pinned to a version inside a range.
+        Floating tags compare as their first release (v4 is 4.0.0); branch
+        and SHA refs never match.
+
+        Args:
+            action: Action name without ref, e.g. "actions/checkout"
+            version_range: Comma separated comparators, e.g. "<v4" or ">=2,<3"
+            repo: Repository to query (defaults to the default repository)
+        """
+        return await query(repo, lambda index: index.version_range(action, version_range))
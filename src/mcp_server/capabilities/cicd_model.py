@@ -4,66 +4,341 @@ Row: CI/CD Domain Model | Controlled By: Application
 
 Provides the parsed and validated CI/CD workflow structure.
 This represents the 'Observable Reality' of the system.
+
+Besides the full model, clients can fetch single workflows, a lightweight
+index (workflows, jobs and 'uses' references), or a projected, compact and
+paginated view, so large repositories don't cost megabytes per request.
+The job graph view estimates the runner time and wall-clock time of every
+workflow from its 'needs' DAG and matrices. The expanded view follows the
+local composite actions and reusable workflows that jobs use, and the index
+lists what each job reaches through them.
 """
 
+import json
+import time
 from pathlib import Path
-import yaml
+from typing import Any, Callable, Dict, List, Optional
 from mcp.server.fastmcp import FastMCP
-from domain_model import Repository, Workflow
+from domain_model import ExpandedRepository, Job, Repository
+from config import REPO_READY_TIMEOUT
+from repo_registry import RepoRegistry, REPO_LOOKUP_ERRORS
+from utils.job_graph import analyze_repository
+from utils.model_cache import get_model_cache, get_cache_stats
+from utils.telemetry import get_telemetry, observe, record_payload
+from utils.uses_resolver import get_uses_resolver
+
+# Repository paths read by this capability (sparse-checkout patterns)
+SPARSE_PATTERNS = ["/.github/workflows/", "/.github/actions/"]
+
+# Kinds of payloads built from the model (telemetry: 'serialize.<kind>' spans, '<kind>' sizes)
+PAYLOAD_KINDS = ["model", "index", "graph", "workflow", "query", "expanded"]
 
 def get_repo_model(repo_path: Path) -> Repository:
     """
     Helper function that builds the 'CI/CD Domain Model'.
     This represents the 'Observable Reality' of the system.
-    
+
+    Workflows are served from an in-process cache: only files that were
+    added, changed or deleted since the last call are re-parsed.
+
     Args:
         repo_path: Path to the repository
-        
+
     Returns:
         Repository domain model with all workflows
     """
-    repo_data = Repository(name=repo_path.name)
-    workflows_dir = repo_path / ".github" / "workflows"
-    
-    # Basic existence validation
-    if not workflows_dir.exists():
-        # Return an empty repo if there are no workflows, to avoid breaking the server
-        return repo_data
-
-    files = list(workflows_dir.glob("*.yml")) + list(workflows_dir.glob("*.yaml"))
-    
-    for file_path in files:
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                raw_data = yaml.safe_load(f)
-                
-            # Fix for YAML 1.1 (on=True) vs 1.2 (on="on") compatibility
-            if isinstance(raw_data, dict) and True in raw_data:
-                raw_data["on"] = raw_data.pop(True)
-                
-            # Pydantic validation
-            workflow = Workflow.model_validate(raw_data)
-            repo_data.workflows[file_path.name] = workflow
-        except Exception as e:
-            # In a real server, we would use logging.error
-            print(f"⚠️ Error loading {file_path.name}: {e}")
-    
-    return repo_data
-
-def register_cicd_capabilities(mcp: FastMCP, repo_path: Path):
+    return get_model_cache(repo_path).get_model()
+
+def _record_payload(kind: str, payload: str, seconds: float) -> None:
+    observe(f"serialize.{kind}", seconds)
+    record_payload(kind, payload)
+
+def payload_stats() -> Dict[str, Dict[str, float]]:
+    """Size and serialization time of the payloads built so far, per kind."""
+    telemetry = get_telemetry().snapshot()
+    stats = {}
+    for kind in PAYLOAD_KINDS:
+        sizes = telemetry["payloads"].get(kind)
+        timings = telemetry["spans"].get(f"serialize.{kind}")
+        if sizes and timings:
+            stats[kind] = {
+                "count": sizes["count"],
+                "total_bytes": sizes["total_bytes"],
+                "last_bytes": sizes["last_bytes"],
+                "total_ms": timings["total_ms"],
+                "last_ms": timings["last_ms"],
+            }
+    return stats
+
+def _measured(kind: str, build: Callable[[Repository], str]) -> Callable[[Repository], str]:
+    """Wraps a payload builder so that its output size and build time are recorded."""
+    def wrapper(repo: Repository) -> str:
+        start = time.perf_counter()
+        payload = build(repo)
+        _record_payload(kind, payload, time.perf_counter() - start)
+        return payload
+    return wrapper
+
+def build_model_index(repo: Repository, expanded: Optional[ExpandedRepository] = None) -> Dict[str, Any]:
+    """
+    Builds the lightweight index of a repository: workflow names, job ids
+    and the 'uses' reference of every step that has one.
+
+    The index keeps the shape of the full model (workflows -> jobs -> steps),
+    so consumers of the full model can read it unchanged. Jobs that call a
+    reusable workflow also have 'uses', and with an expanded view, jobs list
+    the references reached through their composite actions and reusable
+    workflows as 'expands_to'.
+    """
+    def index_job(filename: str, job_id: str, job: Job) -> Dict[str, Any]:
+        entry: Dict[str, Any] = {"steps": [{"uses": step.uses} for step in job.steps if step.uses]}
+        if job.uses:
+            entry["uses"] = job.uses
+        expanded_job = expanded.jobs.get(filename, {}).get(job_id) if expanded else None
+        if expanded_job and expanded_job.expands_to:
+            entry["expands_to"] = expanded_job.expands_to
+        return entry
+
+    return {
+        "name": repo.name,
+        "workflows": {
+            filename: {
+                "name": workflow.name,
+                "jobs": {job_id: index_job(filename, job_id, job) for job_id, job in workflow.jobs.items()},
+            }
+            for filename, workflow in repo.workflows.items()
+        },
+    }
+
+def build_expanded_view(expanded: ExpandedRepository) -> Dict[str, Any]:
+    """Serializes the expanded view, without null and default values."""
+    return expanded.model_dump(mode="json", exclude_none=True, exclude_defaults=True)
+
+def build_projection(fields: List[str]) -> Optional[Dict[str, Any]]:
+    """
+    Converts dotted field paths into a pydantic 'include' spec for a Workflow.
+    Jobs (dict) and steps (list) are traversed for every item.
+
+    Example: ["name", "jobs.runs_on", "jobs.steps.uses"]
+    """
+    if not fields:
+        return None
+    include: Dict[str, Any] = {}
+    for field_path in fields:
+        node = include
+        parts = field_path.split(".")
+        for i, part in enumerate(parts):
+            last = i == len(parts) - 1
+            if part in ("jobs", "steps") and not last:
+                node = node.setdefault(part, {}).setdefault("__all__", {})
+            elif last:
+                node[part] = True
+            else:
+                node = node.setdefault(part, {})
+    return include
+
+def dump_workflows(
+    repo: Repository,
+    filenames: List[str],
+    fields: Optional[List[str]] = None,
+    compact: bool = True,
+) -> Dict[str, Any]:
+    """Serializes selected workflows to plain dicts, optionally projected and compacted."""
+    include = build_projection(fields or [])
+    return {
+        filename: repo.workflows[filename].model_dump(
+            mode="json", include=include, exclude_none=compact, exclude_defaults=compact
+        )
+        for filename in filenames
+    }
+
+def to_json(data: Any, compact: bool) -> str:
+    if compact:
+        return json.dumps(data, separators=(",", ":"))
+    return json.dumps(data, indent=2)
+
+def register_cicd_capabilities(mcp: FastMCP, registry: RepoRegistry):
     """
     Registers CI/CD domain model capabilities with the MCP server.
-    
+
     Args:
         mcp: FastMCP server instance
-        repo_path: Path to the cloned repository
+        registry: Registry of the repositories served by this process
     """
-    
+
+    async def serve(repo: Optional[str], read: Callable[..., str], *args: str) -> str:
+        """
+        Resolves a repository (None = the default one) and reads a resource
+        of it; a repository that is unknown or not ready yet gives an error
+        message instead of failing the request.
+        """
+        try:
+            repo_path = await registry.wait_path(repo, REPO_READY_TIMEOUT)
+        except REPO_LOOKUP_ERRORS as e:
+            return f"Error: {e.args[0]}"
+        return read(repo_path, *args)
+
+    def read_model(repo_path: Path) -> str:
+        cache = get_model_cache(repo_path)
+        serializations = cache.serializations
+        payload = cache.get_model_json()
+        if cache.serializations != serializations:
+            _record_payload("model", payload, cache.last_serialize_seconds)
+        return payload
+
+    def read_index(repo_path: Path) -> str:
+        cache = get_model_cache(repo_path)
+        resolver = get_uses_resolver(repo_path)
+        expanded = resolver.expand(cache.get_model())
+        return cache.get_derived(
+            ("index", resolver.generation),
+            _measured("index", lambda repo: to_json(build_model_index(repo, expanded), compact=True)),
+        )
+
+    def read_expanded(repo_path: Path) -> str:
+        cache = get_model_cache(repo_path)
+        resolver = get_uses_resolver(repo_path)
+        expanded = resolver.expand(cache.get_model())
+        return cache.get_derived(
+            ("expanded", resolver.generation),
+            _measured("expanded", lambda repo: to_json(build_expanded_view(expanded), compact=True)),
+        )
+
+    def read_graph(repo_path: Path) -> str:
+        return get_model_cache(repo_path).get_derived(
+            "graph", _measured("graph", lambda repo: to_json(analyze_repository(repo), compact=False))
+        )
+
+    def read_workflow(repo_path: Path, filename: str) -> str:
+        def build(repo: Repository) -> str:
+            if filename not in repo.workflows:
+                return f"Error: Workflow '{filename}' not found in the domain model."
+            return to_json(dump_workflows(repo, [filename])[filename], compact=True)
+        return get_model_cache(repo_path).get_derived(
+            ("workflow", filename), _measured("workflow", build)
+        )
+
     @mcp.resource("cicd://model")
-    def get_cicd_model() -> str:
+    async def get_cicd_model() -> str:
         """
-        Exposes the parsed and validated workflow structure.
+        Exposes the parsed and validated workflow structure of the default repository.
         The Client calls this resource to get the 'truth' about the code.
         """
-        repo = get_repo_model(repo_path)
-        return repo.model_dump_json(indent=2)
\ No newline at end of file
+        return await serve(None, read_model)
+
+    @mcp.resource("cicd://{repo}/model")
+    async def get_repo_cicd_model(repo: str) -> str:
+        """
+        Exposes the parsed and validated workflow structure of a specific repository.
+        """
+        return await serve(repo, read_model)
+
+    @mcp.resource("cicd://model/{filename}")
+    async def get_cicd_workflow(filename: str) -> str:
+        """
+        Exposes a single parsed workflow of the default repository, as compact
+        JSON (null and default values omitted).
+        """
+        return await serve(None, read_workflow, filename)
+
+    @mcp.resource("cicd://{repo}/model/{filename}")
+    async def get_repo_cicd_workflow(repo: str, filename: str) -> str:
+        """
+        Exposes a single parsed workflow of a specific repository, as compact JSON.
+        """
+        return await serve(repo, read_workflow, filename)
+
+    @mcp.resource("cicd://index")
+    async def get_cicd_index() -> str:
+        """
+        Exposes a lightweight index of the default repository: workflows,
+        job ids and 'uses' references only. Same shape as cicd://model.
+        """
+        return await serve(None, read_index)
+
+    @mcp.resource("cicd://{repo}/index")
+    async def get_repo_cicd_index(repo: str) -> str:
+        """
+        Exposes the lightweight index of a specific repository.
+        """
+        return await serve(repo, read_index)
+
+    @mcp.resource("cicd://expanded")
+    async def get_cicd_expanded() -> str:
+        """
+        Exposes the expanded view of the default repository: every 'uses'
+        reference resolved once (local composite actions, reusable
+        workflows, mirrored remote actions), and per job the references it
+        makes and everything they expand into.
+        """
+        return await serve(None, read_expanded)
+
+    @mcp.resource("cicd://{repo}/expanded")
+    async def get_repo_cicd_expanded(repo: str) -> str:
+        """
+        Exposes the expanded view of a specific repository.
+        """
+        return await serve(repo, read_expanded)
+
+    @mcp.resource("cicd://graph")
+    async def get_cicd_graph() -> str:
+        """
+        Exposes the job graph analysis of the default repository: per workflow,
+        the 'needs' DAG (cycles, unknown dependencies), matrix fan-out, runner
+        minutes, critical path and peak parallel runners.
+        """
+        return await serve(None, read_graph)
+
+    @mcp.resource("cicd://{repo}/graph")
+    async def get_repo_cicd_graph(repo: str) -> str:
+        """
+        Exposes the job graph analysis of a specific repository.
+        """
+        return await serve(repo, read_graph)
+
+    @mcp.tool()
+    async def query_cicd_model(
+        repo: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        workflows: Optional[List[str]] = None,
+        compact: bool = True,
+        page: int = 1,
+        page_size: int = 50,
+    ) -> str:
+        """
+        Returns a projected, paginated view of the CI/CD domain model.
+
+        Args:
+            repo: Repository to query (defaults to the default repository)
+            fields: Dotted workflow fields to keep, e.g. ["name", "jobs.runs_on",
+                "jobs.steps.uses"] (defaults to every field)
+            workflows: Workflow filenames to include (defaults to all of them)
+            compact: Omit null/default values and indentation
+            page: 1-based page number
+            page_size: Workflows per page
+        """
+        page, page_size = max(page, 1), max(page_size, 1)
+
+        def build(model: Repository) -> str:
+            names = [name for name in model.workflows if not workflows or name in workflows]
+            selected = names[(page - 1) * page_size: page * page_size]
+            return to_json({
+                "name": model.name,
+                "page": page,
+                "page_size": page_size,
+                "total_workflows": len(names),
+                "total_pages": (len(names) + page_size - 1) // page_size,
+                "workflows": dump_workflows(model, selected, fields, compact),
+            }, compact)
+
+        key = ("query", tuple(fields or ()), tuple(workflows or ()), compact, page, page_size)
+        return await serve(repo, lambda repo_path: get_model_cache(repo_path).get_derived(key, _measured("query", build)))
+
+    @mcp.tool()
+    def get_model_cache_stats() -> str:
+        """
+        Reports hit/miss counters of the CI/CD domain model cache, plus the
+        payload size and serialization time of each kind of model resource.
+        A hit means a workflow file was served without being re-parsed.
+        """
+        return json.dumps({"caches": get_cache_stats(), "payloads": payload_stats()}, indent=2)
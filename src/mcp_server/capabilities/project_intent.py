@@ -4,33 +4,205 @@ Row: Project Intent Files | Controlled By: Documentation
 
 Provides access to human-written intent and documentation files (AGENTS.md files).
 Primary focus: agents.md file that describes intended behavior.
+
+Monorepos keep intent files next to their packages too: intent://index
+lists every intent file of the checkout (see utils/intent_scanner.py), and
+intent://{path} serves one of them by its URL-encoded relative path.
 """
 
+import json
+import time
 from pathlib import Path
+from typing import List, Optional
+from urllib.parse import quote, unquote
 from mcp.server.fastmcp import FastMCP
+from config import REPO_READY_TIMEOUT
+from repo_registry import RepoRegistry, REPO_LOOKUP_ERRORS
+from utils.intent_scanner import get_intent_scanner
+
+# Common variants of the intent file, searched in this order
+INTENT_FILENAMES = ["AGENTS.md", "agents.md", "AGENT.md", "agent.md"]
+
+# Repository paths read by this capability (sparse-checkout patterns).
+# Unanchored, so sparse clones also check out the intent files of subfolders.
+SPARSE_PATTERNS = list(INTENT_FILENAMES)
+
+# Size above which read_intent_files() stops adding documents to its answer
+BULK_READ_MAX_BYTES = 4 * 1024 * 1024
+
+def read_project_intent(repo_path: Path) -> str:
+    """
+    Reads the declarative content of agents.md from the repository root.
+    
+    Searches for common variants: AGENTS.md, agents.md, AGENT.md, agent.md
+    """
+    for name in INTENT_FILENAMES:
+        agent_file = repo_path / name
+        if agent_file.exists():
+            return agent_file.read_text(encoding="utf-8")
+            
+    return "Error: No agents.md file found in repository root."
+
+def intent_file_uri(path: str, repo: Optional[str] = None) -> str:
+    """URI of an indexed intent file: intent://{path} or intent://{repo}/{path}."""
+    encoded = quote(path, safe="")
+    return f"intent://{repo}/{encoded}" if repo else f"intent://{encoded}"
+
+def build_intent_index(repo_path: Path, repo: Optional[str] = None) -> str:
+    """
+    Lists every intent file of a repository that git doesn't ignore.
 
-def register_intent_capabilities(mcp: FastMCP, repo_path: Path):
+    Args:
+        repo_path: Path to the repository
+        repo: Repository name used in the file URIs (None = default repository URIs)
+
+    Returns:
+        JSON with the path, URI, size and modification time of every file
+    """
+    scanner = get_intent_scanner(repo_path, INTENT_FILENAMES)
+    files = scanner.get_files()
+    return json.dumps({
+        "files": [
+            {
+                "path": f.path,
+                "uri": intent_file_uri(f.path, repo),
+                "bytes": f.size,
+                "modified": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(f.mtime_ns / 1e9)),
+            }
+            for f in files
+        ],
+        "count": len(files),
+        "total_bytes": sum(f.size for f in files),
+        "scan": scanner.stats(),
+    }, indent=2)
+
+def read_intent_file(repo_path: Path, path: str) -> str:
+    """
+    Reads an intent file of the index by its (URL-encoded) relative path.
+
+    Security: Only files listed by the index are served, so the path can't
+    reach anything else in the checkout.
+    """
+    path = unquote(path)
+    content = get_intent_scanner(repo_path, INTENT_FILENAMES).read(path)
+    if content is None:
+        return f"Error: '{path}' is not an intent file of this repository (see intent://index)."
+    return content
+
+def read_intent_files(repo_path: Path, paths: Optional[List[str]], max_bytes: int) -> str:
+    """
+    Reads many intent files at once, each with a single read.
+
+    Returns:
+        JSON with the content of every file, the paths that aren't indexed
+        intent files, and the ones left out to stay under max_bytes
+    """
+    scanner = get_intent_scanner(repo_path, INTENT_FILENAMES)
+    wanted = paths if paths is not None else [f.path for f in scanner.get_files()]
+    documents, missing, omitted = {}, [], []
+    total = 0
+    for path in wanted:
+        intent_file = scanner.find(path)
+        if intent_file is None:
+            missing.append(path)
+        elif total + intent_file.size > max_bytes:
+            omitted.append(path)
+        else:
+            content = scanner.read(path)
+            if content is None:
+                missing.append(path)
+                continue
+            documents[path] = content
+            total += intent_file.size
+    return json.dumps({"documents": documents, "missing": missing, "omitted": omitted, "bytes": total}, indent=2)
+
+def register_intent_capabilities(mcp: FastMCP, registry: RepoRegistry):
     """
     Registers project intent file capabilities with the MCP server.
     
     Args:
         mcp: FastMCP server instance
-        repo_path: Path to the cloned repository
+        registry: Registry of the repositories served by this process
     """
     
     @mcp.resource("intent://agents-md")
-    def get_project_intent() -> str:
+    async def get_project_intent() -> str:
         """
-        Exposes the declarative content of agents.md.
+        Exposes the declarative content of agents.md of the default repository.
         The Client calls this resource to understand the human 'intention'.
-        
-        Searches for common variants: AGENTS.md, agents.md, AGENT.md, agent.md
-        """
-        possible_names = ["AGENTS.md", "agents.md", "AGENT.md", "agent.md"]
-        
-        for name in possible_names:
-            agent_file = repo_path / name
-            if agent_file.exists():
-                return agent_file.read_text(encoding="utf-8")
-                
-        return "Error: No agents.md file found in repository root."
\ No newline at end of file
+        """
+        repo_path = await registry.wait_path(timeout=REPO_READY_TIMEOUT)
+        return read_project_intent(repo_path)
+    
+    @mcp.resource("intent://{repo}/agents-md")
+    async def get_repo_project_intent(repo: str) -> str:
+        """
+        Exposes the declarative content of agents.md of a specific repository.
+        """
+        try:
+            repo_path = await registry.wait_path(repo, REPO_READY_TIMEOUT)
+        except REPO_LOOKUP_ERRORS as e:
+            return f"Error: {e.args[0]}"
+        return read_project_intent(repo_path)
+
+    @mcp.resource("intent://index")
+    async def get_intent_index() -> str:
+        """
+        Lists every intent file (AGENTS.md...) of the default repository,
+        in subfolders too, skipping what .gitignore excludes and vendor or
+        build folders.
+        """
+        repo_path = await registry.wait_path(timeout=REPO_READY_TIMEOUT)
+        return build_intent_index(repo_path)
+
+    @mcp.resource("intent://{repo}/index")
+    async def get_repo_intent_index(repo: str) -> str:
+        """
+        Lists every intent file of a specific repository.
+        """
+        try:
+            repo_path = await registry.wait_path(repo, REPO_READY_TIMEOUT)
+        except REPO_LOOKUP_ERRORS as e:
+            return f"Error: {e.args[0]}"
+        return build_intent_index(repo_path, repo)
+
+    @mcp.resource("intent://{path}")
+    async def get_intent_file(path: str) -> str:
+        """
+        Exposes one intent file of the default repository by its relative
+        path, URL-encoded (e.g. intent://packages%2Fapi%2FAGENTS.md).
+        """
+        repo_path = await registry.wait_path(timeout=REPO_READY_TIMEOUT)
+        return read_intent_file(repo_path, path)
+
+    @mcp.resource("intent://{repo}/{path}")
+    async def get_repo_intent_file(repo: str, path: str) -> str:
+        """
+        Exposes one intent file of a specific repository by its relative
+        path, URL-encoded.
+        """
+        try:
+            repo_path = await registry.wait_path(repo, REPO_READY_TIMEOUT)
+        except REPO_LOOKUP_ERRORS as e:
+            return f"Error: {e.args[0]}"
+        return read_intent_file(repo_path, path)
+
+    @mcp.tool()
+    async def read_intent_documents(
+        paths: Optional[List[str]] = None,
+        repo: Optional[str] = None,
+        max_bytes: int = BULK_READ_MAX_BYTES,
+    ) -> str:
+        """
+        Reads many intent files in one call, instead of one resource read each.
+
+        Args:
+            paths: Relative paths listed by intent://index (defaults to every indexed file)
+            repo: Repository to read from (defaults to the default repository)
+            max_bytes: Size budget of the answer; files past it are listed as 'omitted'
+        """
+        try:
+            repo_path = await registry.wait_path(repo, REPO_READY_TIMEOUT)
+        except REPO_LOOKUP_ERRORS as e:
+            return f"Error: {e.args[0]}"
+        return read_intent_files(repo_path, paths, max(max_bytes, 0))
@@ -4,36 +4,194 @@ Row: Workflow Files | Controlled By: Source Control
 
 Provides access to raw workflow YAML files from the repository.
 Uses a template pattern to access specific files by name.
+
+The bundle returns every workflow file (or a subset) in one response, with
+the SHA-256 of each file. A client that sends the hashes it already has
+gets back only the files that changed.
 """
 
+import json
+from hashlib import sha256
 from pathlib import Path
+from typing import Dict, List, Optional
 from mcp.server.fastmcp import FastMCP
+from config import REPO_READY_TIMEOUT
+from repo_registry import RepoRegistry, REPO_LOOKUP_ERRORS
+from utils.model_cache import list_workflow_files
+from utils.raw_files import get_raw_file_cache
+
+# Repository paths read by this capability (sparse-checkout patterns)
+SPARSE_PATTERNS = ["/.github/workflows/"]
+
+def resolve_workflow_path(repo_path: Path, filename: str) -> Optional[Path]:
+    """
+    Resolves a workflow filename inside the workflows folder.
+
+    Security: Prevents Path Traversal attacks by validating file location.
+
+    Returns:
+        The resolved path, or None when it points outside the workflows folder
+    """
+    workflows_dir = (repo_path / ".github" / "workflows").resolve()
+    target_file = (workflows_dir / filename).resolve()
+
+    # Verify that the requested file is actually inside the workflows folder
+    if not target_file.is_relative_to(workflows_dir):
+        return None
+    return target_file
+
+def read_workflow_file(repo_path: Path, filename: str) -> str:
+    """
+    Reads the RAW content of a workflow file of a repository.
 
-def register_workflow_capabilities(mcp: FastMCP, repo_path: Path):
+    Security: Prevents Path Traversal attacks by validating file location.
+    """
+    target_file = resolve_workflow_path(repo_path, filename)
+    if target_file is None:
+        return "Error: Access denied. You can only read workflow files."
+
+    raw = get_raw_file_cache(repo_path).get(target_file) if target_file.is_file() else None
+    if raw is not None:
+        return raw.content.decode("utf-8")
+
+    return f"Error: Workflow file '{filename}' not found."
+
+def build_workflow_bundle(
+    repo_path: Path,
+    filenames: Optional[List[str]] = None,
+    known_hashes: Optional[Dict[str, str]] = None,
+) -> str:
+    """
+    Builds the bundle of a repository's workflow files.
+
+    Args:
+        repo_path: Path to the repository
+        filenames: Files to include (defaults to every workflow file)
+        known_hashes: Filename -> SHA-256 of the copies the client already
+            has; files whose hash still matches are listed as 'unchanged'
+            instead of being sent again
+
+    Returns:
+        JSON with the changed files (content, hash, size), the unchanged
+        ones, the known files that no longer exist, the requested files
+        that don't exist or are outside the workflows folder, and a hash of
+        the whole bundle
+    """
+    workflows_dir = repo_path / ".github" / "workflows"
+    cache = get_raw_file_cache(repo_path)
+    known = known_hashes or {}
+    missing: List[str] = []
+    denied: List[str] = []
+
+    listed = filenames is None
+    if listed:
+        filenames = [p.name for p in list_workflow_files(workflows_dir)] if workflows_dir.is_dir() else []
+    # Resolved paths in both cases: they are the keys of the raw file cache
+    paths: Dict[str, Path] = {}
+    for name in dict.fromkeys(filenames):
+        target_file = resolve_workflow_path(repo_path, name)
+        if target_file is None:
+            denied.append(name)
+        else:
+            paths[name] = target_file
+    if listed:
+        cache.prune(paths.values())
+
+    files: Dict[str, Dict[str, object]] = {}
+    digests: Dict[str, str] = {}
+    unchanged: List[str] = []
+    for name, path in paths.items():
+        raw = cache.get(path) if path.is_file() else None
+        if raw is None:
+            missing.append(name)
+            continue
+        digests[name] = raw.digest
+        if known.get(name) == raw.digest:
+            unchanged.append(name)
+        else:
+            files[name] = {"sha256": raw.digest, "bytes": raw.size, "content": raw.content.decode("utf-8", errors="replace")}
+
+    # Known files the client should drop: deleted, or (subset) requested and missing
+    removed = [name for name in known if name not in digests and (listed or name in missing)]
+    bundle_hash = sha256("".join(f"{name}\0{digest}\n" for name, digest in digests.items()).encode()).hexdigest()
+    return json.dumps({
+        "bundle_sha256": bundle_hash,
+        "files": files,
+        "unchanged": unchanged,
+        "removed": removed,
+        "missing": [name for name in missing if name not in known],
+        "denied": denied,
+    }, indent=2)
+
+def register_workflow_capabilities(mcp: FastMCP, registry: RepoRegistry):
     """
     Registers workflow file access capabilities with the MCP server.
-    
+
     Args:
         mcp: FastMCP server instance
-        repo_path: Path to the cloned repository
+        registry: Registry of the repositories served by this process
     """
-    
+
+    # Registered before workflow://{filename}, so the bundle URIs match first
+    @mcp.resource("workflow://bundle")
+    async def get_workflow_bundle() -> str:
+        """
+        Exposes every workflow file of the default repository in one
+        response, with the SHA-256 of each file.
+        """
+        repo_path = await registry.wait_path(timeout=REPO_READY_TIMEOUT)
+        return build_workflow_bundle(repo_path)
+
+    @mcp.resource("workflow://{repo}/bundle")
+    async def get_repo_workflow_bundle(repo: str) -> str:
+        """
+        Exposes every workflow file of a specific repository in one response.
+        """
+        try:
+            repo_path = await registry.wait_path(repo, REPO_READY_TIMEOUT)
+        except REPO_LOOKUP_ERRORS as e:
+            return f"Error: {e.args[0]}"
+        return build_workflow_bundle(repo_path)
+
     @mcp.resource("workflow://{filename}")
-    def get_raw_workflow_file(filename: str) -> str:
+    async def get_raw_workflow_file(filename: str) -> str:
         """
-        Exposes the RAW content (original text) of a specific workflow file.
+        Exposes the RAW content (original text) of a specific workflow file
+        of the default repository.
         Fulfills the 'Source Artifact' capability of the architecture.
-        
-        Security: Prevents Path Traversal attacks by validating file location.
-        """
-        workflows_dir = repo_path / ".github" / "workflows"
-        target_file = (workflows_dir / filename).resolve()
-        
-        # Verify that the requested file is actually inside the workflows folder
-        if not str(target_file).startswith(str(workflows_dir.resolve())):
-            return "Error: Access denied. You can only read workflow files."
-        
-        if target_file.exists() and target_file.is_file():
-            return target_file.read_text(encoding="utf-8")
-        
-        return f"Error: Workflow file '{filename}' not found."
\ No newline at end of file
+        """
+        repo_path = await registry.wait_path(timeout=REPO_READY_TIMEOUT)
+        return read_workflow_file(repo_path, filename)
+
+    @mcp.resource("workflow://{repo}/{filename}")
+    async def get_repo_raw_workflow_file(repo: str, filename: str) -> str:
+        """
+        Exposes the RAW content of a workflow file of a specific repository.
+        """
+        try:
+            repo_path = await registry.wait_path(repo, REPO_READY_TIMEOUT)
+        except REPO_LOOKUP_ERRORS as e:
+            return f"Error: {e.args[0]}"
+        return read_workflow_file(repo_path, filename)
+
+    @mcp.tool()
+    async def fetch_workflow_bundle(
+        files: Optional[List[str]] = None,
+        known_hashes: Optional[Dict[str, str]] = None,
+        repo: Optional[str] = None,
+    ) -> str:
+        """
+        Returns many workflow files in one call. Files whose SHA-256 matches
+        known_hashes are only listed as 'unchanged', so a client that keeps
+        the previous bundle receives just what changed.
+
+        Args:
+            files: Workflow filenames to include (defaults to every workflow file)
+            known_hashes: Filename -> 'sha256' from a previous bundle
+            repo: Repository to read from (defaults to the default repository)
+        """
+        try:
+            repo_path = await registry.wait_path(repo, REPO_READY_TIMEOUT)
+        except REPO_LOOKUP_ERRORS as e:
+            return f"Error: {e.args[0]}"
+        return build_workflow_bundle(repo_path, files, known_hashes)
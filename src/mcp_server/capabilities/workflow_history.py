@@ -0,0 +1,92 @@
+"""
+CAPABILITY: Workflow History
+Row: Workflow History | Controlled By: Source Control
+
+Tells when context debt appeared, not just whether it exists at HEAD: a
+per-commit timeline of structural workflow changes (jobs, triggers,
+runners, 'needs', matrices, actions used) and of intent file edits.
+Files are read from the git object database of the clone, so nothing is
+checked out, and each workflow version is parsed once (see
+utils/git_history.py).
+"""
+
+import asyncio
+import json
+from pathlib import Path
+from typing import Optional
+from mcp.server.fastmcp import FastMCP
+from config import HISTORY_MAX_COMMITS, REPO_READY_TIMEOUT
+from repo_registry import RepoRegistry, REPO_LOOKUP_ERRORS
+from capabilities.project_intent import INTENT_FILENAMES
+from utils.git_history import build_timeline
+
+# Repository paths read by this capability (sparse-checkout patterns).
+# History is read from the object database, not from the checkout.
+SPARSE_PATTERNS = []
+
+async def get_timeline(repo_path: Path, repo_name: str, rev_range: str, max_commits: int) -> str:
+    """
+    Builds the timeline of a repository in a worker thread (git and the
+    parser may run for seconds on long ranges).
+
+    Returns:
+        JSON timeline, or an error message
+    """
+    try:
+        timeline = await asyncio.to_thread(
+            build_timeline, repo_path, rev_range, max_commits, INTENT_FILENAMES
+        )
+    except ValueError as e:
+        return f"Error: {e}"
+    return json.dumps({"repo": repo_name, **timeline}, indent=2)
+
+def register_history_capabilities(mcp: FastMCP, registry: RepoRegistry):
+    """
+    Registers the workflow history resources and tool with the MCP server.
+
+    Args:
+        mcp: FastMCP server instance
+        registry: Registry of the repositories served by this process
+    """
+
+    @mcp.resource("cicd://timeline")
+    async def get_workflow_timeline() -> str:
+        """
+        Exposes the timeline of structural workflow changes of the default
+        repository, over its most recent commits.
+        """
+        repo_path = await registry.wait_path(timeout=REPO_READY_TIMEOUT)
+        return await get_timeline(repo_path, registry.default, "HEAD", HISTORY_MAX_COMMITS)
+
+    @mcp.resource("cicd://{repo}/timeline")
+    async def get_repo_workflow_timeline(repo: str) -> str:
+        """
+        Exposes the timeline of structural workflow changes of a specific
+        repository, over its most recent commits.
+        """
+        try:
+            repo_path = await registry.wait_path(repo, REPO_READY_TIMEOUT)
+        except REPO_LOOKUP_ERRORS as e:
+            return f"Error: {e.args[0]}"
+        return await get_timeline(repo_path, repo, "HEAD", HISTORY_MAX_COMMITS)
+
+    @mcp.tool()
+    async def query_workflow_history(
+        rev_range: str = "HEAD",
+        max_commits: int = HISTORY_MAX_COMMITS,
+        repo: Optional[str] = None,
+    ) -> str:
+        """
+        Lists the commits of a range that changed the structure of a
+        workflow or edited an intent file, oldest first.
+
+        Args:
+            rev_range: Commit range in git syntax, e.g. "HEAD", "v1.0..main", "HEAD~50..HEAD"
+            max_commits: Upper bound of commits walked (the most recent ones)
+            repo: Repository to query (defaults to the default repository)
+        """
+        try:
+            repo_path = await registry.wait_path(repo, REPO_READY_TIMEOUT)
+        except REPO_LOOKUP_ERRORS as e:
+            return f"Error: {e.args[0]}"
+        return await get_timeline(repo_path, repo or registry.default, rev_range, max_commits)
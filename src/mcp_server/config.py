@@ -1,3 +1,5 @@
+import os
+import tempfile
 from pathlib import Path
 
 # GitHub repository configuration
@@ -7,4 +9,104 @@ FALLBACK_REPO_PATH = Path("./data/test-repo/analytics")
 
 # Server metadata
 SERVER_NAME = "GitHub Actions Context Server"
-SERVER_VERSION = "1.0.0"
\ No newline at end of file
+SERVER_VERSION = "1.0.0"
+
+# Workflow ingestion
+# Batches with at least this many changed files are parsed in a process pool
+INGEST_PARALLEL_THRESHOLD = 32
+# Process pool size (None = number of CPUs)
+INGEST_MAX_WORKERS = None
+
+# Multi-repository mode
+# Path to a YAML/JSON file listing the repositories to serve (see repo_registry.py).
+# When unset, only REPO_URL is served.
+REPOS_CONFIG_PATH = os.environ.get("MCP_REPOS_CONFIG")
+# Upper bound of git clone/pull processes running at the same time
+MAX_CONCURRENT_GIT_OPS = 8
+
+# Git fetch mode of new clones: "full" (complete clone + pull) or, opt-in,
+# "sparse" (shallow, blob-less clone of the paths the capabilities read).
+# Existing clones are always updated in the mode they were made in.
+GIT_FETCH_MODE = os.environ.get("MCP_GIT_FETCH_MODE", "full")
+# History depth fetched in sparse mode
+GIT_CLONE_DEPTH = 1
+
+# Seconds a resource waits for a repository that has no checkout on disk yet
+# (repositories are prepared in the background after the server starts)
+REPO_READY_TIMEOUT = 30.0
+
+# Filesystem watcher (inotify on Linux, polling elsewhere) that keeps the
+# cached models of each repository current
+WATCH_REPOSITORIES = True
+# Seconds between scans of the polling fallback
+WATCH_POLL_INTERVAL = 2.0
+
+# Job graph estimates (cicd://graph)
+# Minutes assumed for a step without 'timeout-minutes'
+DEFAULT_STEP_MINUTES = 1.0
+# Minutes added to every job for provisioning its runner
+JOB_SETUP_MINUTES = 0.5
+
+# Parsed model snapshots (see utils/snapshots.py), keyed by repository
+# name and HEAD commit so a new process doesn't re-parse an unchanged checkout
+SNAPSHOTS_ENABLED = os.environ.get("MCP_SNAPSHOTS", "1") != "0"
+SNAPSHOT_DIR = Path(os.environ.get("MCP_SNAPSHOT_DIR", "./data/model-snapshots"))
+# Snapshots older than this many days, or beyond the most recent count, are removed
+SNAPSHOT_MAX_AGE_DAYS = 14
+SNAPSHOT_MAX_COUNT = 64
+# A parse schedules a snapshot write this many seconds later, in the background;
+# parses that happen meanwhile are folded into the same write
+SNAPSHOT_SAVE_DELAY = 2.0
+
+# Telemetry (see utils/telemetry.py): Prometheus text-format file rewritten
+# every METRICS_WRITE_INTERVAL seconds, e.g. for node_exporter's textfile
+# collector. Unset = no file; the numbers are still served by server_stats.
+METRICS_FILE = Path(os.environ["MCP_METRICS_FILE"]) if os.environ.get("MCP_METRICS_FILE") else None
+METRICS_WRITE_INTERVAL = 15.0
+
+# Workflow history (cicd://timeline, see utils/git_history.py)
+# Commits walked when no range is given (the most recent ones)
+HISTORY_MAX_COMMITS = 200
+# A walk that reaches the boundary of a shallow clone before max_commits
+# deepens it (max_commits more commits, doubling each round) this many times
+HISTORY_DEEPEN_ROUNDS = 4
+# Parsed workflow blobs memoized by SHA, shared by every repository
+HISTORY_BLOB_MEMO_SIZE = 8192
+
+# Intent file discovery (intent://index, see utils/intent_scanner.py)
+# Folders never descended into, on top of the ones .gitignore excludes
+INTENT_SCAN_PRUNED_DIRS = [
+    "node_modules", "bower_components", "vendor", "third_party", "Pods",
+    "build", "dist", "out", "target", ".gradle", ".next", ".terraform",
+    ".venv", "venv", "__pycache__", ".tox", ".mypy_cache", ".pytest_cache",
+]
+# Seconds a scan result is served before the tree is checked again
+INTENT_SCAN_RECHECK_SECONDS = 2.0
+
+# 'uses' resolution (cicd://expanded, see utils/uses_resolver.py)
+# Local mirror cache of remote action and workflow repositories, read at the
+# referenced ref: ACTION_MIRROR_ROOT/<owner>/<repo>.git (git clone --mirror).
+# Nothing is fetched; references without a mirror are reported unresolved.
+ACTION_MIRROR_ROOT = Path(os.environ.get("MCP_ACTION_MIRRORS", "./data/action-mirrors"))
+# Levels of nested references followed (a composite action using another...)
+USES_MAX_DEPTH = 8
+# Targets read and parsed at the same time
+USES_RESOLVE_WORKERS = 8
+
+# Daemon mode (python server.py --daemon): the server keeps running and its
+# caches stay warm between analyses. It listens on a Unix socket, by default
+# in a per-user folder that only its owner can enter: under $XDG_RUNTIME_DIR
+# when the session has one, in the temp folder otherwise. The daemon refuses
+# a socket folder owned by someone else or open to other users.
+DAEMON_SOCKET = Path(
+    os.environ.get("MCP_DAEMON_SOCKET")
+    or (
+        Path(os.environ["XDG_RUNTIME_DIR"]) / "mcp-context-server"
+        if os.environ.get("XDG_RUNTIME_DIR")
+        else Path(tempfile.gettempdir()) / f"mcp-context-server-{os.getuid()}"
+    ) / "server.sock"
+)
+# Seconds between two syncs (clone/pull) of every repository in daemon mode,
+# so analyses don't read the checkouts of the day the daemon started.
+# 0 = only the sync at startup and refresh_repository()
+DAEMON_SYNC_INTERVAL = float(os.environ.get("MCP_DAEMON_SYNC_INTERVAL", "300"))
@@ -1,6 +1,6 @@
 from __future__ import annotations
 from typing import List, Dict, Optional, Union, Any
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict, model_validator
 
 # =============================================================================
 # GITHUB ACTIONS DOMAIN MODEL
@@ -88,8 +88,20 @@ class Job(BaseModel):
     
     # Defines the type of machine to run the job on.
     # Example: "ubuntu-latest", "windows-2019", or self-hosted tags.
+    # Not set when the job calls a reusable workflow ('uses').
     # Reference: https://docs.github.com/en/actions/writing-workflows/workflow-syntax-for-github-actions#jobsjob_idruns-on
-    runs_on: Union[str, List[str]] = Field(alias="runs-on")
+    runs_on: Optional[Union[str, List[str]]] = Field(default=None, alias="runs-on")
+    
+    # Calls a reusable workflow instead of running steps.
+    # Example: ./.github/workflows/deploy.yml or org/repo/.github/workflows/deploy.yml@v1
+    # Reference: https://docs.github.com/en/actions/writing-workflows/workflow-syntax-for-github-actions#jobsjob_iduses
+    uses: Optional[str] = None
+    
+    # Inputs passed to the reusable workflow called with 'uses'.
+    with_args: Optional[Dict[str, Any]] = Field(default=None, alias="with")
+    
+    # Secrets passed to the reusable workflow: a map, or 'inherit'.
+    secrets: Optional[Union[str, Dict[str, Any]]] = None
     
     # Modifies the default permissions granted to the GITHUB_TOKEN for this job.
     permissions: Optional[Union[str, Dict[str, str]]] = None
@@ -125,6 +137,13 @@ class Job(BaseModel):
     # Service containers (like Redis, Postgres) to host services needed for the job.
     services: Optional[Dict[str, Any]] = None
 
+    @model_validator(mode="after")
+    def check_runner(self) -> "Job":
+        """A job either runs on a machine or calls a reusable workflow."""
+        if self.runs_on is None and self.uses is None:
+            raise ValueError("a job needs 'runs-on' or 'uses'")
+        return self
+
 
 # ---------------------------------------------------------
 # 3. Trigger Definition (On)
@@ -171,7 +190,47 @@ class Workflow(BaseModel):
 
 
 # ---------------------------------------------------------
-# 5. Repository Definition (New Entity)
+# 5. Action Definition (action.yml)
+# ---------------------------------------------------------
+class ActionRuns(BaseModel):
+    """
+    How an action runs: a composite action lists its steps, JavaScript
+    and Docker actions name their entry point.
+    
+    Reference: https://docs.github.com/en/actions/sharing-automations/creating-actions/metadata-syntax-for-github-actions#runs
+    """
+    model_config = ConfigDict(populate_by_name=True)
+
+    # 'composite', 'docker', or the Node.js runtime ('node20', ...).
+    using: str
+    
+    # Steps of a composite action.
+    steps: List[Step] = []
+    
+    # Entry point of a JavaScript action.
+    main: Optional[str] = None
+    
+    # Image of a Docker action ('Dockerfile' or 'docker://...').
+    image: Optional[str] = None
+
+
+class ActionDefinition(BaseModel):
+    """
+    Metadata file (action.yml) of an action.
+    
+    Reference: https://docs.github.com/en/actions/sharing-automations/creating-actions/metadata-syntax-for-github-actions
+    """
+    model_config = ConfigDict(populate_by_name=True)
+
+    name: Optional[str] = None
+    description: Optional[str] = None
+    inputs: Optional[Dict[str, Any]] = None
+    outputs: Optional[Dict[str, Any]] = None
+    runs: ActionRuns
+
+
+# ---------------------------------------------------------
+# 6. Repository Definition (New Entity)
 # ---------------------------------------------------------
 class Repository(BaseModel):
     """
@@ -195,4 +254,59 @@ class Repository(BaseModel):
 
     def get_workflow_names(self) -> List[str]:
         """Returns a list of the names of all workflows in the repository."""
-        return [w.name for w in self.workflows.values() if w.name]
\ No newline at end of file
+        return [w.name for w in self.workflows.values() if w.name]
+
+
+# ---------------------------------------------------------
+# 7. Expanded View ('uses' references followed)
+# ---------------------------------------------------------
+class ResolvedUses(BaseModel):
+    """
+    What a 'uses' reference points to: a local or mirrored composite action,
+    a reusable workflow, or an action that runs code (JavaScript, Docker).
+    """
+    # The reference as written, e.g. './.github/actions/build'.
+    uses: str
+    
+    # 'composite', 'javascript', 'docker', 'reusable-workflow' or 'unresolved'.
+    kind: str
+    
+    # Where the target was read: 'checkout' or 'mirror'.
+    source: Optional[str] = None
+    
+    # File that was read, relative to its repository.
+    path: Optional[str] = None
+    
+    # 'uses' references made by the target itself (steps of a composite
+    # action, jobs and steps of a reusable workflow).
+    references: List[str] = []
+    
+    action: Optional[ActionDefinition] = None
+    workflow: Optional[Workflow] = None
+    
+    # Why the reference couldn't be followed.
+    error: Optional[str] = None
+
+
+class ExpandedJob(BaseModel):
+    """The references of one job, and everything they expand into."""
+    # References made by the job itself ('uses' of the job and of its steps).
+    uses: List[str] = []
+    
+    # References reached through them, transitively, each listed once.
+    expands_to: List[str] = []
+
+
+class ExpandedRepository(BaseModel):
+    """
+    The workflows of a repository with their 'uses' references followed.
+    Every reference is resolved once and listed in 'references', however
+    many jobs make it.
+    """
+    name: str
+    
+    # Key: the reference as written.
+    references: Dict[str, ResolvedUses] = Field(default_factory=dict)
+    
+    # Workflow filename -> job id -> references of the job.
+    jobs: Dict[str, Dict[str, ExpandedJob]] = Field(default_factory=dict)
@@ -0,0 +1,342 @@
+"""
+Repository Registry
+
+Keeps track of every repository served by this process. In single-repo
+mode the registry holds REPO_URL only; in multi-repo mode it is loaded
+from a config file (YAML or JSON):
+
+    clone_root: ./data/cloned-repos
+    max_concurrency: 8
+    fetch_mode: sparse
+    depth: 1
+    default: analytics
+    repositories:
+      - name: analytics
+        url: https://github.com/Rello/analytics.git
+      - name: needs-history
+        url: https://github.com/org/needs-history.git
+        fetch_mode: full
+      - name: local-checkout
+        path: /srv/checkouts/local-checkout
+
+Entries with a 'url' are cloned/pulled into clone_root. Entries with only
+a 'path' are served from that local folder as-is.
+
+Readiness: a remote repository is 'pending' until its first sync finishes.
+If a clone from a previous run is already on disk, it is served right away
+as a 'stale' snapshot while the pull runs in the background.
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import yaml
+
+from utils.git_operations import FETCH_MODE_FULL, repo_name_from_url, sync_repositories
+from utils.telemetry import observe
+
+
+# Readiness states of a RepoEntry
+STATE_PENDING = "pending"    # never synced, nothing on disk yet
+STATE_STALE = "stale"        # serving a checkout from a previous run
+STATE_SYNCING = "syncing"    # clone/pull in progress
+STATE_READY = "ready"        # last sync succeeded (or local-only repository)
+STATE_FAILED = "failed"      # last sync failed
+
+# Called with (repository name, old path, new path) when a checkout is swapped
+PathListener = Callable[[str, Optional[Path], Optional[Path]], None]
+
+# Errors raised when a repository can't be served (unknown, unavailable, not ready in time)
+REPO_LOOKUP_ERRORS = (KeyError, FileNotFoundError, TimeoutError)
+
+
+@dataclass
+class RepoEntry:
+    """A repository served by this process."""
+    # Identifier used in namespaced resource URIs (e.g., cicd://{name}/model)
+    name: str
+
+    # Clone URL. None for local-only repositories.
+    url: Optional[str] = None
+
+    # Local checkout served to the capabilities. None until the repo is synced.
+    path: Optional[Path] = None
+
+    # Checkout used when cloning/pulling fails and no local copy exists.
+    fallback_path: Optional[Path] = None
+
+    # Last git error, if the latest sync failed.
+    error: Optional[str] = None
+
+    # "sparse" or "full" (see utils.git_operations)
+    fetch_mode: str = FETCH_MODE_FULL
+
+    # Readiness state: pending | stale | syncing | ready | failed
+    state: str = STATE_PENDING
+
+    # Set once the first sync finished (successfully or not)
+    ready: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    # Wall-clock time (epoch seconds) and duration of the last finished sync
+    synced_at: Optional[float] = None
+    sync_seconds: Optional[float] = None
+
+
+class RepoRegistry:
+    """Name-indexed collection of RepoEntry objects."""
+
+    def __init__(
+        self,
+        entries: List[RepoEntry],
+        clone_root: Path,
+        max_concurrency: int,
+        default: Optional[str] = None,
+        sparse_patterns: Sequence[str] = (),
+        depth: int = 1,
+    ):
+        if not entries:
+            raise ValueError("The repository registry needs at least one repository.")
+        self.entries: Dict[str, RepoEntry] = {}
+        for entry in entries:
+            if entry.name in self.entries:
+                raise ValueError(f"Duplicate repository name '{entry.name}'.")
+            self.entries[entry.name] = entry
+        self.clone_root = clone_root
+        self.max_concurrency = max_concurrency
+        self.sparse_patterns = list(sparse_patterns)
+        self.depth = depth
+        self.default = default or entries[0].name
+        if self.default not in self.entries:
+            raise ValueError(f"Default repository '{self.default}' is not registered.")
+        self._sync_lock = asyncio.Lock()
+        self._path_lock = threading.Lock()
+        self._path_listeners: List[PathListener] = []
+        self._seed_snapshots()
+
+    def _seed_snapshots(self) -> None:
+        """Marks local-only repos as ready and picks up clones left by previous runs."""
+        for entry in self.entries.values():
+            if not entry.url:
+                entry.state = STATE_READY
+                entry.ready.set()
+            elif entry.path is None and (self.clone_root / entry.name).exists():
+                entry.path = self.clone_root / entry.name
+                entry.state = STATE_STALE
+
+    def add_path_listener(self, listener: PathListener) -> None:
+        """
+        Subscribes to checkout swaps. The listener is immediately called
+        once for every repository that already has a checkout.
+        """
+        with self._path_lock:
+            self._path_listeners.append(listener)
+            current = [(entry.name, entry.path) for entry in self.entries.values() if entry.path]
+        for name, path in current:
+            listener(name, None, path)
+
+    def swap_path(self, name: str, new_path: Optional[Path]) -> None:
+        """
+        Atomically replaces the checkout served for a repository.
+        Every capability resolves paths through the registry, so the next
+        request of any capability sees the new checkout.
+        """
+        with self._path_lock:
+            entry = self.get(name)
+            old_path, entry.path = entry.path, new_path
+            listeners = list(self._path_listeners)
+        if old_path != new_path:
+            for listener in listeners:
+                listener(name, old_path, new_path)
+
+    @classmethod
+    def from_single_repo(
+        cls,
+        repo_url: str,
+        clone_root: Path,
+        fallback_path: Path,
+        max_concurrency: int,
+        fetch_mode: str = FETCH_MODE_FULL,
+        sparse_patterns: Sequence[str] = (),
+        depth: int = 1,
+    ) -> "RepoRegistry":
+        """Builds the classic one-repository registry from config.py values."""
+        entry = RepoEntry(
+            name=repo_name_from_url(repo_url),
+            url=repo_url,
+            fallback_path=fallback_path,
+            fetch_mode=fetch_mode,
+        )
+        return cls([entry], clone_root, max_concurrency,
+                   sparse_patterns=sparse_patterns, depth=depth)
+
+    @classmethod
+    def from_config_file(
+        cls,
+        config_path: Path,
+        clone_root: Path,
+        max_concurrency: int,
+        fetch_mode: str = FETCH_MODE_FULL,
+        sparse_patterns: Sequence[str] = (),
+        depth: int = 1,
+    ) -> "RepoRegistry":
+        """
+        Loads the registry from a YAML/JSON config file.
+        Relative paths in the file are resolved against the file's folder.
+
+        Args:
+            config_path: Path to the config file
+            clone_root: Default folder for clones (overridden by 'clone_root')
+            max_concurrency: Default git concurrency (overridden by 'max_concurrency')
+            fetch_mode: Default fetch mode (overridden by 'fetch_mode', globally or per repo)
+            sparse_patterns: Paths checked out by sparse clones
+            depth: History depth of sparse clones (overridden by 'depth')
+        """
+        data = yaml.safe_load(config_path.read_text(encoding="utf-8")) or {}
+        base_dir = config_path.parent
+        default_fetch_mode = data.get("fetch_mode", fetch_mode)
+
+        def resolve(value: Optional[str]) -> Optional[Path]:
+            if value is None:
+                return None
+            path = Path(value).expanduser()
+            return path if path.is_absolute() else base_dir / path
+
+        entries = []
+        for item in data.get("repositories", []):
+            url = item.get("url")
+            if not url and not item.get("path"):
+                raise ValueError(f"Repository entry needs a 'url' or a 'path': {item}")
+            local_path = resolve(item.get("path"))
+            entries.append(RepoEntry(
+                name=item.get("name") or repo_name_from_url(url or str(local_path)),
+                url=url,
+                path=None if url else local_path,
+                fallback_path=local_path if url else None,
+                fetch_mode=item.get("fetch_mode", default_fetch_mode),
+            ))
+
+        return cls(
+            entries,
+            clone_root=resolve(data.get("clone_root")) or clone_root,
+            max_concurrency=int(data.get("max_concurrency", max_concurrency)),
+            default=data.get("default"),
+            sparse_patterns=sparse_patterns,
+            depth=int(data.get("depth", depth)),
+        )
+
+    def names(self) -> List[str]:
+        return list(self.entries.keys())
+
+    def get(self, name: Optional[str] = None) -> RepoEntry:
+        """
+        Returns a registered repository (the default one when name is None).
+
+        Raises:
+            KeyError: If the repository is not registered
+        """
+        key = name or self.default
+        if key not in self.entries:
+            raise KeyError(f"Unknown repository '{key}'.")
+        return self.entries[key]
+
+    def path(self, name: Optional[str] = None) -> Path:
+        """
+        Returns the local checkout of a repository.
+
+        Raises:
+            KeyError: If the repository is not registered
+            FileNotFoundError: If the repository has no usable checkout
+        """
+        entry = self.get(name)
+        if entry.path is None:
+            raise FileNotFoundError(f"Repository '{entry.name}' is not available: {entry.error}")
+        return entry.path
+
+    async def wait_path(self, name: Optional[str] = None, timeout: Optional[float] = None) -> Path:
+        """
+        Returns the local checkout of a repository, waiting for its first sync
+        when nothing is on disk yet. A stale snapshot is returned immediately.
+
+        Raises:
+            KeyError: If the repository is not registered
+            FileNotFoundError: If the repository has no usable checkout
+            TimeoutError: If the repository isn't ready within the timeout
+        """
+        entry = self.get(name)
+        if entry.path is None and not entry.ready.is_set():
+            try:
+                await asyncio.wait_for(entry.ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError(
+                    f"Repository '{entry.name}' is still being prepared (state: {entry.state})."
+                ) from None
+        return self.path(entry.name)
+
+    def status(self) -> Dict[str, Dict[str, object]]:
+        """Returns the readiness state of every repository."""
+        return {
+            name: {
+                "state": entry.state,
+                "default": name == self.default,
+                "path": str(entry.path) if entry.path else None,
+                "fetch_mode": entry.fetch_mode if entry.url else None,
+                "synced_at": entry.synced_at,
+                "sync_seconds": entry.sync_seconds,
+                "error": entry.error,
+            }
+            for name, entry in self.entries.items()
+        }
+
+    async def sync(self, names: Optional[List[str]] = None) -> Dict[str, Optional[str]]:
+        """
+        Clones or pulls remote repositories concurrently.
+
+        A repository whose sync fails keeps its previous checkout; when it has
+        none, its existing clone folder or fallback path is used instead.
+
+        Args:
+            names: Repositories to sync (defaults to all of them)
+
+        Returns:
+            Mapping of repository name to an error message (None on success)
+        """
+        selected = [self.get(name) for name in (names or self.names())]
+        remote = {entry.name: entry.url for entry in selected if entry.url}
+
+        async with self._sync_lock:
+            for name in remote:
+                self.entries[name].state = STATE_SYNCING
+            start = time.perf_counter()
+            results = await sync_repositories(
+                remote, self.clone_root, self.max_concurrency,
+                fetch_modes={entry.name: entry.fetch_mode for entry in selected},
+                sparse_patterns=self.sparse_patterns,
+                depth=self.depth,
+            )
+            elapsed = time.perf_counter() - start
+            if remote:
+                observe("git.sync", elapsed)
+
+        report: Dict[str, Optional[str]] = {}
+        for name, result in results.items():
+            entry = self.entries[name]
+            if isinstance(result, Exception):
+                entry.error = str(result)
+                entry.state = STATE_FAILED
+                if entry.path is None:
+                    existing = self.clone_root / name
+                    self.swap_path(name, existing if existing.exists() else entry.fallback_path)
+                print(f"⚠️ Warning: Could not sync '{name}'. Using {entry.path}.", file=sys.stderr)
+            else:
+                self.swap_path(name, result)
+                entry.error = None
+                entry.state = STATE_READY
+            entry.synced_at, entry.sync_seconds = time.time(), elapsed
+            entry.ready.set()
+            report[name] = entry.error
+        return report
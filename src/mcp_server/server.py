@@ -10,59 +10,283 @@ Architecture:
 - Easy to add new capabilities or clients
 """
 
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import stat
+import sys
+import time
+from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
 from mcp.server.fastmcp import FastMCP
 
 # Import configuration
-from config import REPO_URL, LOCAL_CLONE_PATH, FALLBACK_REPO_PATH, SERVER_NAME
+from config import (
+    REPO_URL, LOCAL_CLONE_PATH, FALLBACK_REPO_PATH, SERVER_NAME,
+    REPOS_CONFIG_PATH, MAX_CONCURRENT_GIT_OPS, GIT_FETCH_MODE, GIT_CLONE_DEPTH,
+    WATCH_REPOSITORIES, WATCH_POLL_INTERVAL, METRICS_FILE, METRICS_WRITE_INTERVAL,
+    DAEMON_SOCKET, DAEMON_SYNC_INTERVAL
+)
+
+# Import the repository registry
+from repo_registry import RepoRegistry
 
 # Import utilities
-from utils.git_operations import clone_or_update_repo
+from utils.git_operations import measure_fetch_savings
+from utils.ingestion import start_ingest_pool, stop_ingest_pool
+from utils.model_cache import drop_model_cache, get_cache_stats, get_model_cache
+from utils.intent_scanner import drop_intent_scanner, get_scanner_stats
+from utils.raw_files import drop_raw_file_cache, get_raw_file_stats
+from utils.uses_resolver import drop_uses_resolver, get_resolver_stats
+from utils.telemetry import InstrumentedFastMCP, get_telemetry, write_metrics_file
+from utils.watcher import WatchManager
 
 # Import capability registration functions
 from capabilities import (
     register_workflow_capabilities,
     register_cicd_capabilities,
-    register_intent_capabilities
+    register_intent_capabilities,
+    register_action_usage_capabilities,
+    register_history_capabilities,
+    SPARSE_CHECKOUT_PATTERNS
 )
+from capabilities.project_intent import INTENT_FILENAMES
+
+# Build the registry: one repository from config.py, or many from a config file
+if REPOS_CONFIG_PATH:
+    registry = RepoRegistry.from_config_file(
+        Path(REPOS_CONFIG_PATH), LOCAL_CLONE_PATH, MAX_CONCURRENT_GIT_OPS,
+        fetch_mode=GIT_FETCH_MODE, sparse_patterns=SPARSE_CHECKOUT_PATTERNS, depth=GIT_CLONE_DEPTH
+    )
+else:
+    registry = RepoRegistry.from_single_repo(
+        REPO_URL, LOCAL_CLONE_PATH, FALLBACK_REPO_PATH, MAX_CONCURRENT_GIT_OPS,
+        fetch_mode=GIT_FETCH_MODE, sparse_patterns=SPARSE_CHECKOUT_PATTERNS, depth=GIT_CLONE_DEPTH
+    )
+
+def forget_old_checkout(name: str, old_path: Optional[Path], new_path: Optional[Path]) -> None:
+    """Drops the cached models of a checkout that is no longer served."""
+    if old_path is not None and old_path != new_path:
+        drop_model_cache(old_path)
+        drop_intent_scanner(old_path)
+        drop_raw_file_cache(old_path)
+        drop_uses_resolver(old_path)
 
-# Initialize MCP server
-mcp = FastMCP(SERVER_NAME)
+registry.add_path_listener(forget_old_checkout)
 
-# Initialize repository path by cloning/updating from GitHub
-try:
-    REPO_PATH = clone_or_update_repo(REPO_URL, LOCAL_CLONE_PATH)
-except Exception as e:
-    print(f"⚠️ Warning: Could not clone repository. Using fallback path.")
-    REPO_PATH = FALLBACK_REPO_PATH
+# Keep cached models current as workflow and intent files change on disk
+watch_manager = WatchManager(INTENT_FILENAMES, WATCH_POLL_INTERVAL)
+if WATCH_REPOSITORIES:
+    registry.add_path_listener(watch_manager.on_path_change)
+
+async def sync_and_refresh(names: Optional[List[str]] = None) -> Dict[str, Optional[str]]:
+    """
+    Clones or pulls repositories, then makes the next read of each one
+    rescan its checkout.
+
+    Raises:
+        KeyError: If a repository name is unknown
+    """
+    report = await registry.sync(names)
+    for name in report:
+        path = registry.get(name).path
+        if path is not None:
+            get_model_cache(path).mark_dirty()
+    return report
+
+async def sync_periodically(interval: float) -> None:
+    """Syncs every repository again every 'interval' seconds (daemon mode), until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        await sync_and_refresh()
+
+async def write_metrics_periodically() -> None:
+    """Rewrites the Prometheus metrics file until cancelled."""
+    while True:
+        await asyncio.sleep(METRICS_WRITE_INTERVAL)
+        write_metrics_file(METRICS_FILE)
+
+# Sessions currently inside prepare_repositories (the daemon holds one more)
+_lifespan_users = 0
+_lifespan_tasks: List[asyncio.Task] = []
+
+@asynccontextmanager
+async def prepare_repositories(server: FastMCP) -> AsyncIterator[None]:
+    """
+    Clones/updates every registered repository in a background task, so the
+    MCP handshake completes immediately. Resources wait for a repository
+    (or serve its last on-disk checkout) until the sync finishes.
+    
+    Over HTTP every client session enters this lifespan: only the first one
+    starts the sync and only the last one to leave stops the watchers and
+    the ingestion pool, so the daemon's caches outlive its sessions.
+    """
+    global _lifespan_users
+    _lifespan_users += 1
+    if _lifespan_users == 1:
+        _lifespan_tasks.append(asyncio.create_task(registry.sync()))
+        if METRICS_FILE is not None:
+            _lifespan_tasks.append(asyncio.create_task(write_metrics_periodically()))
+    try:
+        yield
+    finally:
+        _lifespan_users -= 1
+        if _lifespan_users == 0:
+            for task in _lifespan_tasks:
+                task.cancel()
+            _lifespan_tasks.clear()
+            watch_manager.stop_all()
+            stop_ingest_pool()
+            write_metrics_file(METRICS_FILE)
+
+# Initialize MCP server (every resource read and tool call is timed)
+mcp = InstrumentedFastMCP(SERVER_NAME, lifespan=prepare_repositories)
 
 # =============================================================================
 # REGISTER ALL CAPABILITIES
 # =============================================================================
-register_workflow_capabilities(mcp, REPO_PATH)
-register_cicd_capabilities(mcp, REPO_PATH)
-register_intent_capabilities(mcp, REPO_PATH)
+register_workflow_capabilities(mcp, registry)
+register_cicd_capabilities(mcp, registry)
+register_intent_capabilities(mcp, registry)
+register_action_usage_capabilities(mcp, registry)
+register_history_capabilities(mcp, registry)
 
 # =============================================================================
 # MANAGEMENT TOOLS
 # =============================================================================
 @mcp.tool()
-def refresh_repository() -> str:
+async def refresh_repository(repo: Optional[str] = None) -> str:
     """
-    Forces a fresh clone or pull of the repository from GitHub.
+    Forces a fresh clone or pull of the repositories from GitHub.
     Useful when you want to ensure you have the latest version.
+    
+    This is a hot reload: if the checkout moved, the registry swaps the
+    path for every capability at once, and the cached models are
+    revalidated on the next read (unchanged files are not re-parsed).
+    
+    Args:
+        repo: Repository to refresh (defaults to all registered repositories)
+    """
+    try:
+        report = await sync_and_refresh([repo] if repo else None)
+    except KeyError as e:
+        return f"❌ Failed to refresh repository: {e.args[0]}"
+    
+    lines = []
+    for name, error in report.items():
+        if error is None:
+            lines.append(f"✅ Repository '{name}' refreshed successfully at {registry.get(name).path}")
+        else:
+            lines.append(f"❌ Failed to refresh repository '{name}': {error}")
+    return "\n".join(lines) or "Nothing to refresh: no remote repositories registered."
+
+@mcp.tool()
+def repository_status() -> str:
+    """
+    Reports the readiness of every repository: pending, stale (serving the
+    checkout of a previous run), syncing, ready or failed.
+    """
+    status = registry.status()
+    watched = watch_manager.status()
+    for info in status.values():
+        info["watcher"] = watched.get(info["path"]) if info["path"] else None
+    return json.dumps(status, indent=2)
+
+@mcp.tool()
+def list_repositories() -> str:
+    """
+    Lists the repositories served by this server, with their local checkout.
+    The names are used in namespaced resources such as cicd://{repo}/model.
+    """
+    lines = []
+    for name in registry.names():
+        entry = registry.get(name)
+        marker = " (default)" if name == registry.default else ""
+        status = f"⚠️ {entry.error}" if entry.error else "ok"
+        lines.append(f"- {name}{marker}: {entry.path} [{status}]")
+    return "\n".join(lines)
+
+@mcp.tool()
+async def compare_fetch_modes(repo: Optional[str] = None) -> str:
+    """
+    Measures the bytes and time a sparse clone saves against a full clone.
+    Both clones are made in a scratch folder and deleted afterwards.
+    
+    Args:
+        repo: Repository to measure (defaults to the default repository)
     """
-    global REPO_PATH
     try:
-        REPO_PATH = clone_or_update_repo(REPO_URL, LOCAL_CLONE_PATH)
-        
-        # Re-register capabilities with updated repo path
-        # Note: This is a simplified approach. In production, you might want
-        # a more sophisticated hot-reload mechanism
-        
-        return f"✅ Repository refreshed successfully at {REPO_PATH}"
+        entry = registry.get(repo)
+    except KeyError as e:
+        return f"❌ {e.args[0]}"
+    if not entry.url:
+        return f"❌ Repository '{entry.name}' is local-only and has no remote to clone."
+    
+    try:
+        results = await measure_fetch_savings(entry.url, registry.sparse_patterns, registry.depth)
     except Exception as e:
-        return f"❌ Failed to refresh repository: {str(e)}"
+        return f"❌ Failed to measure fetch modes: {str(e)}"
+    
+    full, sparse = results["full"], results["sparse"]
+    saved_bytes = full.bytes_on_disk - sparse.bytes_on_disk
+    saved_seconds = full.seconds - sparse.seconds
+    return (
+        f"📏 Fetch modes for '{entry.name}':\n"
+        f"   - full:   {full.bytes_on_disk:,} bytes in {full.seconds:.2f}s\n"
+        f"   - sparse: {sparse.bytes_on_disk:,} bytes in {sparse.seconds:.2f}s\n"
+        f"   Saved: {saved_bytes:,} bytes "
+        f"({saved_bytes / max(full.bytes_on_disk, 1):.0%}) and {saved_seconds:.2f}s"
+    )
+
+@mcp.tool()
+def server_stats() -> str:
+    """
+    Reports where the server's time goes: latency histograms (count, mean,
+    p50, p95, max) of every resource read, tool call and internal phase
+    (git.sync, ingest.yaml, ingest.validate, snapshot.load, serialize.*, history.*,
+    uses.expand),
+    and the size of the payloads served.
+    """
+    stats = get_telemetry().snapshot()
+    stats["caches"] = get_cache_stats()
+    stats["intent_scanners"] = get_scanner_stats()
+    stats["raw_files"] = get_raw_file_stats()
+    stats["uses_resolvers"] = get_resolver_stats()
+    return json.dumps(stats, indent=2)
+
+# Set by run_daemon: the socket this process listens on
+daemon_state: Dict[str, Any] = {}
+STARTED_AT = time.time()
+
+@mcp.tool()
+def daemon_info() -> str:
+    """
+    Identifies this server process, so a host can tell whether a running
+    daemon serves the repositories it wants: pid, start time, working
+    directory, repositories config, the number of open sessions and how
+    long ago each repository was last synced.
+    """
+    now = time.time()
+    synced_at = {name: registry.get(name).synced_at for name in registry.names()}
+    return json.dumps({
+        "daemon": bool(daemon_state),
+        "pid": os.getpid(),
+        "started_at": STARTED_AT,
+        "cwd": os.getcwd(),
+        "repos_config": str(Path(REPOS_CONFIG_PATH).resolve()) if REPOS_CONFIG_PATH else None,
+        "socket": daemon_state.get("socket"),
+        "sessions": _lifespan_users - (1 if daemon_state else 0),
+        "repositories": registry.names(),
+        "sync_interval": DAEMON_SYNC_INTERVAL if daemon_state else None,
+        "synced_at": synced_at,
+        "sync_age_seconds": {
+            name: round(now - at, 1) if at is not None else None for name, at in synced_at.items()
+        },
+    }, indent=2)
 
 @mcp.tool()
 def list_capabilities() -> str:
@@ -74,25 +298,159 @@ def list_capabilities() -> str:
 📋 Available Capabilities:
 
 1. **Workflow Files (Source Artifact)**
-   - Resource: workflow://{filename}
+   - Resource: workflow://{filename} | workflow://{repo}/{filename}
    - Description: Access raw YAML workflow files
    - Example: workflow://ci.yml
+   - Resource: workflow://bundle | workflow://{repo}/bundle
+   - Returns: Every workflow file in one response, with its SHA-256
+   - Tool: fetch_workflow_bundle(files?, known_hashes?, repo?)
+   - Returns: Only the files whose hash differs from known_hashes
 
 2. **CI/CD Domain Model**
-   - Resource: cicd://model
+   - Resource: cicd://model | cicd://{repo}/model
    - Description: Parsed and validated workflow structure
    - Returns: JSON representation of all workflows
+   - Resource: cicd://model/{filename} | cicd://{repo}/model/{filename}
+   - Returns: Compact JSON of a single workflow
+   - Resource: cicd://index | cicd://{repo}/index
+   - Returns: Workflows, jobs and 'uses' references only
+   - Resource: cicd://graph | cicd://{repo}/graph
+   - Returns: Job DAG, matrix fan-out, runner minutes, critical path, peak runners
+   - Resource: cicd://expanded | cicd://{repo}/expanded
+   - Returns: Every 'uses' reference resolved once (local composite actions,
+     reusable workflows, remote ones from ACTION_MIRROR_ROOT) and, per job,
+     everything it expands into (also listed as 'expands_to' in the index)
+   - Tool: query_cicd_model(repo?, fields?, workflows?, compact?, page?, page_size?)
 
 3. **Project Intent Files**
-   - Resource: intent://agents-md
+   - Resource: intent://agents-md | intent://{repo}/agents-md
    - Description: Human-written documentation and intent
    - Returns: Contents of agents.md file
+   - Resource: intent://index | intent://{repo}/index
+   - Returns: Every intent file of the checkout, subfolders included
+     (.gitignore'd, vendor and build folders are skipped)
+   - Resource: intent://{path} | intent://{repo}/{path}
+   - Returns: One indexed intent file, by URL-encoded relative path
+   - Tool: read_intent_documents(paths?, repo?, max_bytes?)
+
+4. **Action Usage Index**
+   - Tool: find_action_usages(action, ref?, repo?)
+   - Tool: search_actions(prefix, repo?, limit?)
+   - Tool: find_action_versions(action, version_range, repo?)
+   - Returns: Workflow file, job id and step index of every matching step
+
+5. **Workflow History**
+   - Resource: cicd://timeline | cicd://{repo}/timeline
+   - Description: Commits that changed the structure of a workflow or edited
+     the intent file (jobs, triggers, runners, needs, matrices, actions used)
+   - Tool: query_workflow_history(rev_range?, max_commits?, repo?)
+   - Note: sparse clones are deepened on demand when a walk reaches their shallow boundary
+
+Resources without {repo} target the default repository.
 
 🔧 Management Tools:
-   - refresh_repository(): Update repo from GitHub
+   - refresh_repository(repo?): Update one or all repos from GitHub
+   - list_repositories(): Show the registered repositories
+   - repository_status(): Readiness of each repository
+   - compare_fetch_modes(repo?): Bytes/time saved by sparse vs full clones
    - list_capabilities(): Show this help message
+   - get_model_cache_stats(): Domain model cache hit/miss counters and payload sizes
+   - server_stats(): Latency histograms of every resource, tool and phase, payload sizes
+   - daemon_info(): Process, repositories config and open sessions of this server
+
+🔌 Daemon mode: python server.py --daemon [--socket PATH] keeps the server
+   and its caches running between analyses; the host connects to it when found.
     """
     return capabilities
 
+def socket_in_use(socket_path: Path) -> bool:
+    """Whether a server is listening on a Unix socket (and not just a leftover file)."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(str(socket_path))
+        except OSError:
+            return False
+    return True
+
+def check_socket_folder(folder: Path) -> None:
+    """
+    Refuses a socket folder that another user could enter or replace: it
+    must be a real directory, owned by this user, closed to everyone else.
+    """
+    info = folder.lstat()
+    if not stat.S_ISDIR(info.st_mode):
+        raise SystemExit(f"❌ {folder} is not a directory")
+    if info.st_uid != os.getuid():
+        raise SystemExit(f"❌ {folder} belongs to another user (uid {info.st_uid})")
+    if stat.S_IMODE(info.st_mode) & 0o077:
+        raise SystemExit(f"❌ {folder} is open to other users (mode {stat.S_IMODE(info.st_mode):o}, expected 700)")
+
+def bind_socket(socket_path: Path) -> socket.socket:
+    """Binds the daemon's Unix socket, readable and writable by its owner only."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.bind(str(socket_path))
+        os.chmod(socket_path, 0o600)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+def run_daemon(socket_path: Path) -> None:
+    """
+    Serves MCP over streamable HTTP on a Unix socket until interrupted.
+    
+    The repositories are synced at startup and every DAEMON_SYNC_INTERVAL
+    seconds, and the watchers keep the caches current, so each client
+    session starts with warm models instead of a fresh process, a git pull
+    and a cold parse.
+    """
+    import uvicorn
+
+    socket_path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    check_socket_folder(socket_path.parent)
+    if socket_path.exists():
+        if socket_in_use(socket_path):
+            raise SystemExit(f"❌ A server is already listening on {socket_path}")
+        socket_path.unlink()
+    sock = bind_socket(socket_path)
+    daemon_state["socket"] = str(socket_path)
+
+    # Fork the ingestion workers before uvicorn and the sync start any thread
+    start_ingest_pool()
+
+    # Only local processes reach the socket; clients send 'localhost' without a port
+    mcp.settings.transport_security.allowed_hosts.append("localhost")
+    app = mcp.streamable_http_app()
+
+    async def serve() -> None:
+        async with prepare_repositories(mcp):
+            resync = asyncio.create_task(sync_periodically(DAEMON_SYNC_INTERVAL)) if DAEMON_SYNC_INTERVAL > 0 else None
+            server = uvicorn.Server(uvicorn.Config(app, log_level="warning"))
+            print(f"🔌 Daemon listening on {socket_path} (pid {os.getpid()})")
+            try:
+                await server.serve(sockets=[sock])
+            finally:
+                if resync is not None:
+                    resync.cancel()
+                socket_path.unlink(missing_ok=True)
+
+    # uvicorn re-raises SIGINT/SIGTERM after its graceful shutdown: exit
+    # through the cleanup above instead of dying on the spot
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: sys.exit(0))
+    asyncio.run(serve())
+
 if __name__ == "__main__":
-    mcp.run()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=SERVER_NAME)
+    parser.add_argument("--daemon", action="store_true",
+                        help="Keep running and serve many clients over a Unix socket instead of stdio")
+    parser.add_argument("--socket", type=Path, default=DAEMON_SOCKET,
+                        help="Unix socket of the daemon (default: MCP_DAEMON_SOCKET or a per-user temp folder)")
+    args = parser.parse_args()
+    if args.daemon:
+        run_daemon(args.socket)
+    else:
+        # Fork the ingestion workers first: no other thread may exist at this point
+        start_ingest_pool()
+        mcp.run()
\ No newline at end of file
@@ -0,0 +1,222 @@
+"""
+Inverted index of action usage.
+
+Maps every action referenced by a 'uses' step to its refs (versions), and
+every ref to the places that use it: (workflow file, job id, step index).
+The index is kept per repository next to the model cache and is updated
+file by file: only workflows whose content hash changed are re-indexed.
+"""
+
+import re
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from domain_model import Workflow
+
+VERSION = re.compile(r"^v?(\d+(?:\.\d+)*)$")
+COMPARATOR = re.compile(r"^\s*(>=|<=|==|!=|>|<|=)?\s*(v?\d+(?:\.\d+)*)\s*$")
+
+
+class ActionLocation(NamedTuple):
+    """One step that uses an action."""
+    workflow: str
+    job: str
+    step: int
+
+
+@dataclass
+class ActionRef:
+    """Parsed 'uses' reference. Local actions and docker images have no ref."""
+    action: str
+    ref: str
+
+    @classmethod
+    def parse(cls, uses: str) -> "ActionRef":
+        if uses.startswith(("./", "docker://")):
+            return cls(action=uses, ref="")
+        action, _, ref = uses.rpartition("@")
+        if not action:
+            return cls(action=uses, ref="")
+        return cls(action=action, ref=ref)
+
+
+def parse_version(ref: str) -> Optional[Tuple[int, ...]]:
+    """Parses 'v4', '4.1' or 'v4.1.2' into a comparable tuple; None for branches and SHAs."""
+    match = VERSION.match(ref)
+    if not match:
+        return None
+    parts = tuple(int(p) for p in match.group(1).split("."))
+    # Floating tags compare as their first release: v4 == 4.0.0
+    return parts + (0,) * (3 - len(parts)) if len(parts) < 3 else parts
+
+
+def parse_version_range(spec: str) -> List[Tuple[str, Tuple[int, ...]]]:
+    """
+    Parses a comma separated list of comparators, e.g. '>=v3,<v4' or '==2'.
+
+    Raises:
+        ValueError: If a comparator can't be parsed
+    """
+    constraints = []
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        match = COMPARATOR.match(part)
+        if not match:
+            raise ValueError(f"Invalid version constraint '{part.strip()}'")
+        operator = match.group(1) or "=="
+        constraints.append(("==" if operator == "=" else operator, parse_version(match.group(2))))
+    if not constraints:
+        raise ValueError("Empty version range")
+    return constraints
+
+
+def _satisfies(version: Tuple[int, ...], constraints: List[Tuple[str, Tuple[int, ...]]]) -> bool:
+    checks = {
+        ">=": lambda a, b: a >= b,
+        "<=": lambda a, b: a <= b,
+        ">": lambda a, b: a > b,
+        "<": lambda a, b: a < b,
+        "==": lambda a, b: a == b,
+        "!=": lambda a, b: a != b,
+    }
+    return all(checks[operator](version, bound) for operator, bound in constraints)
+
+
+class ActionIndex:
+    """
+    action -> ref -> [ActionLocation], with the action names also kept
+    sorted for prefix queries. Action names are matched case-insensitively,
+    like GitHub does for owner/repo.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[str, List[ActionLocation]]] = {}
+        self._display: Dict[str, str] = {}
+        self._sorted: List[str] = []
+        self._sorted_dirty = False
+        self._by_file: Dict[str, List[Tuple[str, str]]] = {}
+        self._digests: Dict[str, str] = {}
+        self._synced_signature: Optional[Tuple[Tuple[str, str], ...]] = None
+        self.files_indexed = 0
+
+    def _remove_file(self, filename: str) -> None:
+        for key, ref in set(self._by_file.pop(filename, [])):
+            refs = self._postings.get(key)
+            if refs is None or ref not in refs:
+                continue
+            refs[ref] = [loc for loc in refs[ref] if loc.workflow != filename]
+            if not refs[ref]:
+                del refs[ref]
+            if not refs:
+                del self._postings[key]
+                del self._display[key]
+                self._sorted_dirty = True
+
+    def update_file(self, filename: str, workflow: Optional[Workflow]) -> None:
+        """Re-indexes one workflow file (None removes it from the index)."""
+        self._remove_file(filename)
+        if workflow is None:
+            return
+        contributed: List[Tuple[str, str]] = []
+        for job_id, job in workflow.jobs.items():
+            for step_index, step in enumerate(job.steps):
+                if not step.uses:
+                    continue
+                parsed = ActionRef.parse(step.uses)
+                key = parsed.action.lower()
+                if key not in self._postings:
+                    self._postings[key] = {}
+                    self._display[key] = parsed.action
+                    self._sorted_dirty = True
+                self._postings[key].setdefault(parsed.ref, []).append(
+                    ActionLocation(filename, job_id, step_index)
+                )
+                contributed.append((key, parsed.ref))
+        self._by_file[filename] = contributed
+        self.files_indexed += 1
+
+    def sync(self, signature: Tuple[Tuple[str, str], ...], workflows: Dict[str, Workflow]) -> None:
+        """
+        Brings the index in line with the model: files whose digest changed
+        are re-indexed, files that disappeared are dropped.
+
+        Args:
+            signature: (filename, content digest) of every workflow file
+            workflows: Parsed workflows by filename (files that failed to parse are absent)
+        """
+        if signature is self._synced_signature:
+            return
+        live = dict(signature)
+        for filename in [name for name in self._digests if name not in live]:
+            self._remove_file(filename)
+            del self._digests[filename]
+        for filename, digest in live.items():
+            if self._digests.get(filename) != digest:
+                self.update_file(filename, workflows.get(filename))
+                self._digests[filename] = digest
+        self._synced_signature = signature
+
+    def _sorted_keys(self) -> List[str]:
+        if self._sorted_dirty:
+            self._sorted = sorted(self._postings)
+            self._sorted_dirty = False
+        return self._sorted
+
+    def _describe(self, key: str, refs: Optional[Iterable[str]] = None) -> Dict[str, List[dict]]:
+        postings = self._postings[key]
+        return {
+            ref: [loc._asdict() for loc in postings[ref]]
+            for ref in (refs if refs is not None else sorted(postings))
+        }
+
+    def exact(self, action: str, ref: Optional[str] = None) -> Dict[str, Dict[str, List[dict]]]:
+        """Usages of one action, optionally of a single ref."""
+        key = action.lower()
+        if key not in self._postings:
+            return {}
+        if ref is not None:
+            if ref not in self._postings[key]:
+                return {}
+            return {self._display[key]: self._describe(key, [ref])}
+        return {self._display[key]: self._describe(key)}
+
+    def prefix(self, prefix: str, limit: int = 100) -> Dict[str, Dict[str, List[dict]]]:
+        """Usages of every action whose name starts with the prefix (e.g. 'actions/')."""
+        keys = self._sorted_keys()
+        needle = prefix.lower()
+        result = {}
+        position = bisect_left(keys, needle)
+        while position < len(keys) and len(result) < limit and keys[position].startswith(needle):
+            key = keys[position]
+            result[self._display[key]] = self._describe(key)
+            position += 1
+        return result
+
+    def version_range(self, action: str, spec: str) -> Dict[str, Dict[str, List[dict]]]:
+        """
+        Usages of an action whose ref is a version inside the range.
+        Branch and SHA refs never match.
+
+        Raises:
+            ValueError: If the range can't be parsed
+        """
+        constraints = parse_version_range(spec)
+        key = action.lower()
+        if key not in self._postings:
+            return {}
+        refs = []
+        for ref in sorted(self._postings[key]):
+            version = parse_version(ref)
+            if version is not None and _satisfies(version, constraints):
+                refs.append(ref)
+        return {self._display[key]: self._describe(key, refs)} if refs else {}
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "actions": len(self._postings),
+            "refs": sum(len(refs) for refs in self._postings.values()),
+            "files": len(self._digests),
+            "files_indexed": self.files_indexed,
+        }
@@ -0,0 +1,489 @@
+"""
+Git history reader.
+
+Walks a commit range and reads the workflow and intent files of every
+commit straight from the object database, without checking anything out:
+one 'git log --raw' process lists the blobs each commit changed, and one
+long-lived 'git cat-file --batch' process reads them. Parsed workflows are
+memoized by blob SHA. Blobs are content-addressed, so the memo is shared by
+every commit and repository, and a file that didn't change costs nothing
+however many commits are walked.
+
+Shallow clones only hold the history they fetched (sparse clones fetch
+GIT_CLONE_DEPTH commits). A walk that reaches the shallow boundary before
+max_commits deepens the clone on demand (a blob-less fetch of older
+commits, HISTORY_DEEPEN_ROUNDS times at most) and walks again; the clone
+is then marked so that updates keep that history. The timeline reports
+when the walk still stopped at the boundary. Blob-less (partial) clones
+fetch the missing blobs of the range in one request instead of one lazy
+fetch per blob. Blobs that can't be read or parsed are not memoized.
+"""
+
+import subprocess
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set
+
+from config import HISTORY_BLOB_MEMO_SIZE, HISTORY_DEEPEN_ROUNDS
+from domain_model import Workflow
+from utils.git_operations import mark_history_deepened
+from utils.ingestion import ingest_workflows
+from utils.telemetry import span
+
+WORKFLOWS_DIR = ".github/workflows"
+WORKFLOW_SUFFIXES = (".yml", ".yaml")
+NULL_SHA = "0" * 40
+
+# Separates the commits of the 'git log' output (the fields are NUL separated)
+RECORD_SEPARATOR = "\x1e"
+LOG_FORMAT = "--format=%x1e%H%x00%ct%x00%an%x00%s"
+
+
+@dataclass
+class FileChange:
+    """A file added (old_blob None), removed (new_blob None) or modified by a commit."""
+    path: str
+    old_blob: Optional[str]
+    new_blob: Optional[str]
+
+
+@dataclass
+class HistoryCommit:
+    """A commit of the walked range, with its changes to the watched paths."""
+    sha: str
+    timestamp: int
+    author: str
+    subject: str
+    changes: List[FileChange] = field(default_factory=list)
+
+
+@dataclass
+class ParsedBlob:
+    """Structural summary of a workflow blob, or the reason it doesn't parse."""
+    signature: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+
+def _git(repo_path: Path, *args: str, input: Optional[bytes] = None) -> bytes:
+    """
+    Runs a git command in a repository and returns its output.
+
+    Raises:
+        ValueError: If git exits with a non-zero status (bad range, not a repository...)
+    """
+    try:
+        return subprocess.run(
+            ["git", "-C", str(repo_path), *args], input=input, capture_output=True, check=True
+        ).stdout
+    except subprocess.CalledProcessError as e:
+        message = e.stderr.decode(errors="replace").strip().splitlines()
+        raise ValueError(message[0] if message else f"git {args[0]} failed") from None
+
+
+def is_workflow_path(path: str) -> bool:
+    directory, _, name = path.rpartition("/")
+    return directory == WORKFLOWS_DIR and name.endswith(WORKFLOW_SUFFIXES)
+
+
+def shallow_roots(repo_path: Path) -> Set[str]:
+    """Commits at the shallow boundary of a clone (their parents weren't fetched)."""
+    shallow_file = Path(_git(repo_path, "rev-parse", "--git-path", "shallow").decode().strip())
+    try:
+        return set((repo_path / shallow_file).read_text(encoding="utf-8").split())
+    except OSError:
+        return set()
+
+
+def reaches_shallow_boundary(repo_path: Path, rev_range: str) -> bool:
+    """True when a range runs into the shallow boundary, i.e. older commits of it are missing."""
+    roots = shallow_roots(repo_path)
+    if not roots:
+        return False
+    return not roots.isdisjoint(_git(repo_path, "rev-list", rev_range).decode().split())
+
+
+def deepen_history(repo_path: Path, commits: int) -> bool:
+    """
+    Fetches 'commits' more commits of the remote HEAD behind the shallow
+    boundary, without their blobs, and marks the clone as deepened.
+
+    Returns:
+        False when the fetch failed (no remote, offline...)
+    """
+    try:
+        _git(
+            repo_path, "fetch", "--quiet", "origin", "HEAD", f"--deepen={commits}", "--filter=blob:none",
+            "--no-tags", "--no-write-fetch-head", "--recurse-submodules=no",
+        )
+        mark_history_deepened(repo_path)
+    except (ValueError, subprocess.CalledProcessError) as e:
+        print(f"⚠️ Could not deepen the history of {repo_path.name}: {e}", file=sys.stderr)
+        return False
+    print(f"📜 Deepened the history of {repo_path.name} by {commits} commits", file=sys.stderr)
+    return True
+
+
+def list_commits(repo_path: Path, rev_range: str, paths: Sequence[str], max_commits: int) -> List[HistoryCommit]:
+    """
+    Lists the most recent commits of a range that changed one of the paths,
+    oldest first. Merges are compared with their first parent, so changes
+    brought in by a merged branch show up at the merge commit.
+
+    Args:
+        repo_path: Path to the repository
+        rev_range: Commit range in git syntax, e.g. "HEAD", "v1.0..main"
+        paths: Pathspecs of the watched files
+        max_commits: Upper bound of commits returned (the most recent ones)
+    """
+    output = _git(
+        repo_path, "log", f"--max-count={max_commits}", "--reverse", "--first-parent",
+        "--diff-merges=first-parent", "--raw", "--no-renames", "--no-abbrev", "-z", LOG_FORMAT,
+        rev_range, "--", *paths,
+    ).decode("utf-8", errors="replace")
+
+    commits = []
+    for record in output.split(RECORD_SEPARATOR)[1:]:
+        fields = record.split("\0")
+        sha, timestamp, author, subject = fields[:4]
+        commit = HistoryCommit(sha=sha, timestamp=int(timestamp), author=author, subject=subject)
+        # The raw diff alternates ':<modes> <old> <new> <status>' and '<path>'
+        rest = fields[4:]
+        for meta, path in zip(rest[::2], rest[1::2]):
+            meta = meta.lstrip("\n")
+            if not meta.startswith(":"):
+                continue
+            _, _, old_blob, new_blob, _ = meta[1:].split(" ", 4)
+            commit.changes.append(FileChange(
+                path=path,
+                old_blob=None if old_blob == NULL_SHA else old_blob,
+                new_blob=None if new_blob == NULL_SHA else new_blob,
+            ))
+        commits.append(commit)
+    return commits
+
+
+def prefetch_blobs(repo_path: Path, blobs: Iterable[str]) -> None:
+    """
+    Fetches blobs of a partial (blob-less) clone in one request, the way git
+    itself batches promisor fetches. Does nothing in a complete clone.
+    """
+    try:
+        promisors = _git(repo_path, "config", "--get-regexp", r"^remote\..*\.promisor$").decode().split("\n")
+    except ValueError:
+        return
+    remotes = [key[len("remote."):-len(".promisor")] for key, _, value in
+               (line.partition(" ") for line in promisors) if value.strip() == "true"]
+    oids = "".join(f"{oid}\n" for oid in blobs)
+    if not remotes or not oids:
+        return
+    remote = remotes[0]
+    try:
+        _git(
+            repo_path, "-c", "fetch.negotiationAlgorithm=noop", "fetch", "--quiet", remote,
+            "--no-tags", "--no-write-fetch-head", "--recurse-submodules=no", "--filter=blob:none", "--stdin",
+            input=oids.encode(),
+        )
+    except ValueError as e:
+        # Each blob is then fetched lazily as it is read
+        print(f"⚠️ Could not prefetch {oids.count(chr(10))} blobs of {repo_path.name}: {e}", file=sys.stderr)
+
+
+class GitObjectReader:
+    """A long-lived 'git cat-file --batch' process that reads objects by SHA."""
+
+    def __init__(self, repo_path: Path):
+        self._process = subprocess.Popen(
+            ["git", "-C", str(repo_path), "cat-file", "--batch"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+        self.reads = 0
+
+    def read(self, oid: str) -> Optional[bytes]:
+        """Returns the content of an object, or None when it doesn't exist."""
+        self._process.stdin.write(f"{oid}\n".encode())
+        self._process.stdin.flush()
+        header = self._process.stdout.readline()
+        if not header or header.endswith(b" missing\n"):
+            return None
+        size = int(header.split()[2])
+        content = self._process.stdout.read(size)
+        self._process.stdout.read(1)  # trailing newline
+        self.reads += 1
+        return content
+
+    def close(self) -> None:
+        if self._process.poll() is None:
+            self._process.stdin.close()
+            self._process.wait()
+
+    def __enter__(self) -> "GitObjectReader":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def _as_list(value: Any) -> List[Any]:
+    if value is None:
+        return []
+    return list(value) if isinstance(value, (list, tuple)) else [value]
+
+
+def structural_signature(workflow: Workflow) -> Dict[str, Any]:
+    """
+    The parts of a workflow the analysis reasons about: triggers, jobs, job
+    dependencies, runners, matrices and the actions each job uses.
+    """
+    triggers = workflow.on.keys() if isinstance(workflow.on, dict) else _as_list(workflow.on)
+    return {
+        "name": workflow.name,
+        "triggers": sorted(str(trigger) for trigger in triggers),
+        "jobs": {
+            job_id: {
+                "runs_on": job.runs_on,
+                "needs": sorted(_as_list(job.needs)),
+                "matrix": bool(job.strategy and job.strategy.get("matrix")),
+                "steps": len(job.steps),
+                "uses": sorted({step.uses for step in job.steps if step.uses} | ({job.uses} if job.uses else set())),
+            }
+            for job_id, job in workflow.jobs.items()
+        },
+    }
+
+
+def diff_signatures(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Structural differences between two versions of a workflow.
+
+    Returns:
+        An empty dict when the change was not structural (e.g. only 'run' scripts)
+    """
+    changes: Dict[str, Any] = {}
+    if old["name"] != new["name"]:
+        changes["name"] = [old["name"], new["name"]]
+    for key, before, after in (("triggers", old["triggers"], new["triggers"]),
+                               ("jobs", list(old["jobs"]), list(new["jobs"]))):
+        added = [item for item in after if item not in before]
+        removed = [item for item in before if item not in after]
+        if added:
+            changes[f"{key}_added"] = added
+        if removed:
+            changes[f"{key}_removed"] = removed
+
+    jobs_changed = {}
+    for job_id in old["jobs"].keys() & new["jobs"].keys():
+        before, after = old["jobs"][job_id], new["jobs"][job_id]
+        job_changes: Dict[str, Any] = {
+            key: [before[key], after[key]]
+            for key in ("runs_on", "needs", "matrix", "steps")
+            if before[key] != after[key]
+        }
+        uses_added = [uses for uses in after["uses"] if uses not in before["uses"]]
+        uses_removed = [uses for uses in before["uses"] if uses not in after["uses"]]
+        if uses_added:
+            job_changes["uses_added"] = uses_added
+        if uses_removed:
+            job_changes["uses_removed"] = uses_removed
+        if job_changes:
+            jobs_changed[job_id] = job_changes
+    if jobs_changed:
+        changes["jobs_changed"] = dict(sorted(jobs_changed.items()))
+    return changes
+
+
+class BlobMemo:
+    """
+    Bounded, thread-safe memo of parsed workflow blobs, least recently used
+    out first. Only successful parses are kept: a blob that couldn't be read
+    (e.g. before the clone was deepened) or parsed is retried next time.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, ParsedBlob]" = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, oid: str) -> Optional[ParsedBlob]:
+        with self._lock:
+            parsed = self._entries.get(oid)
+            if parsed is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(oid)
+            self.hits += 1
+            return parsed
+
+    def put(self, oid: str, parsed: ParsedBlob) -> None:
+        if parsed.error is not None:
+            return
+        with self._lock:
+            self._entries[oid] = parsed
+            self._entries.move_to_end(oid)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+_blob_memo = BlobMemo(HISTORY_BLOB_MEMO_SIZE)
+
+
+def get_blob_memo() -> BlobMemo:
+    return _blob_memo
+
+
+def parse_blobs(repo_path: Path, oids: Iterable[str]) -> Dict[str, ParsedBlob]:
+    """
+    Parses workflow blobs, reading only the ones that aren't memoized yet.
+
+    Returns:
+        The parsed blob of every requested SHA
+    """
+    wanted = list(dict.fromkeys(oids))
+    parsed = {oid: blob for oid in wanted if (blob := _blob_memo.get(oid)) is not None}
+    missing = [oid for oid in wanted if oid not in parsed]
+    if not missing:
+        return parsed
+    prefetch_blobs(repo_path, missing)
+    items = []
+    with GitObjectReader(repo_path) as reader:
+        for oid in missing:
+            content = reader.read(oid)
+            if content is None:
+                parsed[oid] = ParsedBlob(error="Blob not available in this clone")
+            else:
+                items.append((oid, content))
+    for result in ingest_workflows(items):
+        if result.workflow is not None:
+            parsed[result.filename] = ParsedBlob(signature=structural_signature(result.workflow))
+        else:
+            parsed[result.filename] = ParsedBlob(error=result.error)
+    for oid in missing:
+        _blob_memo.put(oid, parsed[oid])
+    return parsed
+
+
+def _summary(signature: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "triggers": signature["triggers"],
+        "jobs": list(signature["jobs"]),
+        "uses": sorted({uses for job in signature["jobs"].values() for uses in job["uses"]}),
+    }
+
+
+def _workflow_change(change: FileChange, parsed: Dict[str, ParsedBlob]) -> Optional[Dict[str, Any]]:
+    """Timeline entry of a workflow file change, or None when it wasn't structural."""
+    name = change.path.rpartition("/")[2]
+    old = parsed[change.old_blob] if change.old_blob else None
+    new = parsed[change.new_blob] if change.new_blob else None
+    if new is None:
+        return {"file": name, "change": "removed"}
+    if new.error is not None:
+        if old is not None and old.error is not None:
+            return None
+        return {"file": name, "change": "invalid", "error": new.error.strip().splitlines()[0]}
+    if old is None:
+        return {"file": name, "change": "added", **_summary(new.signature)}
+    if old.error is not None:
+        return {"file": name, "change": "fixed", **_summary(new.signature)}
+    changes = diff_signatures(old.signature, new.signature)
+    return {"file": name, "change": "modified", **changes} if changes else None
+
+
+def build_timeline(
+    repo_path: Path,
+    rev_range: str,
+    max_commits: int,
+    intent_filenames: Sequence[str],
+) -> Dict[str, Any]:
+    """
+    Builds the per-commit timeline of structural workflow changes and intent
+    file edits of a commit range.
+
+    Args:
+        repo_path: Path to the repository
+        rev_range: Commit range in git syntax, e.g. "HEAD", "v1.0..main"
+        max_commits: Upper bound of commits walked (the most recent ones)
+        intent_filenames: Intent files at the repository root (e.g. AGENTS.md)
+
+    Returns:
+        Timeline (oldest commit first) and walk statistics
+
+    Raises:
+        ValueError: If the range is invalid or the folder isn't a git repository
+    """
+    if rev_range.startswith("-"):
+        raise ValueError(f"Invalid commit range '{rev_range}'.")
+    start = time.perf_counter()
+    paths = [WORKFLOWS_DIR, *intent_filenames]
+    limit = max(1, max_commits)
+    memo_hits = _blob_memo.hits
+
+    with span("history.log"):
+        commits = list_commits(repo_path, rev_range, paths, limit)
+        shallow = len(commits) < limit and reaches_shallow_boundary(repo_path, rev_range)
+        deepened = 0
+        for attempt in range(HISTORY_DEEPEN_ROUNDS):
+            if not shallow or not deepen_history(repo_path, limit << attempt):
+                break
+            deepened += limit << attempt
+            commits = list_commits(repo_path, rev_range, paths, limit)
+            shallow = len(commits) < limit and reaches_shallow_boundary(repo_path, rev_range)
+
+    # Every version of every workflow in the range, each read and parsed once
+    blobs = [
+        blob
+        for commit in commits
+        for change in commit.changes if is_workflow_path(change.path)
+        for blob in (change.old_blob, change.new_blob) if blob
+    ]
+    with span("history.parse"):
+        parsed = parse_blobs(repo_path, blobs)
+
+    timeline = []
+    for commit in commits:
+        workflows = []
+        intent = []
+        for change in commit.changes:
+            if is_workflow_path(change.path):
+                entry = _workflow_change(change, parsed)
+                if entry is not None:
+                    workflows.append(entry)
+            elif change.path in intent_filenames:
+                kind = "added" if change.old_blob is None else "removed" if change.new_blob is None else "modified"
+                intent.append({"file": change.path, "change": kind})
+        if workflows or intent:
+            timeline.append({
+                "commit": commit.sha,
+                "date": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(commit.timestamp)),
+                "author": commit.author,
+                "subject": commit.subject,
+                "workflows": workflows,
+                "intent": intent,
+            })
+
+    return {
+        "range": rev_range,
+        "commits_walked": len(commits),
+        "commits_with_changes": len(timeline),
+        # The walk stopped at max_commits; older commits were not read
+        "truncated": len(commits) >= max_commits,
+        # The walk stopped at the shallow boundary of the clone, even after deepening it
+        "shallow": shallow,
+        "deepened_by": deepened,
+        "blobs": {
+            "distinct": len(parsed),
+            "memoized": _blob_memo.hits - memo_hits,
+            "parsed": len(parsed) - (_blob_memo.hits - memo_hits),
+        },
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+        "timeline": timeline,
+    }
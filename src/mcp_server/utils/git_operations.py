@@ -1,52 +1,324 @@
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+import asyncio
+import os
+import shutil
 import subprocess
+import sys
+import tempfile
+import time
 
-def clone_or_update_repo(repo_url: str, target_path: Path) -> Path:
+# Fetch modes
+# - "full": complete history and every blob (plain clone + pull)
+# - "sparse": shallow, blob-less clone that only checks out the paths
+#   the capabilities read (see capabilities.SPARSE_CHECKOUT_PATTERNS)
+FETCH_MODE_FULL = "full"
+FETCH_MODE_SPARSE = "sparse"
+
+# Local git config key set on a shallow clone whose history was deepened
+# (see utils/git_history.py), so updates stop cutting it back to 'depth'
+HISTORY_DEEPENED_KEY = "mcp.historyDeepened"
+
+def repo_name_from_url(repo_url: str) -> str:
+    """
+    Extracts the repository name from a clone URL or local path
+    (e.g., "repo-name" from "https://github.com/user/repo-name.git").
+    """
+    name = repo_url.rstrip('/').split('/')[-1]
+    return name[:-4] if name.endswith('.git') else name
+
+def _clone_commands(
+    repo_url: str,
+    repo_path: Path,
+    fetch_mode: str,
+    sparse_patterns: Sequence[str],
+    depth: int,
+) -> List[List[str]]:
+    """Returns the git commands that create a new clone in the given mode."""
+    if fetch_mode == FETCH_MODE_FULL:
+        return [["clone", repo_url, str(repo_path)]]
+
+    return [
+        ["clone", f"--depth={depth}", "--filter=blob:none", "--no-checkout", repo_url, str(repo_path)],
+        ["-C", str(repo_path), "sparse-checkout", "set", "--no-cone", *sparse_patterns],
+        ["-C", str(repo_path), "checkout"],
+    ]
+
+def is_history_deepened(repo_path: Path) -> bool:
+    """True when the history of a shallow clone was deepened on demand."""
+    result = subprocess.run(
+        ["git", "-C", str(repo_path), "config", "--local", "--bool", "--get", HISTORY_DEEPENED_KEY],
+        capture_output=True, text=True,
+    )
+    return result.stdout.strip() == "true"
+
+def mark_history_deepened(repo_path: Path) -> None:
+    """Records that a shallow clone keeps the history it fetched beyond 'depth'."""
+    subprocess.run(
+        ["git", "-C", str(repo_path), "config", "--local", HISTORY_DEEPENED_KEY, "true"],
+        check=True, capture_output=True,
+    )
+
+def clone_fetch_mode(repo_path: Path) -> str:
+    """
+    Returns the mode an existing clone was made in: sparse when it has a
+    sparse checkout or a shallow history, full otherwise.
+    """
+    sparse_checkout = subprocess.run(
+        ["git", "-C", str(repo_path), "config", "--bool", "--get", "core.sparseCheckout"],
+        capture_output=True, text=True,
+    )
+    if sparse_checkout.stdout.strip() == "true":
+        return FETCH_MODE_SPARSE
+    shallow_file = subprocess.run(
+        ["git", "-C", str(repo_path), "rev-parse", "--git-path", "shallow"],
+        capture_output=True, text=True,
+    )
+    if shallow_file.returncode == 0 and (repo_path / shallow_file.stdout.strip()).exists():
+        return FETCH_MODE_SPARSE
+    return FETCH_MODE_FULL
+
+def _update_commands(
+    repo_path: Path,
+    fetch_mode: str,
+    sparse_patterns: Sequence[str],
+    depth: int,
+) -> List[List[str]]:
+    """
+    Returns the git commands that update an existing clone.
+
+    A clone keeps the mode it was made in, whatever fetch_mode is now
+    configured: a full clone is pulled, never shallowed or reset. Sparse
+    updates never merge: they fetch the remote HEAD and move the checkout
+    onto it, so local state can't cause conflicts. A clone whose history
+    was deepened fetches without --depth: the new commits are added on top
+    of the history it has, instead of shallowing it again.
+    """
+    current_mode = clone_fetch_mode(repo_path)
+    if current_mode != fetch_mode:
+        print(f"ℹ️  {repo_path} is a {current_mode} clone, updating it as such (configured: {fetch_mode})",
+              file=sys.stderr)
+    if current_mode == FETCH_MODE_FULL:
+        return [["-C", str(repo_path), "pull"]]
+
+    shallow = [] if is_history_deepened(repo_path) else [f"--depth={depth}"]
+    commands = [["-C", str(repo_path), "fetch", *shallow, "--filter=blob:none", "origin", "HEAD"]]
+    if sparse_patterns:
+        commands.append(["-C", str(repo_path), "sparse-checkout", "set", "--no-cone", *sparse_patterns])
+    commands.append(["-C", str(repo_path), "reset", "--hard", "FETCH_HEAD"])
+    return commands
+
+def _check_fetch_mode(fetch_mode: str, sparse_patterns: Sequence[str]) -> None:
+    if fetch_mode not in (FETCH_MODE_FULL, FETCH_MODE_SPARSE):
+        raise ValueError(f"Unknown fetch mode '{fetch_mode}'.")
+    if fetch_mode == FETCH_MODE_SPARSE and not sparse_patterns:
+        raise ValueError("Sparse fetch mode needs at least one sparse-checkout pattern.")
+
+def clone_or_update_repo(
+    repo_url: str,
+    target_path: Path,
+    fetch_mode: str = FETCH_MODE_FULL,
+    sparse_patterns: Sequence[str] = (),
+    depth: int = 1,
+) -> Path:
     """
     Clones a GitHub repository if it doesn't exist locally,
     or updates it if it already exists.
-    
+
     Args:
         repo_url: GitHub repository URL (HTTPS)
         target_path: Local path where the repo will be cloned
-    
+        fetch_mode: "full" or "sparse" (shallow, blob-less, sparse checkout)
+        sparse_patterns: Paths to check out in sparse mode (gitignore syntax)
+        depth: History depth fetched in sparse mode
+
     Returns:
         Path to the cloned repository
     """
-    # Extract repo name from URL (e.g., "repo-name" from "https://github.com/user/repo-name.git")
-    repo_name = repo_url.rstrip('/').split('/')[-1].replace('.git', '')
-    repo_path = target_path / repo_name
-    
+    _check_fetch_mode(fetch_mode, sparse_patterns)
+    repo_path = target_path / repo_name_from_url(repo_url)
+
     try:
         if repo_path.exists():
-            print(f"📂 Repository already exists at {repo_path}, updating...")
-            # Pull latest changes
-            subprocess.run(
-                ["git", "-C", str(repo_path), "pull"],
-                check=True,
-                capture_output=True,
-                text=True
-            )
-            print(f"✅ Repository updated successfully")
+            print(f"📂 Repository already exists at {repo_path}, updating...", file=sys.stderr)
+            commands = _update_commands(repo_path, fetch_mode, sparse_patterns, depth)
         else:
-            print(f"📥 Cloning repository from {repo_url}...")
+            print(f"📥 Cloning repository from {repo_url}...", file=sys.stderr)
             # Create parent directory if it doesn't exist
             target_path.mkdir(parents=True, exist_ok=True)
-            
-            # Clone the repository
+            commands = _clone_commands(repo_url, repo_path, fetch_mode, sparse_patterns, depth)
+
+        for args in commands:
             subprocess.run(
-                ["git", "clone", repo_url, str(repo_path)],
+                ["git", *args],
                 check=True,
                 capture_output=True,
                 text=True
             )
-            print(f"✅ Repository cloned successfully to {repo_path}")
-        
+        print(f"✅ Repository ready at {repo_path}", file=sys.stderr)
+
         return repo_path
-        
+
     except subprocess.CalledProcessError as e:
-        print(f"❌ Git operation failed: {e.stderr}")
+        print(f"❌ Git operation failed: {e.stderr}", file=sys.stderr)
         raise
     except Exception as e:
-        print(f"❌ Error cloning/updating repository: {e}")
-        raise
\ No newline at end of file
+        print(f"❌ Error cloning/updating repository: {e}", file=sys.stderr)
+        raise
+
+async def _run_git(*args: str) -> str:
+    """
+    Runs a git command as an async subprocess.
+
+    Raises:
+        subprocess.CalledProcessError: If git exits with a non-zero status
+    """
+    process = await asyncio.create_subprocess_exec(
+        "git", *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stdout, stderr = await process.communicate()
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(
+            process.returncode, ["git", *args],
+            output=stdout.decode(errors="replace"),
+            stderr=stderr.decode(errors="replace"),
+        )
+    return stdout.decode(errors="replace")
+
+async def clone_or_update_repo_async(
+    repo_url: str,
+    target_path: Path,
+    repo_name: Optional[str] = None,
+    fetch_mode: str = FETCH_MODE_FULL,
+    sparse_patterns: Sequence[str] = (),
+    depth: int = 1,
+) -> Path:
+    """
+    Async counterpart of clone_or_update_repo().
+    Runs git without blocking the event loop, so many repositories
+    can be cloned or pulled at the same time.
+
+    Args:
+        repo_url: Repository URL (HTTPS, SSH or a local/bare repository path)
+        target_path: Local folder that holds the clones
+        repo_name: Folder name of the clone (defaults to the name in the URL)
+        fetch_mode: "full" or "sparse" (shallow, blob-less, sparse checkout)
+        sparse_patterns: Paths to check out in sparse mode (gitignore syntax)
+        depth: History depth fetched in sparse mode
+
+    Returns:
+        Path to the cloned repository
+    """
+    _check_fetch_mode(fetch_mode, sparse_patterns)
+    repo_path = target_path / (repo_name or repo_name_from_url(repo_url))
+
+    try:
+        if repo_path.exists():
+            print(f"📂 Updating {repo_path}...", file=sys.stderr)
+            commands = _update_commands(repo_path, fetch_mode, sparse_patterns, depth)
+        else:
+            print(f"📥 Cloning repository from {repo_url}...", file=sys.stderr)
+            target_path.mkdir(parents=True, exist_ok=True)
+            commands = _clone_commands(repo_url, repo_path, fetch_mode, sparse_patterns, depth)
+        for args in commands:
+            await _run_git(*args)
+        return repo_path
+    except subprocess.CalledProcessError as e:
+        print(f"❌ Git operation failed for {repo_url}: {e.stderr}", file=sys.stderr)
+        raise
+
+async def sync_repositories(
+    repos: Dict[str, str],
+    target_path: Path,
+    max_concurrency: int,
+    fetch_modes: Optional[Dict[str, str]] = None,
+    sparse_patterns: Sequence[str] = (),
+    depth: int = 1,
+) -> Dict[str, Union[Path, Exception]]:
+    """
+    Clones or updates several repositories concurrently.
+    At most max_concurrency git processes run at the same time.
+
+    Args:
+        repos: Mapping of repository name to clone URL
+        target_path: Local folder that holds the clones
+        max_concurrency: Upper bound of concurrent git operations
+        fetch_modes: Mapping of repository name to fetch mode (defaults to "full")
+        sparse_patterns: Paths to check out in sparse mode
+        depth: History depth fetched in sparse mode
+
+    Returns:
+        Mapping of repository name to its local path, or to the exception
+        that made the clone/pull fail (one failure never aborts the others)
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    fetch_modes = fetch_modes or {}
+
+    async def sync_one(name: str, url: str) -> Union[Path, Exception]:
+        async with semaphore:
+            try:
+                return await clone_or_update_repo_async(
+                    url, target_path, name,
+                    fetch_mode=fetch_modes.get(name, FETCH_MODE_FULL),
+                    sparse_patterns=sparse_patterns,
+                    depth=depth,
+                )
+            except Exception as e:
+                return e
+
+    results = await asyncio.gather(*(sync_one(name, url) for name, url in repos.items()))
+    return dict(zip(repos.keys(), results))
+
+# =============================================================================
+# FETCH MODE SAVINGS REPORT
+# =============================================================================
+@dataclass
+class CloneMeasurement:
+    """Cost of cloning a repository in one fetch mode."""
+    fetch_mode: str
+    seconds: float
+    bytes_on_disk: int
+
+def directory_size(path: Path) -> int:
+    """Returns the total size in bytes of the files under a folder (.git included)."""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+async def measure_fetch_savings(
+    repo_url: str,
+    sparse_patterns: Sequence[str],
+    depth: int = 1,
+) -> Dict[str, CloneMeasurement]:
+    """
+    Clones a repository twice into a scratch folder, once in full mode and
+    once in sparse mode, and measures time and disk usage of each clone.
+
+    Note: local paths are cloned with hardlinks and ignore --depth/--filter;
+    use a file:// URL to measure a local repository.
+
+    Returns:
+        Mapping of fetch mode to its CloneMeasurement
+    """
+    results: Dict[str, CloneMeasurement] = {}
+    scratch = Path(tempfile.mkdtemp(prefix="mcp-fetch-savings-"))
+    try:
+        for mode in (FETCH_MODE_FULL, FETCH_MODE_SPARSE):
+            start = time.perf_counter()
+            repo_path = await clone_or_update_repo_async(
+                repo_url, scratch, mode,
+                fetch_mode=mode, sparse_patterns=sparse_patterns, depth=depth,
+            )
+            elapsed = time.perf_counter() - start
+            results[mode] = CloneMeasurement(mode, elapsed, directory_size(repo_path))
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    return results
@@ -0,0 +1,124 @@
+"""
+.gitignore matching.
+
+A small implementation of the gitignore pattern rules, enough to prune a
+directory walk the way git would: comments and blank lines, '!' negation,
+trailing '/' for directories only, patterns anchored by a slash, and the
+'*', '?', '[...]' and '**' wildcards. Rules of deeper .gitignore files are
+checked after the ones of their parents, and the last matching rule wins.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+
+@dataclass
+class IgnoreRule:
+    """One pattern of a .gitignore file, compiled against paths relative to the repository root."""
+    pattern: str
+    regex: "re.Pattern[str]"
+    negate: bool = False
+    dir_only: bool = False
+
+
+def _translate(glob: str) -> str:
+    """Translates a gitignore glob (without anchoring) into a regular expression."""
+    out = []
+    i = 0
+    while i < len(glob):
+        char = glob[i]
+        if glob.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+            continue
+        if glob.startswith("/**", i) and i + 3 == len(glob):
+            out.append("/.*")
+            i += 3
+            continue
+        if char == "*":
+            # A '**' that isn't a whole path segment behaves like '*'
+            while i + 1 < len(glob) and glob[i + 1] == "*":
+                i += 1
+            out.append("[^/]*")
+        elif char == "?":
+            out.append("[^/]")
+        elif char == "[":
+            end = glob.find("]", i + 2 if glob[i + 1:i + 2] in ("!", "]") else i + 1)
+            if end == -1:
+                out.append(re.escape(char))
+            else:
+                body = glob[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append(f"[{body.replace(chr(92), chr(92) * 2)}]")
+                i = end
+        elif char == "\\" and i + 1 < len(glob):
+            i += 1
+            out.append(re.escape(glob[i]))
+        else:
+            out.append(re.escape(char))
+        i += 1
+    return "".join(out)
+
+
+def parse_gitignore(text: str, base: str = "") -> List[IgnoreRule]:
+    """
+    Compiles the rules of a .gitignore file.
+
+    Args:
+        text: Content of the file
+        base: Folder of the file, relative to the repository root ("" for the root)
+
+    Returns:
+        The rules, in file order
+    """
+    prefix = re.escape(f"{base}/") if base else ""
+    rules = []
+    for line in text.splitlines():
+        # Trailing spaces are ignored unless escaped
+        if not line.endswith("\\ "):
+            line = line.rstrip(" ")
+        if not line or line.startswith("#"):
+            continue
+        negate = line.startswith("!")
+        if negate or line.startswith("\\!") or line.startswith("\\#"):
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+        # A slash anywhere but at the end anchors the pattern to the .gitignore's folder
+        if "/" in line:
+            regex = f"^{prefix}{_translate(line.lstrip('/'))}$"
+        else:
+            regex = f"^{prefix}(?:.*/)?{_translate(line)}$"
+        rules.append(IgnoreRule(pattern=line, regex=re.compile(regex), negate=negate, dir_only=dir_only))
+    return rules
+
+
+class IgnoreMatcher:
+    """
+    The rules that apply inside one folder: its own .gitignore on top of
+    the rules of its parents. Matchers are immutable, so a walk can share a
+    parent's matcher between all of its subfolders.
+    """
+
+    def __init__(self, rules: Sequence[IgnoreRule] = (), parent: Optional["IgnoreMatcher"] = None):
+        self.rules: List[IgnoreRule] = [*(parent.rules if parent else ()), *rules]
+
+    def child(self, rules: Sequence[IgnoreRule]) -> "IgnoreMatcher":
+        return IgnoreMatcher(rules, self) if rules else self
+
+    def is_ignored(self, path: str, is_dir: bool) -> bool:
+        """
+        Args:
+            path: Path relative to the repository root, with '/' separators
+            is_dir: Whether the path is a folder ('dir/' rules only match folders)
+        """
+        for rule in reversed(self.rules):
+            if rule.dir_only and not is_dir:
+                continue
+            if rule.regex.match(path):
+                return not rule.negate
+        return False
@@ -0,0 +1,178 @@
+"""
+Workflow ingestion engine.
+
+Turns raw workflow files into validated Workflow models. Parsing uses
+libyaml's CSafeLoader when PyYAML was built with it, and falls back to the
+pure-Python SafeLoader otherwise. Large batches are spread across a process
+pool; results always come back in input order so the built Repository is
+identical to a sequential load.
+
+Workers are forked. Forking a process whose other threads may hold locks
+can leave the children deadlocked, so the server starts a long-lived pool
+(start_ingest_pool) before any thread exists; a process that already runs
+threads and has no such pool parses sequentially.
+"""
+
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, List, Optional, Sequence, Tuple, Union
+
+import yaml
+
+from config import INGEST_PARALLEL_THRESHOLD, INGEST_MAX_WORKERS
+from domain_model import Workflow
+
+# libyaml is an optional C extension of PyYAML
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+YAML_ACCELERATED = YAML_LOADER is not yaml.SafeLoader
+
+
+@dataclass
+class IngestResult:
+    """Outcome of ingesting one workflow file. Exactly one of workflow/error is set."""
+    filename: str
+    workflow: Optional[Workflow] = None
+    error: Optional[str] = None
+    # Time spent in the YAML parser and in pydantic validation
+    yaml_seconds: float = 0.0
+    validate_seconds: float = 0.0
+
+
+def parse_workflow(content: Union[str, bytes]) -> Workflow:
+    """
+    Parses and validates the content of a single workflow file.
+
+    Args:
+        content: Raw YAML text of the workflow
+
+    Returns:
+        Validated Workflow domain model
+    """
+    # Pydantic validation
+    return Workflow.model_validate(load_yaml(content))
+
+
+def load_yaml(content: Union[str, bytes]) -> Any:
+    """Parses the YAML of a workflow file, before validation."""
+    raw_data = yaml.load(content, Loader=YAML_LOADER)
+
+    # Fix for YAML 1.1 (on=True) vs 1.2 (on="on") compatibility
+    if isinstance(raw_data, dict) and True in raw_data:
+        raw_data["on"] = raw_data.pop(True)
+    return raw_data
+
+
+def load_workflow_file(file_path: Path) -> Workflow:
+    """Reads, parses and validates a single workflow file."""
+    return parse_workflow(file_path.read_bytes())
+
+
+def _ingest_one(item: Tuple[str, bytes]) -> IngestResult:
+    """Worker entry point. Never raises, so one bad file cannot abort a batch."""
+    filename, content = item
+    result = IngestResult(filename=filename)
+    start = time.perf_counter()
+    parsed = None
+    try:
+        raw_data = load_yaml(content)
+        parsed = time.perf_counter()
+        result.workflow = Workflow.model_validate(raw_data)
+    except Exception as e:
+        result.error = str(e)
+    end = time.perf_counter()
+    result.yaml_seconds = (parsed or end) - start
+    result.validate_seconds = end - parsed if parsed else 0.0
+    return result
+
+
+# Long-lived pool started by start_ingest_pool()
+_shared_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _warm_up(_: int) -> None:
+    """No-op task that makes the pool fork its workers."""
+
+
+def start_ingest_pool(max_workers: Optional[int] = INGEST_MAX_WORKERS) -> Optional[ProcessPoolExecutor]:
+    """
+    Starts the long-lived worker pool used by ingest_workflows().
+    Must be called while the process is still single-threaded.
+
+    Args:
+        max_workers: Pool size (defaults to the CPU count)
+
+    Returns:
+        The pool, or None when parallel ingestion is unavailable
+    """
+    global _shared_pool
+    if _shared_pool is not None:
+        return _shared_pool
+    workers = max_workers or os.cpu_count() or 1
+    if workers < 2:
+        return None
+    try:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        # Fork every worker now, before the caller starts any thread
+        list(pool.map(_warm_up, range(workers)))
+    except Exception as e:
+        print(f"⚠️ Parallel ingestion unavailable ({e}), parsing sequentially", file=sys.stderr)
+        return None
+    _shared_pool = pool
+    return pool
+
+
+def stop_ingest_pool() -> None:
+    """Shuts the long-lived worker pool down."""
+    global _shared_pool
+    if _shared_pool is not None:
+        _shared_pool.shutdown(cancel_futures=True)
+        _shared_pool = None
+
+
+def ingest_workflows(
+    items: Sequence[Tuple[str, bytes]],
+    threshold: int = INGEST_PARALLEL_THRESHOLD,
+    max_workers: Optional[int] = INGEST_MAX_WORKERS,
+) -> List[IngestResult]:
+    """
+    Parses and validates a batch of workflow files.
+
+    Batches smaller than the threshold are parsed in-process, since spawning
+    workers would cost more than it saves.
+
+    Args:
+        items: (filename, raw content) pairs
+        threshold: Minimum batch size that goes to the process pool
+        max_workers: Pool size (defaults to the CPU count)
+
+    Returns:
+        One IngestResult per item, in input order
+    """
+    if len(items) < max(threshold, 2):
+        return [_ingest_one(item) for item in items]
+
+    workers = min(max_workers or os.cpu_count() or 1, len(items))
+    chunksize = max(1, len(items) // (workers * 4))
+    if _shared_pool is not None:
+        try:
+            return list(_shared_pool.map(_ingest_one, items, chunksize=chunksize))
+        except Exception as e:
+            # A dead worker breaks the pool; it can't be re-forked safely
+            print(f"⚠️ Parallel ingestion unavailable ({e}), parsing sequentially", file=sys.stderr)
+            stop_ingest_pool()
+            return [_ingest_one(item) for item in items]
+
+    if threading.active_count() > 1:
+        return [_ingest_one(item) for item in items]
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(_ingest_one, items, chunksize=chunksize))
+    except Exception as e:
+        # A broken pool (e.g. no fork support) must not lose the batch
+        print(f"⚠️ Parallel ingestion unavailable ({e}), parsing sequentially", file=sys.stderr)
+        return [_ingest_one(item) for item in items]
@@ -0,0 +1,243 @@
+"""
+Intent file discovery.
+
+Monorepos keep an AGENTS.md next to each package it describes, so the
+repository root isn't the only place to look. The scanner walks the
+checkout with os.scandir, skips what git ignores (.gitignore files and
+.git/info/exclude) and the vendor and build folders of
+INTENT_SCAN_PRUNED_DIRS, and lists every intent file it finds.
+
+The listing of every folder is cached with the folder's mtime. Creating,
+deleting or renaming an entry changes the mtime of its folder, so a later
+scan only stats the folders and lists again the ones that changed; files
+that aren't folders, intent files or .gitignore files are never looked at
+twice. Within INTENT_SCAN_RECHECK_SECONDS of a scan, the result is served
+without touching the disk at all.
+"""
+
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from threading import RLock
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config import INTENT_SCAN_PRUNED_DIRS, INTENT_SCAN_RECHECK_SECONDS
+from utils.gitignore import IgnoreMatcher, IgnoreRule, parse_gitignore
+from utils.telemetry import observe
+
+# (mtime_ns, size) of a file, None when it doesn't exist
+Fingerprint = Optional[Tuple[int, int]]
+
+
+@dataclass
+class IntentFile:
+    """An intent file found by the scanner."""
+    # Path relative to the repository root, with '/' separators
+    path: str
+    size: int
+    mtime_ns: int
+
+
+@dataclass
+class FolderListing:
+    """What the scanner needs from one folder, valid while the folder's mtime is unchanged."""
+    mtime_ns: int
+    subfolders: List[str] = field(default_factory=list)
+    intent_names: List[str] = field(default_factory=list)
+    gitignore: Fingerprint = None
+    rules: List[IgnoreRule] = field(default_factory=list)
+
+
+def _fingerprint(path: str) -> Fingerprint:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _read_rules(path: str, base: str) -> List[IgnoreRule]:
+    try:
+        with open(path, encoding="utf-8", errors="replace") as handle:
+            return parse_gitignore(handle.read(), base)
+    except OSError:
+        return []
+
+
+class IntentScanner:
+    """Cached, .gitignore-aware discovery of the intent files of one checkout."""
+
+    def __init__(
+        self,
+        repo_path: Path,
+        intent_filenames: Iterable[str],
+        pruned_dirs: Iterable[str] = INTENT_SCAN_PRUNED_DIRS,
+        recheck_seconds: float = INTENT_SCAN_RECHECK_SECONDS,
+    ):
+        self.repo_path = repo_path
+        self.intent_filenames = frozenset(intent_filenames)
+        self.pruned_dirs = frozenset(pruned_dirs) | {".git"}
+        self.recheck_seconds = recheck_seconds
+        self._folders: Dict[str, FolderListing] = {}
+        self._exclude: Tuple[Fingerprint, List[IgnoreRule]] = (None, [])
+        self._files: List[IntentFile] = []
+        self._by_path: Dict[str, IntentFile] = {}
+        self._checked_at: Optional[float] = None
+        self._lock = RLock()
+        self.scans = 0
+        self.last_scan: Dict[str, Any] = {}
+
+    def mark_dirty(self) -> None:
+        """Makes the next call re-check the tree, even within recheck_seconds."""
+        with self._lock:
+            self._checked_at = None
+
+    def get_files(self) -> List[IntentFile]:
+        """
+        Returns every intent file of the checkout that git doesn't ignore,
+        the root ones first, then by path.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._checked_at is None or now - self._checked_at >= self.recheck_seconds:
+                self._files = self._scan()
+                self._by_path = {f.path: f for f in self._files}
+                self._checked_at = time.monotonic()
+            return self._files
+
+    def find(self, path: str) -> Optional[IntentFile]:
+        """Looks up an intent file of the index by its relative path."""
+        with self._lock:
+            self.get_files()
+            return self._by_path.get(path)
+
+    def _list_folder(self, absolute: str, relative: str, mtime_ns: int) -> FolderListing:
+        listing = FolderListing(mtime_ns=mtime_ns)
+        try:
+            entries = os.scandir(absolute)
+        except OSError:
+            return listing
+        with entries:
+            for entry in entries:
+                name = entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if name not in self.pruned_dirs:
+                            listing.subfolders.append(name)
+                    elif name in self.intent_filenames:
+                        if entry.is_file():
+                            listing.intent_names.append(name)
+                    elif name == ".gitignore":
+                        listing.gitignore = _fingerprint(entry.path)
+                        listing.rules = _read_rules(entry.path, relative)
+                except OSError:
+                    continue
+        return listing
+
+    def _root_matcher(self) -> IgnoreMatcher:
+        """Rules of .git/info/exclude, which apply to the whole checkout."""
+        exclude = os.path.join(self.repo_path, ".git", "info", "exclude")
+        fingerprint = _fingerprint(exclude)
+        if fingerprint != self._exclude[0]:
+            self._exclude = (fingerprint, _read_rules(exclude, "") if fingerprint else [])
+        return IgnoreMatcher(self._exclude[1])
+
+    def _scan(self) -> List[IntentFile]:
+        start = time.perf_counter()
+        folders: Dict[str, FolderListing] = {}
+        files: List[IntentFile] = []
+        listed = 0
+        stack: List[Tuple[str, str, IgnoreMatcher]] = [(str(self.repo_path), "", self._root_matcher())]
+        while stack:
+            absolute, relative, parent_matcher = stack.pop()
+            try:
+                mtime_ns = os.stat(absolute).st_mtime_ns
+            except OSError:
+                continue
+            listing = self._folders.get(relative)
+            if listing is None or listing.mtime_ns != mtime_ns:
+                listing = self._list_folder(absolute, relative, mtime_ns)
+                listed += 1
+            elif listing.gitignore is not None:
+                # Editing a .gitignore in place doesn't change its folder's mtime
+                gitignore = os.path.join(absolute, ".gitignore")
+                fingerprint = _fingerprint(gitignore)
+                if fingerprint != listing.gitignore:
+                    listing.gitignore = fingerprint
+                    listing.rules = _read_rules(gitignore, relative)
+            folders[relative] = listing
+
+            matcher = parent_matcher.child(listing.rules)
+            for name in listing.intent_names:
+                path = f"{relative}/{name}" if relative else name
+                if matcher.is_ignored(path, is_dir=False):
+                    continue
+                fingerprint = _fingerprint(os.path.join(absolute, name))
+                if fingerprint is not None:
+                    files.append(IntentFile(path=path, size=fingerprint[1], mtime_ns=fingerprint[0]))
+            for name in listing.subfolders:
+                path = f"{relative}/{name}" if relative else name
+                if not matcher.is_ignored(path, is_dir=True):
+                    stack.append((os.path.join(absolute, name), path, matcher))
+
+        # Folders that vanished or became ignored are forgotten
+        self._folders = folders
+        files.sort(key=lambda f: (f.path.count("/"), f.path))
+        elapsed = time.perf_counter() - start
+        observe("intent.scan", elapsed)
+        self.scans += 1
+        self.last_scan = {
+            "folders": len(folders),
+            "folders_listed": listed,
+            "intent_files": len(files),
+            "scan_ms": round(elapsed * 1000, 3),
+        }
+        return files
+
+    def read(self, path: str) -> Optional[str]:
+        """
+        Reads an intent file of the index in a single read.
+
+        Returns:
+            The content, or None when the path isn't an indexed intent file
+            (which also keeps clients from reading anything else)
+        """
+        intent_file = self.find(path)
+        if intent_file is None:
+            return None
+        try:
+            with open(os.path.join(self.repo_path, *path.split("/")), "rb") as handle:
+                return handle.read().decode("utf-8", errors="replace")
+        except OSError:
+            self.mark_dirty()
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"scans": self.scans, "cached_folders": len(self._folders), **self.last_scan}
+
+
+_scanners: Dict[Path, IntentScanner] = {}
+_scanners_lock = RLock()
+
+
+def get_intent_scanner(repo_path: Path, intent_filenames: Iterable[str]) -> IntentScanner:
+    """Returns the shared scanner of a repository checkout."""
+    key = repo_path.resolve()
+    with _scanners_lock:
+        scanner = _scanners.get(key)
+        if scanner is None:
+            scanner = _scanners[key] = IntentScanner(key, intent_filenames)
+        return scanner
+
+
+def drop_intent_scanner(repo_path: Path) -> None:
+    """Forgets the cached scan of a checkout that is no longer served."""
+    with _scanners_lock:
+        _scanners.pop(repo_path.resolve(), None)
+
+
+def get_scanner_stats() -> Dict[str, Dict[str, Any]]:
+    with _scanners_lock:
+        return {str(path): scanner.stats() for path, scanner in _scanners.items()}
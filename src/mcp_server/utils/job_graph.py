@@ -0,0 +1,265 @@
+"""
+Job graph analysis.
+
+Builds the 'needs' DAG of every workflow and estimates what running it
+costs: matrix fan-out (runners per job), runner minutes, the critical path
+(wall-clock minutes) and the peak number of runners busy at once.
+
+Durations are estimates. A step takes its 'timeout-minutes' when set (an
+upper bound) and DEFAULT_STEP_MINUTES otherwise; every job adds
+JOB_SETUP_MINUTES for provisioning the runner.
+"""
+
+import itertools
+import math
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import DEFAULT_STEP_MINUTES, JOB_SETUP_MINUTES
+from domain_model import Job, Repository, Workflow
+
+
+@dataclass
+class MatrixExpansion:
+    """Job runs generated by a strategy.matrix."""
+    runs: int = 1
+    max_parallel: Optional[int] = None
+    # True when the matrix is computed at runtime (e.g. fromJSON), so 'runs' is a lower bound
+    dynamic: bool = False
+
+
+@dataclass
+class JobEstimate:
+    needs: List[str]
+    runners: int
+    max_parallel: int
+    minutes: float
+    wall_minutes: float
+    runner_minutes: float
+    dynamic_matrix: bool = False
+    start: Optional[float] = None
+    finish: Optional[float] = None
+
+
+@dataclass
+class WorkflowGraph:
+    """Analysis of the job graph of one workflow."""
+    jobs: Dict[str, JobEstimate] = field(default_factory=dict)
+    unknown_needs: Dict[str, List[str]] = field(default_factory=dict)
+    cycles: List[List[str]] = field(default_factory=list)
+    critical_path: List[str] = field(default_factory=list)
+    critical_path_minutes: float = 0.0
+    runner_minutes: float = 0.0
+    peak_runners: int = 0
+
+
+def job_needs(job: Job) -> List[str]:
+    if job.needs is None:
+        return []
+    return [job.needs] if isinstance(job.needs, str) else list(job.needs)
+
+
+def _is_expression(value: Any) -> bool:
+    return isinstance(value, str) and "${{" in value
+
+
+def expand_matrix(strategy: Optional[Dict[str, Any]]) -> MatrixExpansion:
+    """
+    Counts the runs of a matrix the way GitHub does: the cartesian product
+    of the list-valued keys, minus 'exclude' matches, plus the 'include'
+    entries that can't be merged into an existing combination.
+    """
+    if not strategy:
+        return MatrixExpansion()
+    max_parallel = strategy.get("max-parallel")
+    max_parallel = max_parallel if isinstance(max_parallel, int) and max_parallel > 0 else None
+    matrix = strategy.get("matrix")
+    if matrix is None:
+        return MatrixExpansion(max_parallel=max_parallel)
+    if not isinstance(matrix, dict):
+        return MatrixExpansion(max_parallel=max_parallel, dynamic=True)
+
+    dynamic = False
+    axes: List[Tuple[str, List[Any]]] = []
+    for key, values in matrix.items():
+        if key in ("include", "exclude"):
+            continue
+        if isinstance(values, list):
+            axes.append((key, values))
+        else:
+            dynamic = True
+
+    combinations: List[Dict[str, Any]] = []
+    if axes:
+        keys = [key for key, _ in axes]
+        combinations = [dict(zip(keys, values)) for values in itertools.product(*(v for _, v in axes))]
+
+    excludes = matrix.get("exclude")
+    if isinstance(excludes, list):
+        combinations = [
+            combo for combo in combinations
+            if not any(
+                isinstance(rule, dict) and all(combo.get(k) == v for k, v in rule.items())
+                for rule in excludes
+            )
+        ]
+    elif excludes is not None:
+        dynamic = True
+
+    includes = matrix.get("include")
+    if isinstance(includes, list):
+        originals = [dict(combo) for combo in combinations]
+        for entry in includes:
+            if not isinstance(entry, dict):
+                dynamic = True
+                continue
+            # An include extends every combination whose original values it doesn't overwrite
+            merged = False
+            for original, combo in zip(originals, combinations):
+                if all(original.get(k, v) == v for k, v in entry.items() if k in original):
+                    combo.update({k: v for k, v in entry.items() if k not in original})
+                    merged = True
+            if not merged:
+                combinations.append(dict(entry))
+                originals.append(dict(entry))
+    elif includes is not None:
+        dynamic = True
+
+    return MatrixExpansion(runs=max(len(combinations), 1), max_parallel=max_parallel, dynamic=dynamic)
+
+
+def estimate_job_minutes(job: Job) -> float:
+    """Estimated duration of one run of the job."""
+    return JOB_SETUP_MINUTES + sum(
+        step.timeout_minutes if step.timeout_minutes else DEFAULT_STEP_MINUTES
+        for step in job.steps
+    )
+
+
+def _find_cycles(graph: Dict[str, List[str]]) -> List[List[str]]:
+    """Returns one cycle per strongly connected group of jobs that depend on each other."""
+    cycles: List[List[str]] = []
+    state: Dict[str, int] = {}  # 1 = on the current path, 2 = done
+    path: List[str] = []
+
+    def visit(node: str) -> None:
+        state[node] = 1
+        path.append(node)
+        for dep in graph[node]:
+            if state.get(dep) == 1:
+                cycles.append(path[path.index(dep):] + [dep])
+            elif dep not in state:
+                visit(dep)
+        path.pop()
+        state[node] = 2
+
+    for node in graph:
+        if node not in state:
+            visit(node)
+    return cycles
+
+
+def _peak(intervals: List[Tuple[float, float, int]]) -> int:
+    """Maximum sum of runners over overlapping [start, finish) intervals."""
+    events = sorted(
+        [(start, runners) for start, _, runners in intervals]
+        + [(finish, -runners) for _, finish, runners in intervals],
+        key=lambda event: (event[0], event[1]),
+    )
+    peak = current = 0
+    for _, delta in events:
+        current += delta
+        peak = max(peak, current)
+    return peak
+
+
+def analyze_workflow(workflow: Workflow) -> WorkflowGraph:
+    """Builds the needs DAG of a workflow and schedules it on unlimited runners."""
+    result = WorkflowGraph()
+    graph: Dict[str, List[str]] = {}
+    for job_id, job in workflow.jobs.items():
+        needs = job_needs(job)
+        unknown = [dep for dep in needs if dep not in workflow.jobs]
+        if unknown:
+            result.unknown_needs[job_id] = unknown
+        graph[job_id] = [dep for dep in needs if dep in workflow.jobs]
+
+        expansion = expand_matrix(job.strategy)
+        minutes = estimate_job_minutes(job)
+        parallel = min(expansion.max_parallel or expansion.runs, expansion.runs)
+        result.jobs[job_id] = JobEstimate(
+            needs=needs,
+            runners=expansion.runs,
+            max_parallel=parallel,
+            minutes=minutes,
+            # Runs beyond max-parallel wait for a free slot
+            wall_minutes=minutes * math.ceil(expansion.runs / parallel),
+            runner_minutes=minutes * expansion.runs,
+            dynamic_matrix=expansion.dynamic,
+        )
+    result.runner_minutes = sum(job.runner_minutes for job in result.jobs.values())
+    result.cycles = _find_cycles(graph)
+
+    # Earliest start schedule; jobs on a cycle (or after one) never start
+    blocked = {job_id for cycle in result.cycles for job_id in cycle}
+    predecessor: Dict[str, Optional[str]] = {}
+    resolved: Dict[str, bool] = {}
+
+    def schedule(job_id: str) -> bool:
+        if job_id in resolved:
+            return resolved[job_id]
+        resolved[job_id] = False
+        if job_id in blocked or job_id in result.unknown_needs:
+            return False
+        start, previous = 0.0, None
+        for dep in graph[job_id]:
+            if not schedule(dep):
+                return False
+            if result.jobs[dep].finish > start:
+                start, previous = result.jobs[dep].finish, dep
+        estimate = result.jobs[job_id]
+        estimate.start, estimate.finish = start, start + estimate.wall_minutes
+        predecessor[job_id] = previous
+        resolved[job_id] = True
+        return True
+
+    for job_id in graph:
+        schedule(job_id)
+
+    scheduled = [job_id for job_id, ok in resolved.items() if ok]
+    if scheduled:
+        last = max(scheduled, key=lambda job_id: result.jobs[job_id].finish)
+        result.critical_path_minutes = result.jobs[last].finish
+        node: Optional[str] = last
+        while node is not None:
+            result.critical_path.append(node)
+            node = predecessor[node]
+        result.critical_path.reverse()
+        result.peak_runners = _peak([
+            (result.jobs[j].start, result.jobs[j].finish, result.jobs[j].max_parallel)
+            for j in scheduled
+        ])
+    return result
+
+
+def analyze_repository(repo: Repository) -> Dict[str, Any]:
+    """
+    Analyzes every workflow of a repository.
+
+    Returns:
+        Per-workflow graphs, plus the workflows ranked by runner minutes and
+        by critical path minutes
+    """
+    graphs = {filename: analyze_workflow(workflow) for filename, workflow in repo.workflows.items()}
+    return {
+        "name": repo.name,
+        "assumptions": {
+            "default_step_minutes": DEFAULT_STEP_MINUTES,
+            "job_setup_minutes": JOB_SETUP_MINUTES,
+        },
+        "ranking": {
+            "runner_minutes": sorted(graphs, key=lambda f: graphs[f].runner_minutes, reverse=True),
+            "critical_path_minutes": sorted(graphs, key=lambda f: graphs[f].critical_path_minutes, reverse=True),
+        },
+        "workflows": {filename: asdict(graph) for filename, graph in graphs.items()},
+    }
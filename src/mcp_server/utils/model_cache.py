@@ -0,0 +1,363 @@
+"""
+In-process cache for the CI/CD Domain Model.
+
+Every read of 'cicd://model' used to glob the workflows folder and re-parse
+every file. This cache keeps one entry per workflow file, keyed by
+(path, mtime, size, content hash), so only added, changed or deleted files
+are re-parsed. The serialized JSON is memoized until something changes,
+and the action usage index is updated for the changed files only.
+
+The first read of a new process seeds the entries from the on-disk
+snapshot of the checked-out commit (utils/snapshots.py). A read that had to
+parse something schedules a fresh snapshot: it is written SNAPSHOT_SAVE_DELAY
+seconds later by a background timer, outside the cache lock, so readers
+never wait for the serialization and a burst of changes costs one write.
+Pending snapshots are flushed when the process exits.
+"""
+
+import atexit
+import sys
+from dataclasses import dataclass
+from hashlib import sha256
+from pathlib import Path
+from threading import RLock, Timer
+import time
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+from config import SNAPSHOT_SAVE_DELAY
+from domain_model import Repository, Workflow
+from utils.action_index import ActionIndex
+from utils.ingestion import ingest_workflows
+from utils.snapshots import SnapshotFile, get_snapshot_store, read_head_sha
+from utils.telemetry import observe, span
+
+# Upper bound of memoized derived payloads per repository
+MAX_DERIVED_PAYLOADS = 256
+
+
+def list_workflow_files(workflows_dir: Path) -> List[Path]:
+    """
+    Lists workflow files in the order the domain model exposes them.
+    '.yml' files come before '.yaml' files; each group is sorted by name so
+    the serialized model is deterministic.
+    """
+    return sorted(workflows_dir.glob("*.yml")) + sorted(workflows_dir.glob("*.yaml"))
+
+
+@dataclass
+class CacheEntry:
+    """Parse result of one workflow file together with its fingerprint."""
+    mtime_ns: int
+    size: int
+    digest: str
+    workflow: Optional[Workflow] = None
+    error: Optional[str] = None
+
+
+class WorkflowModelCache:
+    """
+    Per-repository cache of parsed workflows.
+
+    A file is a hit when its (mtime, size) is unchanged, or when it was
+    touched but its content hash still matches. Anything else is a miss
+    and gets re-parsed.
+
+    When a filesystem watcher covers the repository ('watched' is True),
+    the folder is only rescanned after the watcher reported a change.
+    """
+
+    def __init__(self, repo_path: Path):
+        self.repo_path = repo_path
+        self.entries: Dict[Path, CacheEntry] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.serializations = 0
+        self.last_serialize_seconds = 0.0
+        self._signature: Optional[Tuple[Tuple[str, str], ...]] = None
+        self._model: Optional[Repository] = None
+        self._json: Optional[str] = None
+        self._derived: Dict[Hashable, str] = {}
+        self._action_index = ActionIndex()
+        self._lock = RLock()
+        self.watched = False
+        self._dirty = True
+        # Startup: "snapshot" (warm) or "parsed" (cold), and how long the first read took
+        self.start_mode: Optional[str] = None
+        self.start_seconds = 0.0
+        self.snapshot_saves = 0
+        # Snapshot waiting for its timer: (head, files, model)
+        self._pending_snapshot: Optional[Tuple[str, List[SnapshotFile], Repository]] = None
+        self._snapshot_timer: Optional[Timer] = None
+        self._snapshot_write_lock = RLock()
+
+    @property
+    def workflows_dir(self) -> Path:
+        return self.repo_path / ".github" / "workflows"
+
+    def _check_entry(self, file_path: Path) -> Tuple[Optional[CacheEntry], Optional[bytes]]:
+        """
+        Validates the cached entry of a file against its fingerprint.
+
+        Returns:
+            (entry, None) on a hit, (None, content) when the file must be
+            re-parsed, and (None, None) when the file disappeared.
+        """
+        try:
+            stat = file_path.stat()
+            entry = self.entries.get(file_path)
+            if entry and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+                self.hits += 1
+                return entry, None
+            content = file_path.read_bytes()
+        except FileNotFoundError:
+            self.entries.pop(file_path, None)
+            return None, None
+
+        digest = sha256(content).hexdigest()
+        if entry and entry.digest == digest:
+            # Touched but not modified: keep the parsed result
+            entry.mtime_ns, entry.size = stat.st_mtime_ns, stat.st_size
+            self.hits += 1
+            return entry, None
+
+        self.misses += 1
+        self.entries[file_path] = CacheEntry(
+            mtime_ns=stat.st_mtime_ns, size=stat.st_size, digest=digest
+        )
+        return None, content
+
+    def _refresh_entries(self, files: List[Path]) -> List[Tuple[Path, CacheEntry]]:
+        """Returns up-to-date entries for the files, parsing all misses in one batch."""
+        pending: List[Tuple[Path, bytes]] = []
+        for file_path in files:
+            _, content = self._check_entry(file_path)
+            if content is not None:
+                pending.append((file_path, content))
+
+        if not pending:
+            return [(p, self.entries[p]) for p in files if p in self.entries]
+        with span("ingest.batch"):
+            results = ingest_workflows([(p.name, content) for p, content in pending])
+        # Per-file CPU time, summed over the batch (workers run in parallel)
+        observe("ingest.yaml", sum(r.yaml_seconds for r in results))
+        observe("ingest.validate", sum(r.validate_seconds for r in results))
+        for (file_path, _), result in zip(pending, results):
+            entry = self.entries[file_path]
+            entry.workflow, entry.error = result.workflow, result.error
+            if result.error is not None:
+                # In a real server, we would use logging.error
+                print(f"⚠️ Error loading {result.filename}: {result.error}", file=sys.stderr)
+
+        return [(p, self.entries[p]) for p in files if p in self.entries]
+
+    def _seed_from_snapshot(self) -> bool:
+        """Fills the entries from the snapshot of the checked-out commit, if there is one."""
+        store = get_snapshot_store()
+        head = read_head_sha(self.repo_path) if store else None
+        if head is None:
+            return False
+        with span("snapshot.load"):
+            snapshot = store.load(self.repo_path.name, head)
+        if snapshot is None:
+            return False
+        for file in snapshot.files:
+            self.entries[self.workflows_dir / file.name] = CacheEntry(
+                mtime_ns=file.mtime_ns,
+                size=file.size,
+                digest=file.digest,
+                workflow=snapshot.model.workflows.get(file.name),
+                error=file.error,
+            )
+        return True
+
+    def _schedule_snapshot(self, current: List[Tuple[Path, CacheEntry]]) -> None:
+        """
+        Schedules the parsed entries as the snapshot of the checked-out
+        commit. Called under the cache lock; only captures what to write.
+        """
+        store = get_snapshot_store()
+        head = read_head_sha(self.repo_path) if store else None
+        if head is None:
+            return
+        files = [
+            SnapshotFile(name=p.name, mtime_ns=e.mtime_ns, size=e.size, digest=e.digest, error=e.error)
+            for p, e in current
+        ]
+        self._pending_snapshot = (head, files, self._model)
+        if self._snapshot_timer is None:
+            self._snapshot_timer = Timer(SNAPSHOT_SAVE_DELAY, self.flush_snapshot)
+            self._snapshot_timer.daemon = True
+            self._snapshot_timer.start()
+
+    def flush_snapshot(self) -> None:
+        """Writes the pending snapshot now, if there is one. Never holds the cache lock while writing."""
+        with self._snapshot_write_lock:
+            with self._lock:
+                pending, self._pending_snapshot = self._pending_snapshot, None
+                timer, self._snapshot_timer = self._snapshot_timer, None
+            if timer is not None:
+                timer.cancel()
+            if pending is None:
+                return
+            head, files, model = pending
+            try:
+                with span("snapshot.save"):
+                    get_snapshot_store().save(self.repo_path.name, head, files, model)
+                self.snapshot_saves += 1
+            except OSError as e:
+                print(f"⚠️ Could not write the model snapshot of {self.repo_path.name}: {e}", file=sys.stderr)
+
+    def get_model(self) -> Repository:
+        """Returns the Repository model, re-parsing only what changed."""
+        with self._lock:
+            if self.watched and not self._dirty and self._model is not None:
+                self.hits += len(self.entries)
+                return self._model
+            self._dirty = False
+            first_read = self.start_mode is None
+            if first_read:
+                start = time.perf_counter()
+                self.start_mode = "snapshot" if self._seed_from_snapshot() else "parsed"
+
+            if not self.workflows_dir.exists():
+                self.evictions += len(self.entries)
+                self.entries.clear()
+                self._signature = None
+                self._model = Repository(name=self.repo_path.name)
+                self._json = None
+                self._derived.clear()
+                return self._model
+
+            files = list_workflow_files(self.workflows_dir)
+            live = set(files)
+            for stale in [p for p in self.entries if p not in live]:
+                del self.entries[stale]
+                self.evictions += 1
+
+            misses = self.misses
+            current = self._refresh_entries(files)
+
+            signature = tuple((p.name, e.digest) for p, e in current)
+            if signature != self._signature or self._model is None:
+                repo_data = Repository(name=self.repo_path.name)
+                for file_path, entry in current:
+                    if entry.workflow is not None:
+                        repo_data.workflows[file_path.name] = entry.workflow
+                self._signature = signature
+                self._model = repo_data
+                self._json = None
+                self._derived.clear()
+                if self.misses != misses:
+                    self._schedule_snapshot(current)
+            if first_read:
+                self.start_seconds = time.perf_counter() - start
+                label = "warm start from snapshot" if self.start_mode == "snapshot" else "cold start"
+                print(f"⏱️ {self.repo_path.name}: {label}, {len(current)} workflow files in {self.start_seconds * 1000:.0f} ms", file=sys.stderr)
+            return self._model
+
+    def get_model_json(self) -> str:
+        """Returns the memoized JSON serialization of the Repository model."""
+        with self._lock:
+            model = self.get_model()
+            if self._json is None:
+                start = time.perf_counter()
+                self._json = model.model_dump_json(indent=2)
+                self.last_serialize_seconds = time.perf_counter() - start
+                self.serializations += 1
+            return self._json
+
+    def get_derived(self, key: Hashable, builder: Callable[[Repository], str]) -> str:
+        """
+        Returns a memoized payload derived from the model (index, projection,
+        single workflow...). Memoized payloads live until the model changes.
+        """
+        with self._lock:
+            model = self.get_model()
+            if key not in self._derived:
+                if len(self._derived) >= MAX_DERIVED_PAYLOADS:
+                    self._derived.clear()
+                self._derived[key] = builder(model)
+            return self._derived[key]
+
+    def get_action_index(self) -> ActionIndex:
+        """Returns the action usage index, re-indexing only the files that changed."""
+        with self._lock:
+            model = self.get_model()
+            self._action_index.sync(self._signature or (), model.workflows)
+            return self._action_index
+
+    def invalidate(self, file_path: Optional[Path] = None) -> None:
+        """Drops one cached file, or the whole cache when no path is given."""
+        with self._lock:
+            if file_path is None:
+                self.evictions += len(self.entries)
+                self.entries.clear()
+            elif self.entries.pop(self.workflows_dir / file_path.name, None) is not None:
+                self.evictions += 1
+            self._signature = None
+            self._json = None
+            self._derived.clear()
+            self._dirty = True
+
+    def mark_dirty(self) -> None:
+        """Forces the next read to rescan the folder, keeping parsed files that didn't change."""
+        with self._lock:
+            self._dirty = True
+
+    def stats(self) -> Dict[str, int]:
+        """Returns hit/miss counters for this repository."""
+        with self._lock:
+            return {
+                "files": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "json_memoized": int(self._json is not None),
+                "derived_memoized": len(self._derived),
+                "watched": int(self.watched),
+                "indexed_actions": self._action_index.stats()["actions"],
+                "indexed_files": self._action_index.files_indexed,
+                "warm_start": int(self.start_mode == "snapshot"),
+                "start_ms": round(self.start_seconds * 1000),
+                "snapshot_saves": self.snapshot_saves,
+            }
+
+
+_CACHES: Dict[Path, WorkflowModelCache] = {}
+_CACHES_LOCK = RLock()
+
+
+def get_model_cache(repo_path: Path) -> WorkflowModelCache:
+    """Returns the shared cache for a repository path, creating it on first use."""
+    key = repo_path.resolve()
+    with _CACHES_LOCK:
+        cache = _CACHES.get(key)
+        if cache is None:
+            cache = WorkflowModelCache(repo_path)
+            _CACHES[key] = cache
+        return cache
+
+
+def drop_model_cache(repo_path: Path) -> None:
+    """Forgets the cache of a repository path that is no longer served."""
+    with _CACHES_LOCK:
+        _CACHES.pop(repo_path.resolve(), None)
+
+
+def flush_snapshots() -> None:
+    """Writes the pending snapshot of every repository cache."""
+    with _CACHES_LOCK:
+        caches = list(_CACHES.values())
+    for cache in caches:
+        cache.flush_snapshot()
+
+
+# Snapshot timers are daemon threads: write what they still hold on exit
+atexit.register(flush_snapshots)
+
+
+def get_cache_stats() -> Dict[str, Dict[str, int]]:
+    """Returns the hit/miss counters of every repository cache."""
+    with _CACHES_LOCK:
+        return {str(path): cache.stats() for path, cache in _CACHES.items()}
@@ -0,0 +1,103 @@
+"""
+Raw workflow file cache.
+
+Keeps the content and SHA-256 of the workflow files served raw. Entries
+are validated by (mtime, size) on each read, so serving an unchanged file
+costs a stat instead of a read. The hash is the one clients send back as
+'known_hashes' to skip the files they already have.
+"""
+
+from dataclasses import dataclass
+from hashlib import sha256
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Iterable, Optional
+
+
+@dataclass
+class RawFile:
+    """Content of a file together with its fingerprint."""
+    mtime_ns: int
+    size: int
+    digest: str
+    content: bytes
+
+
+class RawFileCache:
+    """Per-repository cache of raw file contents."""
+
+    def __init__(self):
+        self._files: Dict[Path, RawFile] = {}
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: Path) -> Optional[RawFile]:
+        """
+        Returns the content and hash of a file, reading it only when its
+        (mtime, size) changed since the last read.
+
+        Returns:
+            None when the file doesn't exist
+        """
+        try:
+            stat = path.stat()
+        except OSError:
+            with self._lock:
+                self._files.pop(path, None)
+            return None
+        with self._lock:
+            cached = self._files.get(path)
+            if cached is not None and (cached.mtime_ns, cached.size) == (stat.st_mtime_ns, stat.st_size):
+                self.hits += 1
+                return cached
+        try:
+            content = path.read_bytes()
+        except OSError:
+            return None
+        raw = RawFile(mtime_ns=stat.st_mtime_ns, size=len(content), digest=sha256(content).hexdigest(), content=content)
+        with self._lock:
+            self._files[path] = raw
+            self.misses += 1
+        return raw
+
+    def prune(self, live: Iterable[Path]) -> None:
+        """Forgets the files that are not in 'live' (deleted since they were read)."""
+        keep = set(live)
+        with self._lock:
+            for path in [p for p in self._files if p not in keep]:
+                del self._files[path]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "files": len(self._files),
+                "bytes": sum(raw.size for raw in self._files.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+_caches: Dict[Path, RawFileCache] = {}
+_caches_lock = Lock()
+
+
+def get_raw_file_cache(repo_path: Path) -> RawFileCache:
+    """Returns the shared raw file cache of a repository path."""
+    key = repo_path.resolve()
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = _caches[key] = RawFileCache()
+        return cache
+
+
+def drop_raw_file_cache(repo_path: Path) -> None:
+    """Forgets the cache of a repository path that is no longer served."""
+    with _caches_lock:
+        _caches.pop(repo_path.resolve(), None)
+
+
+def get_raw_file_stats() -> Dict[str, Dict[str, int]]:
+    with _caches_lock:
+        return {str(path): cache.stats() for path, cache in _caches.items()}
@@ -0,0 +1,218 @@
+"""
+On-disk snapshots of the parsed domain model.
+
+A new server process used to re-parse every workflow, even when the
+checkout hadn't moved since the last run. The model cache now writes a
+snapshot of its parsed files after each parse, keyed by repository name
+and HEAD commit SHA, and the next process seeds its cache from it.
+
+A snapshot holds the parsed workflows together with the fingerprint
+(mtime, size, content hash) of every file. So the seeded cache still checks
+the working tree and re-parses only the files that differ from the commit.
+The snapshot is loaded with a single read and a single model_validate_json
+call. Snapshots from an older SNAPSHOT_SCHEMA_VERSION are discarded.
+"""
+
+import os
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+from threading import Lock
+from typing import List, Optional
+
+from pydantic import BaseModel, ValidationError
+
+from config import SNAPSHOT_DIR, SNAPSHOT_MAX_AGE_DAYS, SNAPSHOT_MAX_COUNT, SNAPSHOTS_ENABLED
+from domain_model import Repository
+
+# Bump whenever domain_model.py or the snapshot layout changes
+SNAPSHOT_SCHEMA_VERSION = 2
+
+SHA = re.compile(r"^[0-9a-f]{40}([0-9a-f]{24})?$")
+UNSAFE_NAME_CHARS = re.compile(r"[^A-Za-z0-9._-]")
+
+
+class SnapshotFile(BaseModel):
+    """Fingerprint and parse error of one workflow file."""
+    name: str
+    mtime_ns: int
+    size: int
+    digest: str
+    error: Optional[str] = None
+
+
+class Snapshot(BaseModel):
+    """Parsed Repository model of a checkout at a given commit."""
+    schema_version: int
+    repo: str
+    head: str
+    created_at: float
+    files: List[SnapshotFile]
+    model: Repository
+
+
+def _git_dir(repo_path: Path) -> Optional[Path]:
+    """Resolves the git directory, following the 'gitdir:' file of worktrees and submodules."""
+    dot_git = repo_path / ".git"
+    if dot_git.is_dir():
+        return dot_git
+    try:
+        content = dot_git.read_text(encoding="utf-8").strip()
+    except OSError:
+        return None
+    if not content.startswith("gitdir:"):
+        return None
+    return (repo_path / content[len("gitdir:"):].strip()).resolve()
+
+
+def _read_ref(git_dir: Path, ref: str) -> Optional[str]:
+    """Reads a ref from its loose file or from packed-refs."""
+    try:
+        value = (git_dir / ref).read_text(encoding="utf-8").strip()
+        return value if SHA.match(value) else None
+    except OSError:
+        pass
+    try:
+        lines = (git_dir / "packed-refs").read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return None
+    for line in lines:
+        sha, _, name = line.partition(" ")
+        if name.strip() == ref and SHA.match(sha):
+            return sha
+    return None
+
+
+def read_head_sha(repo_path: Path) -> Optional[str]:
+    """
+    Returns the commit SHA checked out in a repository, reading the git
+    files directly (no git process).
+
+    Returns:
+        The SHA, or None when the folder isn't a git checkout or HEAD points
+        to a branch without commits
+    """
+    git_dir = _git_dir(repo_path)
+    if git_dir is None:
+        return None
+    try:
+        head = (git_dir / "HEAD").read_text(encoding="utf-8").strip()
+    except OSError:
+        return None
+    if not head.startswith("ref:"):
+        return head if SHA.match(head) else None
+
+    ref = head[len("ref:"):].strip()
+    sha = _read_ref(git_dir, ref)
+    if sha is None:
+        # Linked worktrees keep branch refs in the common git directory
+        try:
+            common = (git_dir / "commondir").read_text(encoding="utf-8").strip()
+        except OSError:
+            return None
+        sha = _read_ref((git_dir / common).resolve(), ref)
+    return sha
+
+
+class SnapshotStore:
+    """
+    Folder of '<repo>@<sha>.json' snapshots. Snapshots older than max_age
+    are removed, and only the max_count most recent ones are kept.
+    """
+
+    def __init__(self, root: Path, max_age_days: float, max_count: int):
+        self.root = root
+        self.max_age_seconds = max_age_days * 86400
+        self.max_count = max_count
+        self._gc_lock = Lock()
+
+    def path_for(self, repo: str, head: str) -> Path:
+        return self.root / f"{UNSAFE_NAME_CHARS.sub('_', repo)}@{head}.json"
+
+    def load(self, repo: str, head: str) -> Optional[Snapshot]:
+        """Returns the snapshot of a repository at a commit, or None when there is no valid one."""
+        path = self.path_for(repo, head)
+        try:
+            snapshot = Snapshot.model_validate_json(path.read_bytes())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValidationError, ValueError) as e:
+            # Written by another schema version, or truncated
+            print(f"⚠️ Discarding unreadable snapshot {path.name}: {e.__class__.__name__}", file=sys.stderr)
+            path.unlink(missing_ok=True)
+            return None
+        if (snapshot.schema_version, snapshot.repo, snapshot.head) != (SNAPSHOT_SCHEMA_VERSION, repo, head):
+            path.unlink(missing_ok=True)
+            return None
+        return snapshot
+
+    def save(self, repo: str, head: str, files: List[SnapshotFile], model: Repository) -> Path:
+        """
+        Writes a snapshot atomically (a reader never sees a partial file),
+        then garbage-collects stale snapshots.
+        """
+        snapshot = Snapshot(
+            schema_version=SNAPSHOT_SCHEMA_VERSION,
+            repo=repo,
+            head=head,
+            created_at=time.time(),
+            files=files,
+            model=model,
+        )
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self.path_for(repo, head)
+        fd, tmp_name = tempfile.mkstemp(dir=self.root, prefix=".tmp-", suffix=".json")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(snapshot.model_dump_json(by_alias=True).encode("utf-8"))
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        self.gc(keep=path)
+        return path
+
+    def gc(self, keep: Optional[Path] = None) -> int:
+        """
+        Removes snapshots older than max_age, then the oldest ones beyond
+        max_count.
+
+        Args:
+            keep: Snapshot that must survive (the one just written)
+
+        Returns:
+            Number of snapshots removed
+        """
+        with self._gc_lock:
+            try:
+                snapshots = [(p.stat().st_mtime, p) for p in self.root.glob("*.json")]
+            except OSError:
+                return 0
+            cutoff = time.time() - self.max_age_seconds
+            snapshots.sort(reverse=True)
+            removed = 0
+            for position, (mtime, path) in enumerate(snapshots):
+                if path == keep:
+                    continue
+                if mtime < cutoff or position >= self.max_count:
+                    path.unlink(missing_ok=True)
+                    removed += 1
+            return removed
+
+
+_store: Optional[SnapshotStore] = None
+_store_lock = Lock()
+
+
+def get_snapshot_store() -> Optional[SnapshotStore]:
+    """Returns the shared snapshot store, or None when snapshots are disabled."""
+    global _store
+    if not SNAPSHOTS_ENABLED:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = SnapshotStore(SNAPSHOT_DIR, SNAPSHOT_MAX_AGE_DAYS, SNAPSHOT_MAX_COUNT)
+            _store.gc()
+        return _store
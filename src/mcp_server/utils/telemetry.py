@@ -0,0 +1,237 @@
+"""
+Server telemetry.
+
+Timing spans around every phase of the server (git sync, YAML parsing,
+validation, snapshot load, serialization) and around every resource read
+and tool call, kept as fixed-bucket latency histograms. Payload sizes are
+kept the same way. The numbers are served by the 'server_stats' tool and
+can be written periodically as a Prometheus text-format file
+(METRICS_FILE), e.g. for node_exporter's textfile collector.
+"""
+
+import bisect
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, Iterator, Optional, Sequence, Union
+
+from mcp.server.fastmcp import FastMCP
+
+# Upper bounds of the latency buckets, in seconds
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Upper bounds of the payload size buckets, in bytes (1 KiB .. 64 MiB)
+BYTES_BUCKETS = tuple(float(1024 * 4 ** power) for power in range(9))
+
+
+class Histogram:
+    """Prometheus-style histogram: per-bucket counts plus count, sum, last and max."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.last = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.last = value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Estimates a quantile by linear interpolation inside its bucket."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / bucket_count, self.max)
+            seen += bucket_count
+        return self.max
+
+
+class Telemetry:
+    """Thread-safe collection of span and payload histograms."""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.spans: Dict[str, Histogram] = {}
+        self.payloads: Dict[str, Histogram] = {}
+        self._lock = Lock()
+
+    def observe(self, name: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self.spans.get(name)
+            if histogram is None:
+                histogram = self.spans[name] = Histogram(SECONDS_BUCKETS)
+            histogram.observe(seconds)
+
+    def record_payload(self, kind: str, payload: Union[str, bytes, int]) -> None:
+        """Records the size of a payload (text, bytes, or a size in bytes)."""
+        if isinstance(payload, str):
+            size = len(payload.encode("utf-8"))
+        elif isinstance(payload, bytes):
+            size = len(payload)
+        else:
+            size = payload
+        with self._lock:
+            histogram = self.payloads.get(kind)
+            if histogram is None:
+                histogram = self.payloads[kind] = Histogram(BYTES_BUCKETS)
+            histogram.observe(float(size))
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        """Times the enclosed block (also when it raises)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Summary of every histogram, with latencies in milliseconds."""
+        with self._lock:
+            return {
+                "uptime_seconds": round(time.time() - self.started_at, 1),
+                "spans": {
+                    name: {
+                        "count": h.count,
+                        "total_ms": round(h.sum * 1000, 3),
+                        "mean_ms": round(h.sum / h.count * 1000, 3) if h.count else 0.0,
+                        "p50_ms": round(h.quantile(0.5) * 1000, 3),
+                        "p95_ms": round(h.quantile(0.95) * 1000, 3),
+                        "max_ms": round(h.max * 1000, 3),
+                        "last_ms": round(h.last * 1000, 3),
+                    }
+                    for name, h in sorted(self.spans.items())
+                },
+                "payloads": {
+                    kind: {
+                        "count": h.count,
+                        "total_bytes": int(h.sum),
+                        "mean_bytes": int(h.sum / h.count) if h.count else 0,
+                        "p95_bytes": int(h.quantile(0.95)),
+                        "max_bytes": int(h.max),
+                        "last_bytes": int(h.last),
+                    }
+                    for kind, h in sorted(self.payloads.items())
+                },
+            }
+
+    def render_prometheus(self, prefix: str = "mcp_server") -> str:
+        """Renders every histogram in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            families = [
+                (f"{prefix}_span_seconds", "span", "Duration of server phases, resource reads and tool calls", self.spans),
+                (f"{prefix}_payload_bytes", "kind", "Size of the payloads served", self.payloads),
+            ]
+            for metric, label, help_text, histograms in families:
+                lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} histogram"]
+                for name, h in sorted(histograms.items()):
+                    value = _escape_label(name)
+                    cumulative = 0
+                    for bound, bucket_count in zip(h.buckets + (float("inf"),), h.counts):
+                        cumulative += bucket_count
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f'{metric}_bucket{{{label}="{value}",le="{le}"}} {cumulative}')
+                    lines.append(f'{metric}_sum{{{label}="{value}"}} {h.sum!r}')
+                    lines.append(f'{metric}_count{{{label}="{value}"}} {h.count}')
+            lines.append(f"# HELP {prefix}_start_time_seconds Start time of the server process")
+            lines.append(f"# TYPE {prefix}_start_time_seconds gauge")
+            lines.append(f"{prefix}_start_time_seconds {self.started_at!r}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: Path) -> None:
+        """Writes the metrics file atomically, so a scraper never reads a partial file."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".tmp-", suffix=".prom")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                handle.write(self.render_prometheus())
+            # mkstemp creates the file private; scrapers run as another user
+            os.chmod(tmp_name, 0o644)
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Process-wide telemetry, shared by every capability
+_telemetry = Telemetry()
+
+
+def get_telemetry() -> Telemetry:
+    return _telemetry
+
+
+def span(name: str):
+    """Times the enclosed block into the '<name>' latency histogram."""
+    return _telemetry.span(name)
+
+
+def observe(name: str, seconds: float) -> None:
+    _telemetry.observe(name, seconds)
+
+
+def record_payload(kind: str, payload: Union[str, bytes, int]) -> None:
+    _telemetry.record_payload(kind, payload)
+
+
+class InstrumentedFastMCP(FastMCP):
+    """
+    FastMCP server that times every resource read and tool call. Resource
+    reads are labeled by their URI template (cicd://{repo}/model), so the
+    number of histograms doesn't grow with the repositories or files read.
+    """
+
+    def _resource_label(self, uri: str) -> str:
+        if any(str(resource.uri) == uri for resource in self._resource_manager.list_resources()):
+            return uri
+        for template in self._resource_manager.list_templates():
+            if template.matches(uri):
+                return template.uri_template
+        return "unknown"
+
+    async def read_resource(self, uri: Any):
+        label = f"resource {self._resource_label(str(uri))}"
+        with span(label):
+            contents = await super().read_resource(uri)
+        for item in contents:
+            record_payload(label, item.content)
+        return contents
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any]):
+        label = f"tool {name}"
+        with span(label):
+            result = await super().call_tool(name, arguments)
+        # (content blocks, structured output) when the tool declares an output schema
+        blocks = result[0] if isinstance(result, tuple) else result
+        if not isinstance(blocks, dict):
+            record_payload(label, sum(len(getattr(block, "text", "").encode("utf-8")) for block in blocks))
+        return result
+
+
+def write_metrics_file(path: Optional[Path]) -> None:
+    """Writes the Prometheus text file, if one is configured; errors are reported, not raised."""
+    if path is None:
+        return
+    try:
+        _telemetry.write_prometheus(path)
+    except OSError as e:
+        print(f"⚠️ Could not write the metrics file {path}: {e}", file=sys.stderr)
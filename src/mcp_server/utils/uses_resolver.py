@@ -0,0 +1,407 @@
+"""
+'uses' reference resolution.
+
+Steps can run local composite actions (uses: ./.github/actions/build) and
+jobs can call reusable workflows (uses: ./.github/workflows/deploy.yml or
+org/repo/.github/workflows/deploy.yml@v1). The domain model keeps those
+references as strings; the resolver follows them to what they run.
+
+Local targets are read from the checkout. Remote ones are read at their
+ref from a local mirror cache (ACTION_MIRROR_ROOT/<owner>/<repo>.git) with
+'git cat-file'; nothing is fetched, and references without a mirror are
+reported as unresolved.
+
+Every reference is resolved once per expansion however many jobs make it,
+and references that point to the same file share one target. Targets are
+validated by fingerprint (content hash of a checkout file, refs of a
+mirror), and parsed results are memoized by content hash, so an unchanged
+target is never parsed twice. The targets found at one nesting level are
+read and parsed concurrently before the next level is followed.
+"""
+
+import posixpath
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from hashlib import sha256
+from pathlib import Path
+from threading import Lock, RLock
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple, Union
+
+from config import ACTION_MIRROR_ROOT, USES_MAX_DEPTH, USES_RESOLVE_WORKERS
+from domain_model import (
+    ActionDefinition, ExpandedJob, ExpandedRepository, Job, Repository, ResolvedUses, Workflow
+)
+from utils.git_history import GitObjectReader
+from utils.ingestion import load_yaml
+from utils.raw_files import get_raw_file_cache
+from utils.telemetry import observe
+
+ACTION_FILENAMES = ("action.yml", "action.yaml")
+WORKFLOW_SUFFIXES = (".yml", ".yaml")
+WORKFLOWS_DIR = ".github/workflows/"
+
+# Parsed targets memoized by content hash, shared by every repository
+PARSE_MEMO_SIZE = 4096
+
+
+@dataclass(frozen=True)
+class Target:
+    """A file a reference points to: in the checkout (repo None) or in a mirrored repository at a ref."""
+    kind: str  # 'action' (folder holding action.yml) or 'workflow' (the file itself)
+    path: str
+    repo: Optional[str] = None
+    ref: Optional[str] = None
+
+
+@dataclass
+class ParsedTarget:
+    """What a target file holds, once parsed."""
+    kind: str
+    action: Optional[ActionDefinition] = None
+    workflow: Optional[Workflow] = None
+    references: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+@dataclass
+class TargetEntry:
+    """Resolution of a target, valid while its fingerprint is unchanged."""
+    fingerprint: Hashable
+    source: Optional[str]
+    path: Optional[str]
+    parsed: ParsedTarget
+
+
+def _unique(items: Iterable[str]) -> List[str]:
+    return list(dict.fromkeys(items))
+
+
+def job_references(job: Job) -> List[str]:
+    """'uses' references of a job: the reusable workflow it calls, then those of its steps."""
+    return _unique(([job.uses] if job.uses else []) + [step.uses for step in job.steps if step.uses])
+
+
+def parse_reference(uses: str) -> Union[Target, ResolvedUses]:
+    """
+    Maps a reference to its target.
+
+    Returns:
+        The Target to read, or a ResolvedUses for references that have no
+        file to follow (Docker images, malformed references)
+    """
+    if uses.startswith("docker://"):
+        return ResolvedUses(uses=uses, kind="docker")
+    if uses.startswith("./"):
+        path = posixpath.normpath(uses[2:])
+        if path == ".." or path.startswith("../"):
+            return ResolvedUses(uses=uses, kind="unresolved", error="Points outside the repository")
+        kind = "workflow" if path.endswith(WORKFLOW_SUFFIXES) else "action"
+        return Target(kind=kind, path="" if path == "." else path)
+
+    name, _, ref = uses.rpartition("@")
+    parts = name.split("/")
+    if not name or not ref or len(parts) < 2 or not all(parts) or any(c.isspace() for c in uses):
+        return ResolvedUses(uses=uses, kind="unresolved", error="Expected owner/repo[/path]@ref")
+    path = "/".join(parts[2:])
+    kind = "workflow" if path.startswith(WORKFLOWS_DIR) and path.endswith(WORKFLOW_SUFFIXES) else "action"
+    return Target(kind=kind, path=path, repo=f"{parts[0]}/{parts[1]}", ref=ref)
+
+
+def _action_kind(action: ActionDefinition) -> str:
+    using = action.runs.using.lower()
+    if using.startswith("node"):
+        return "javascript"
+    return using
+
+
+def parse_target(kind: str, content: bytes, target: Target) -> ParsedTarget:
+    """
+    Parses an action.yml or a reusable workflow.
+
+    Local workflow references of a mirrored workflow point into the mirrored
+    repository, so they are rewritten as owner/repo/...@ref references.
+    """
+    try:
+        if kind == "action":
+            action = ActionDefinition.model_validate(load_yaml(content))
+            return ParsedTarget(
+                kind=_action_kind(action),
+                action=action,
+                references=_unique(step.uses for step in action.runs.steps if step.uses),
+            )
+        workflow = Workflow.model_validate(load_yaml(content))
+    except Exception as e:
+        return ParsedTarget(kind="unresolved", error=f"Invalid {kind} file: {e}")
+
+    references = []
+    for job in workflow.jobs.values():
+        for uses in job_references(job):
+            if target.repo and uses.startswith("./") and uses.endswith(WORKFLOW_SUFFIXES):
+                uses = f"{target.repo}/{posixpath.normpath(uses[2:])}@{target.ref}"
+            references.append(uses)
+    return ParsedTarget(kind="reusable-workflow", workflow=workflow, references=_unique(references))
+
+
+class ParseMemo:
+    """Bounded memo of parsed targets by content hash, least recently used out first."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str, Optional[str], Optional[str]], ParsedTarget]" = OrderedDict()
+        self._lock = Lock()
+        self.parses = 0
+
+    def parse(self, target: Target, content: bytes) -> ParsedTarget:
+        # Rewritten references depend on the repository and ref, not just the content
+        key = (target.kind, sha256(content).hexdigest(), target.repo, target.ref)
+        with self._lock:
+            parsed = self._entries.get(key)
+            if parsed is not None:
+                self._entries.move_to_end(key)
+                return parsed
+        parsed = parse_target(target.kind, content, target)
+        with self._lock:
+            self.parses += 1
+            self._entries[key] = parsed
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return parsed
+
+
+_parse_memo = ParseMemo(PARSE_MEMO_SIZE)
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=USES_RESOLVE_WORKERS, thread_name_prefix="uses-resolver")
+        return _executor
+
+
+def _mirror_stamp(mirror: Path) -> Tuple[Optional[int], ...]:
+    """Changes whenever the mirror's refs may have moved (a fetch rewrites FETCH_HEAD or packed-refs)."""
+    stamp = []
+    for name in ("HEAD", "FETCH_HEAD", "packed-refs", "refs"):
+        try:
+            stamp.append((mirror / name).stat().st_mtime_ns)
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+class UsesResolver:
+    """Follows the 'uses' references of one repository's workflows."""
+
+    def __init__(self, repo_path: Path, mirror_root: Path = ACTION_MIRROR_ROOT, max_depth: int = USES_MAX_DEPTH):
+        self.repo_path = repo_path
+        self.mirror_root = mirror_root
+        self.max_depth = max_depth
+        self._entries: Dict[Target, TargetEntry] = {}
+        self._lock = RLock()
+        self._last_model: Optional[Repository] = None
+        self._last_fingerprints: Dict[Target, Hashable] = {}
+        self._expanded: Optional[ExpandedRepository] = None
+        # Bumped whenever the expanded view changes, so derived payloads can be keyed by it
+        self.generation = 0
+        self.expansions = 0
+        self.last_expand: Dict[str, Any] = {}
+
+    def _mirror_path(self, repo: str) -> Optional[Path]:
+        owner, name = repo.split("/")
+        for candidate in (f"{owner}/{name}.git", f"{owner}/{name}", f"{owner.lower()}/{name.lower()}.git"):
+            path = self.mirror_root / candidate
+            if path.is_dir():
+                return path
+        return None
+
+    def _resolve_checkout(self, target: Target, previous: Optional[TargetEntry]) -> TargetEntry:
+        root = self.repo_path.resolve()
+        names = [posixpath.join(target.path, name) for name in ACTION_FILENAMES] if target.kind == "action" else [target.path]
+        cache = get_raw_file_cache(self.repo_path)
+        for name in names:
+            file_path = (root / name).resolve()
+            if not file_path.is_relative_to(root) or not file_path.is_file():
+                continue
+            raw = cache.get(file_path)
+            if raw is None:
+                continue
+            if previous is not None and previous.fingerprint == raw.digest:
+                return previous
+            return TargetEntry(raw.digest, "checkout", name, _parse_memo.parse(target, raw.content))
+        missing = "No action.yml in" if target.kind == "action" else "No workflow file"
+        return TargetEntry(None, None, None, ParsedTarget(
+            kind="unresolved", error=f"{missing} './{target.path}' in the checkout",
+        ))
+
+    def _resolve_mirror(self, target: Target, previous: Optional[TargetEntry]) -> TargetEntry:
+        mirror = self._mirror_path(target.repo)
+        if mirror is None:
+            return TargetEntry(None, None, None, ParsedTarget(
+                kind="unresolved", error=f"No local mirror of {target.repo} in {self.mirror_root}",
+            ))
+        stamp = (str(mirror), _mirror_stamp(mirror))
+        if previous is not None and previous.fingerprint == stamp:
+            return previous
+
+        names = [posixpath.join(target.path, name) for name in ACTION_FILENAMES] if target.kind == "action" else [target.path]
+        with GitObjectReader(mirror) as reader:
+            for name in names:
+                content = reader.read(f"{target.ref}:{name}")
+                if content is not None:
+                    return TargetEntry(stamp, "mirror", name, _parse_memo.parse(target, content))
+        return TargetEntry(stamp, None, None, ParsedTarget(
+            kind="unresolved", error=f"No {' or '.join(names)} at {target.repo}@{target.ref} in the mirror",
+        ))
+
+    def _resolve(self, target: Target) -> TargetEntry:
+        previous = self._entries.get(target)
+        try:
+            if target.repo is None:
+                return self._resolve_checkout(target, previous)
+            return self._resolve_mirror(target, previous)
+        except (OSError, ValueError) as e:
+            return TargetEntry(None, None, None, ParsedTarget(kind="unresolved", error=str(e)))
+
+    def _resolve_all(self, targets: List[Target]) -> Dict[Target, TargetEntry]:
+        """Resolves independent targets concurrently (file and git reads release the GIL)."""
+        if len(targets) < 2:
+            return {target: self._resolve(target) for target in targets}
+        return dict(zip(targets, _get_executor().map(self._resolve, targets)))
+
+    def expand(self, model: Repository) -> ExpandedRepository:
+        """Returns the expanded view of a repository model, following every reference once."""
+        with self._lock:
+            start = time.perf_counter()
+            parses = _parse_memo.parses
+            if self._expanded is not None and model is self._last_model:
+                # Same workflows: only the targets themselves can have changed
+                fingerprints = {t: e.fingerprint for t, e in self._resolve_all(list(self._entries)).items()}
+                if fingerprints == self._last_fingerprints:
+                    self._record(start, parses, self.last_expand.get("depth", 0))
+                    return self._expanded
+
+            direct: Dict[str, Dict[str, List[str]]] = {
+                filename: {job_id: job_references(job) for job_id, job in workflow.jobs.items()}
+                for filename, workflow in model.workflows.items()
+            }
+
+            references: Dict[str, ResolvedUses] = {}
+            entries: Dict[Target, TargetEntry] = {}
+            pending = _unique(uses for jobs in direct.values() for refs in jobs.values() for uses in refs)
+            depth = 0
+            while pending and depth < self.max_depth:
+                depth += 1
+                parsed_refs = {uses: parse_reference(uses) for uses in pending}
+                targets = _unique(t for t in parsed_refs.values() if isinstance(t, Target) and t not in entries)
+                entries.update(self._resolve_all(targets))
+
+                found = []
+                for uses, target in parsed_refs.items():
+                    if isinstance(target, ResolvedUses):
+                        references[uses] = target
+                        continue
+                    entry = entries[target]
+                    references[uses] = ResolvedUses(
+                        uses=uses, kind=entry.parsed.kind, source=entry.source, path=entry.path,
+                        references=entry.parsed.references, action=entry.parsed.action,
+                        workflow=entry.parsed.workflow, error=entry.parsed.error,
+                    )
+                    found.extend(entry.parsed.references)
+                pending = _unique(uses for uses in found if uses not in references)
+            for uses in pending:
+                references[uses] = ResolvedUses(
+                    uses=uses, kind="unresolved", error=f"Nested deeper than {self.max_depth} levels",
+                )
+
+            # Targets no longer referenced are forgotten
+            self._entries = entries
+            fingerprints = {target: entry.fingerprint for target, entry in entries.items()}
+            if self._expanded is None or model is not self._last_model or fingerprints != self._last_fingerprints:
+                self._expanded = ExpandedRepository(
+                    name=model.name,
+                    references=references,
+                    jobs={
+                        filename: {
+                            job_id: ExpandedJob(uses=refs, expands_to=self._closure(refs, references))
+                            for job_id, refs in jobs.items()
+                        }
+                        for filename, jobs in direct.items()
+                    },
+                )
+                self._last_model, self._last_fingerprints = model, fingerprints
+                self.generation += 1
+
+            self._record(start, parses, depth)
+            return self._expanded
+
+    def _record(self, start: float, parses: int, depth: int) -> None:
+        elapsed = time.perf_counter() - start
+        observe("uses.expand", elapsed)
+        self.expansions += 1
+        self.last_expand = {
+            "references": len(self._expanded.references),
+            "targets": len(self._entries),
+            "parsed": _parse_memo.parses - parses,
+            "depth": depth,
+            "expand_ms": round(elapsed * 1000, 3),
+        }
+
+    @staticmethod
+    def _closure(direct: List[str], references: Dict[str, ResolvedUses]) -> List[str]:
+        """References reached through the direct ones, depth first, each listed once."""
+        seen = set(direct)
+        order: List[str] = []
+        stack = [iter(direct)]
+        while stack:
+            uses = next(stack[-1], None)
+            if uses is None:
+                stack.pop()
+                continue
+            resolved = references.get(uses)
+            children = [child for child in (resolved.references if resolved else []) if child not in seen]
+            seen.update(children)
+            order.extend(children)
+            if children:
+                stack.append(iter(children))
+        return order
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "expansions": self.expansions,
+                "cached_targets": len(self._entries),
+                "generation": self.generation,
+                **self.last_expand,
+            }
+
+
+_resolvers: Dict[Path, UsesResolver] = {}
+_resolvers_lock = Lock()
+
+
+def get_uses_resolver(repo_path: Path) -> UsesResolver:
+    """Returns the shared resolver of a repository checkout."""
+    key = repo_path.resolve()
+    with _resolvers_lock:
+        resolver = _resolvers.get(key)
+        if resolver is None:
+            resolver = _resolvers[key] = UsesResolver(key)
+        return resolver
+
+
+def drop_uses_resolver(repo_path: Path) -> None:
+    """Forgets the resolutions of a checkout that is no longer served."""
+    with _resolvers_lock:
+        _resolvers.pop(repo_path.resolve(), None)
+
+
+def get_resolver_stats() -> Dict[str, Any]:
+    with _resolvers_lock:
+        stats: Dict[str, Any] = {str(path): resolver.stats() for path, resolver in _resolvers.items()}
+    stats["parse_memo"] = {"parses": _parse_memo.parses}
+    return stats
@@ -0,0 +1,278 @@
+"""
+Filesystem watcher for served repositories.
+
+Watches '.github/workflows' and the intent files of each repository and
+invalidates cached parse results for exactly the files that changed, so a
+long-running server stays current without rescanning on every request.
+
+Uses inotify (Linux) through ctypes when available, and falls back to
+polling file fingerprints everywhere else.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from utils.model_cache import get_model_cache
+
+# Callback invoked with the repository path and the changed files.
+# The workflows folder itself in the set means every workflow may have changed.
+ChangeListener = Callable[[Path, Set[Path]], None]
+
+# inotify event flags (see <sys/inotify.h>)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+WATCH_MASK = (
+    IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+    | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _load_libc() -> Optional[ctypes.CDLL]:
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    except OSError:
+        return None
+    return libc if hasattr(libc, "inotify_init1") else None
+
+
+_LIBC = _load_libc()
+
+
+class RepoWatcher:
+    """
+    Watches one repository and reports changes to workflow and intent files.
+
+    The watched folders are the repository root (for intent files),
+    '.github' and '.github/workflows'. Folders that don't exist yet are
+    picked up when they are created.
+    """
+
+    def __init__(
+        self,
+        repo_path: Path,
+        intent_filenames: List[str],
+        on_change: ChangeListener,
+        poll_interval: float = 2.0,
+        use_inotify: bool = True,
+    ):
+        self.repo_path = repo_path
+        self.intent_filenames = set(intent_filenames)
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self.backend = "inotify" if use_inotify and _LIBC is not None else "polling"
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def workflows_dir(self) -> Path:
+        return self.repo_path / ".github" / "workflows"
+
+    def _is_relevant(self, path: Path) -> bool:
+        if path.parent == self.workflows_dir:
+            return path.suffix in (".yml", ".yaml")
+        return path.parent == self.repo_path and path.name in self.intent_filenames
+
+    def start(self) -> None:
+        target = self._run_inotify if self.backend == "inotify" else self._run_polling
+        self._thread = threading.Thread(
+            target=target, name=f"watch:{self.repo_path.name}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, wait: bool = True) -> None:
+        """Asks the watch thread to exit, and waits for it unless wait is False."""
+        self._stop.set()
+        if wait and self._thread is not None:
+            self._thread.join(timeout=self.poll_interval + 1)
+
+    def _emit(self, changed: Set[Path]) -> None:
+        if changed:
+            try:
+                self.on_change(self.repo_path, changed)
+            except Exception as e:
+                print(f"⚠️ Watcher callback failed for {self.repo_path}: {e}", file=sys.stderr)
+
+    # -------------------------------------------------------------------------
+    # Polling backend
+    # -------------------------------------------------------------------------
+    def _snapshot(self) -> Dict[Path, Tuple[int, int]]:
+        snapshot = {}
+        candidates = [self.repo_path / name for name in self.intent_filenames]
+        if self.workflows_dir.is_dir():
+            candidates += [p for p in self.workflows_dir.iterdir() if self._is_relevant(p)]
+        for path in candidates:
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def _run_polling(self) -> None:
+        previous = self._snapshot()
+        while not self._stop.wait(self.poll_interval):
+            current = self._snapshot()
+            changed = {
+                path for path in previous.keys() | current.keys()
+                if previous.get(path) != current.get(path)
+            }
+            previous = current
+            self._emit(changed)
+
+    # -------------------------------------------------------------------------
+    # inotify backend
+    # -------------------------------------------------------------------------
+    def _run_inotify(self) -> None:
+        fd = _LIBC.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            print(f"⚠️ inotify unavailable (errno {ctypes.get_errno()}), polling {self.repo_path}", file=sys.stderr)
+            self.backend = "polling"
+            return self._run_polling()
+
+        watches: Dict[int, Path] = {}
+
+        def add_watch(folder: Path) -> None:
+            if folder in watches.values() or not folder.is_dir():
+                return
+            wd = _LIBC.inotify_add_watch(fd, os.fsencode(str(folder)), WATCH_MASK)
+            if wd >= 0:
+                watches[wd] = folder
+
+        def add_missing_watches() -> None:
+            for folder in (self.repo_path, self.repo_path / ".github", self.workflows_dir):
+                add_watch(folder)
+
+        try:
+            add_missing_watches()
+            while not self._stop.is_set():
+                readable, _, _ = select.select([fd], [], [], self.poll_interval)
+                if not readable:
+                    continue
+                try:
+                    buffer = os.read(fd, 64 * 1024)
+                except BlockingIOError:
+                    continue
+
+                changed: Set[Path] = set()
+                offset = 0
+                while offset < len(buffer):
+                    wd, mask, _, length = _EVENT_HEADER.unpack_from(buffer, offset)
+                    offset += _EVENT_HEADER.size
+                    name = buffer[offset:offset + length].rstrip(b"\0")
+                    offset += length
+
+                    folder = watches.get(wd)
+                    if folder is None:
+                        continue
+                    if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                        del watches[wd]
+                        if folder == self.workflows_dir:
+                            # The whole folder went away: every workflow changed
+                            changed.add(self.workflows_dir)
+                        continue
+                    if not name:
+                        continue
+                    path = folder / os.fsdecode(name)
+                    if mask & IN_ISDIR:
+                        add_missing_watches()
+                        if path in (self.workflows_dir, self.workflows_dir.parent):
+                            changed.add(self.workflows_dir)
+                    elif self._is_relevant(path):
+                        changed.add(path)
+                self._emit(changed)
+        finally:
+            os.close(fd)
+
+
+class WatchManager:
+    """
+    Runs one RepoWatcher per served repository path and invalidates the
+    domain model cache of the files they report. Extra listeners can
+    subscribe to the same change notifications.
+    """
+
+    def __init__(self, intent_filenames: List[str], poll_interval: float = 2.0, use_inotify: bool = True):
+        self.intent_filenames = intent_filenames
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.watchers: Dict[Path, RepoWatcher] = {}
+        self.listeners: List[ChangeListener] = []
+        self.events = 0
+        self._lock = threading.Lock()
+
+    def add_listener(self, listener: ChangeListener) -> None:
+        self.listeners.append(listener)
+
+    def watch(self, repo_path: Path) -> None:
+        with self._lock:
+            if repo_path in self.watchers:
+                return
+            watcher = RepoWatcher(
+                repo_path, self.intent_filenames, self._on_change,
+                self.poll_interval, self.use_inotify,
+            )
+            self.watchers[repo_path] = watcher
+            watcher.start()
+        cache = get_model_cache(repo_path)
+        cache.watched = True
+        cache.mark_dirty()
+
+    def unwatch(self, repo_path: Path) -> None:
+        with self._lock:
+            watcher = self.watchers.pop(repo_path, None)
+        if watcher is not None:
+            watcher.stop()
+            get_model_cache(repo_path).watched = False
+
+    def stop_all(self) -> None:
+        with self._lock:
+            watchers, self.watchers = self.watchers, {}
+        # Signal every thread first, so shutdown waits for one poll interval, not one per repository
+        for watcher in watchers.values():
+            watcher.stop(wait=False)
+        for repo_path, watcher in watchers.items():
+            watcher.stop()
+            get_model_cache(repo_path).watched = False
+
+    def on_path_change(self, name: str, old_path: Optional[Path], new_path: Optional[Path]) -> None:
+        """Registry listener: moves the watch from the old checkout to the new one."""
+        if old_path is not None and old_path != new_path:
+            self.unwatch(old_path)
+        if new_path is not None:
+            self.watch(new_path)
+
+    def _on_change(self, repo_path: Path, changed: Set[Path]) -> None:
+        self.events += 1
+        cache = get_model_cache(repo_path)
+        workflows_dir = repo_path / ".github" / "workflows"
+        for path in changed:
+            if path == workflows_dir:
+                cache.invalidate()
+            elif path.parent == workflows_dir:
+                cache.invalidate(path)
+        for listener in self.listeners:
+            listener(repo_path, changed)
+
+    def status(self) -> Dict[str, str]:
+        """Returns the backend used for each watched repository."""
+        with self._lock:
+            return {str(path): watcher.backend for path, watcher in self.watchers.items()}